@@ -0,0 +1,92 @@
+"""Benchmark of the database connection profiles on ingestion and listing.
+
+    python benchmarks/db_profile.py --papers 5000 --runs 20 --repeat 3
+
+For each profile a fresh database in a scratch directory receives ``--runs``
+fetch runs (one ingest transaction each, as a scheduled fetch commits), then
+``--edits`` single-paper classification saves (one commit each, as the Web UI
+writes), then is listed through the API service.  Commit-heavy phases show the
+fsync savings; listing shows the page cache and memory map.  Put the scratch
+directory on the disk the real database lives on (``--scratch``): fsync costs
+differ widely between disks and tmpfs.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from paper_feed.db import PROFILES, close_pools, connect, use_profile  # noqa: E402
+from paper_feed.ingestion import ingest_fetch_results  # noqa: E402
+from paper_feed.service import PaperFeedService  # noqa: E402
+
+
+def fetch_results(papers, runs):
+    """*runs* fetch results splitting *papers* synthetic DOI entries between two sources."""
+    per_run = max(1, papers // runs)
+    results = []
+    for run in range(runs):
+        entries = [{"title": f"Synthetic paper {number} on brand loyalty", "id": f"guid-{number}",
+                    "link": f"https://doi.org/10.1000/bench.{number}", "journal": "Journal of Benchmarks",
+                    "pub_date": f"2024-{number % 12 + 1:02d}-{number % 28 + 1:02d}T08:00:00+00:00",
+                    "summary": "A synthetic abstract. " * 8}
+                   for number in range(run * per_run, (run + 1) * per_run)]
+        results.append([{"url": f"https://feeds.example/{half}", "success": True, "status_code": 200,
+                         "entries": entries[half::2]} for half in range(2)])
+    return results
+
+
+def run_once(profile, results, edits, scratch):
+    database = os.path.join(scratch, f"{profile}.sqlite3")
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(database + suffix):
+            os.remove(database + suffix)
+    use_profile(profile)
+    connect(database).close()
+    timings = {}
+    started = time.perf_counter()
+    for result in results:
+        ingest_fetch_results(result, scratch, database)
+    timings["ingest"] = time.perf_counter() - started
+    service = PaperFeedService(scratch, database)
+    try:
+        papers = service.list_papers("all")
+        started = time.perf_counter()
+        for paper in papers[:edits]:
+            service.save_classification(paper["paper_id"], {"topics": ["Branding"]})
+        timings["edits"] = time.perf_counter() - started
+        started = time.perf_counter()
+        listed = service.list_papers("all")
+        timings["list"] = time.perf_counter() - started
+    finally:
+        close_pools()
+    return timings, len(listed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--papers", type=int, default=5000)
+    parser.add_argument("--runs", type=int, default=20, help="fetch runs (ingest transactions) to split the papers over")
+    parser.add_argument("--edits", type=int, default=200, help="single-paper saves, one commit each")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--profile", action="append", choices=sorted(PROFILES), help="default: every profile")
+    parser.add_argument("--scratch", help="directory for the scratch databases (default: a temporary directory)")
+    args = parser.parse_args()
+
+    results = fetch_results(args.papers, max(1, args.runs))
+    with tempfile.TemporaryDirectory(dir=args.scratch) as scratch:
+        for profile in args.profile or PROFILES:
+            samples = {}
+            for _ in range(max(1, args.repeat)):
+                timings, listed = run_once(profile, results, args.edits, scratch)
+                for phase, seconds in timings.items():
+                    samples.setdefault(phase, []).append(seconds)
+            print(f"{profile:>10}: " + "   ".join(f"{phase} {statistics.median(values) * 1000:8.1f} ms"
+                                                    for phase, values in samples.items()) + f"   ({listed} papers)")
+
+
+if __name__ == "__main__":
+    main()
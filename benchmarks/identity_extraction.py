@@ -0,0 +1,88 @@
+"""Microbenchmark of identifier extraction over feed-shaped records.
+
+    python benchmarks/identity_extraction.py --records 5000 --repeat 5
+    python benchmarks/identity_extraction.py --database data/paper_feed.sqlite3
+
+The synthetic corpus mirrors the link and GUID shapes of the configured
+publishers (ScienceDirect PII links with tracking parameters, Atypon DOI links,
+Nature and OUP article paths, arXiv and PubMed).  ``--database`` uses the
+stored observations instead.  Each repetition times a cold pass (empty
+canonical URL cache, as for the first fetch of a run) and a warm pass (the
+same links again, as for repeated fetches and identity lookups).  The default
+corpus is about one fetch run; more distinct links than the cache holds make
+the warm pass as slow as the cold one.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from paper_feed.db import connect  # noqa: E402
+from paper_feed.identity import canonical_url, identifiers_many  # noqa: E402
+
+SHAPES = (
+    ("sciencedirect", "https://www.sciencedirect.com/science/article/pii/S0148296324{n:06d}?dgcid=rss_sd_all", "{link}"),
+    ("informs", "https://pubsonline.informs.org/doi/abs/10.1287/mksc.2024.{n:04d}?af=R", "{link}"),
+    ("wiley", "https://onlinelibrary.wiley.com/doi/10.1002/mar.{n:05d}?af=R", "10.1002/mar.{n:05d}"),
+    ("sage", "https://journals.sagepub.com/doi/abs/10.1177/0022243724{n:06d}?ai=2b4&mi=ehikzz&af=R", "{link}"),
+    ("nature", "https://www.nature.com/articles/s41562-024-{n:05d}-1", "https://www.nature.com/articles/s41562-024-{n:05d}-1"),
+    ("oup", "https://academic.oup.com/jcr/article/51/1/{n}/7{n:06d}?utm_source=advanceaccess&utm_medium=rss", "{link}"),
+    ("arxiv", "http://arxiv.org/abs/2401.{n:05d}v1", "oai:arXiv.org:2401.{n:05d}v1"),
+    ("pubmed", "https://pubmed.ncbi.nlm.nih.gov/38{n:06d}/?utm_source=Feedly&utm_medium=rss", "pubmed:38{n:06d}"),
+)
+
+
+def synthetic_records(count, seed=1):
+    rng = random.Random(seed)
+    records = []
+    for number in range(count):
+        source, link, guid = rng.choice(SHAPES)
+        link = link.format(n=number)
+        records.append({"source": source, "link": link, "id": guid.format(n=number, link=link)})
+    return records
+
+
+def stored_records(database):
+    conn = connect(database)
+    try:
+        rows = conn.execute("SELECT source, source_guid, link, payload_json FROM paper_observations").fetchall()
+    finally:
+        conn.close()
+    records = []
+    for row in rows:
+        payload = json.loads(row["payload_json"] or "{}")
+        records.append({"source": row["source"], "id": row["source_guid"], "link": row["link"] or "",
+                        "doi": payload.get("doi") if isinstance(payload, dict) else None})
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=5000)
+    parser.add_argument("--database", help="benchmark the observations stored in this database instead")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    records = stored_records(args.database) if args.database else synthetic_records(args.records)
+    cold, warm = [], []
+    for _ in range(max(1, args.repeat)):
+        canonical_url.cache_clear()
+        started = time.perf_counter()
+        identifiers_many(records)
+        cold.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        identifiers_many(records)
+        warm.append(time.perf_counter() - started)
+    print(f"{len(records)} records, {len(cold)} repetitions")
+    for name, values in (("cold", cold), ("warm", warm)):
+        per_record = statistics.median(values) / len(records) * 1e6
+        print(f"{name:>5}: median {statistics.median(values) * 1000:8.1f} ms   {per_record:6.2f} µs/record")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Offline benchmark of the ingest pipeline over archived feed responses.
+
+Collect an archive first (``RSS_ARCHIVE=1 python get_RSS.py``), then:
+
+    python benchmarks/replay_pipeline.py --database data/paper_feed.sqlite3 --repeat 5
+
+Each repetition parses the archived bodies, applies the keywords, ingests into
+a fresh copy of the database and exports to a scratch directory, so numbers are
+comparable between runs and the real database is never modified.
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import get_RSS  # noqa: E402
+from paper_feed.db import connect  # noqa: E402
+from paper_feed.exporter import database_items, export_items  # noqa: E402
+from paper_feed.ingestion import ingest_fetch_results  # noqa: E402
+from paper_feed.keywords import KeywordMatcher  # noqa: E402
+
+
+def archived_sources(database, run_id=None):
+    conn = connect(database)
+    try:
+        if run_id:
+            rows = conn.execute("SELECT DISTINCT source FROM raw_responses WHERE run_id=? ORDER BY source", (run_id,))
+        else:
+            rows = conn.execute("SELECT DISTINCT source FROM raw_responses ORDER BY source")
+        return [row[0] for row in rows]
+    finally:
+        conn.close()
+
+
+def copy_database(source, destination):
+    with sqlite3.connect(source) as src, sqlite3.connect(destination) as dst:
+        src.backup(dst)
+
+
+def run_once(database, sources, queries, archive_dir, run_id, scratch):
+    timings = {}
+    copy = os.path.join(scratch, "bench.sqlite3")
+    if os.path.exists(copy):
+        os.remove(copy)
+    copy_database(database, copy)
+
+    started = time.perf_counter()
+    results, _ = get_RSS.replay_fetch_results(copy, sources, run_id, archive_dir)
+    timings["load_parse"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    matcher = KeywordMatcher(queries)
+    for result in results:
+        result["entries"] = [entry for entry in result["entries"] if matcher.match_entry(entry)]
+    timings["match"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    ingest_fetch_results(results, scratch, copy, replay=True)
+    timings["ingest"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    items = database_items(copy, limit=get_RSS.MAX_ITEMS)
+    export_items(items, os.path.join(scratch, "feed.xml"), os.path.join(scratch, "feed.json"), queries,
+                 limit=get_RSS.MAX_ITEMS, atomic_write=get_RSS.atomic_write)
+    timings["export"] = time.perf_counter() - started
+    entries = sum(len(result["entries"]) for result in results)
+    return timings, len(results), entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database", default=os.path.join("data", "paper_feed.sqlite3"))
+    parser.add_argument("--archive", default=get_RSS.RSS_ARCHIVE_DIR)
+    parser.add_argument("--run", help="replay the responses of one fetch run instead of the latest per source")
+    parser.add_argument("--keywords", help="keyword file (default: keywords.dat / RSS_KEYWORDS)")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    sources = archived_sources(args.database, args.run)
+    if not sources:
+        parser.error("no archived responses found; fetch once with RSS_ARCHIVE=1")
+    queries = get_RSS.load_config(args.keywords or "keywords.dat", None if args.keywords else "RSS_KEYWORDS")
+    samples = []
+    with tempfile.TemporaryDirectory() as scratch:
+        for _ in range(max(1, args.repeat)):
+            timings, source_count, entry_count = run_once(args.database, sources, queries, args.archive, args.run, scratch)
+            samples.append(timings)
+    print(f"{source_count} sources, {entry_count} matching entries, {len(samples)} repetitions")
+    for stage in samples[0]:
+        values = [sample[stage] * 1000 for sample in samples]
+        print(f"{stage:>12}: median {statistics.median(values):9.1f} ms   min {min(values):9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,7 @@
+import asyncio
+import contextlib
 import feedparser
+import multiprocessing
 import re
 import os
 import datetime
@@ -6,13 +9,22 @@ import time
 import json
 import hashlib
 import tempfile
+import httpx
 import requests
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from types import SimpleNamespace
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from rfeed import Item, Feed, Guid
 from email.utils import parsedate_to_datetime
 from urllib.parse import urlparse, unquote
-from paper_feed.ingestion import ingest_fetch_results, ensure_database, save_translations as save_db_translations, save_abstracts as save_db_abstracts
+from paper_feed.ingestion import ingest_fetch_results, ensure_database, last_filter_key, record_run_timings, source_validators, save_translations as save_db_translations, save_abstracts as save_db_abstracts
+from paper_feed.archive import archived_responses, load_body, store_body
+from paper_feed import fastfeed
+from paper_feed.db import use_profile
+from paper_feed.keywords import QueryError, compile_queries, query_keywords
 from paper_feed.exporter import database_items, export_items
+from paper_feed.scheduler import circuit_states, plan_polls
+from paper_feed.transport import (RETRY_AFTER_STATUSES, AsyncHostGates, HostRateLimiter, HostSessions, HostSkipped,
+                                  RequestTrace, elapsed_ms, retry_after_seconds)
 
 # --- 配置区域 ---
 OUTPUT_FILE = "filtered_feed.xml"
@@ -24,11 +36,39 @@ ABSTRACTS_CACHE = os.path.join(WEB_DIR, "abstracts.json")
 CATEGORIES_FILE = os.path.join(WEB_DIR, "categories.json")
 USER_CORRECTIONS_FILE = os.path.join(WEB_DIR, "user_corrections.json")
 MAX_ITEMS = 1000
-RSS_FETCH_WORKERS = 8
+# Per-host rate limits and connection caps (paper_feed.transport) keep this safe.
+RSS_FETCH_WORKERS = 16
+# "threads" or "async"; async keeps every feed in flight on one event loop.
+RSS_FETCH_MODE = os.environ.get("RSS_FETCH_MODE", "threads")
+RSS_ASYNC_CONCURRENCY = 64
+# Adaptive polling bounds: no source is polled more often / less often than this.
+RSS_POLL_MIN_HOURS = float(os.environ.get("RSS_POLL_MIN_HOURS", "1"))
+RSS_POLL_MAX_HOURS = float(os.environ.get("RSS_POLL_MAX_HOURS", "72"))
 RSS_REQUEST_TIMEOUT = (5, 20)
+# A Retry-After longer than this abandons the source, and every other source on
+# its host, until it expires instead of waiting.
+RSS_MAX_RETRY_AFTER = 120
+# RSS_ARCHIVE=1 keeps every fetched feed body (gzip, deduplicated by sha256) so
+# runs can be replayed offline with ``--replay``.
+RSS_ARCHIVE = os.environ.get("RSS_ARCHIVE", "").lower() in {"1", "true", "yes"}
+RSS_ARCHIVE_DIR = os.environ.get("RSS_ARCHIVE_DIR") or os.path.join("data", "raw_archive")
+# Sources skip entries behind their high-water mark; every source is still read
+# in full at least this often to pick up late or out-of-order entries.
+RSS_RECONCILE_HOURS = float(os.environ.get("RSS_RECONCILE_HOURS", "168"))
+# Common RSS/RDF/Atom feeds are read by paper_feed.fastfeed; RSS_FAST_PARSE=0
+# sends every body through feedparser.
+RSS_FAST_PARSE = os.environ.get("RSS_FAST_PARSE", "1").lower() not in {"0", "false", "no"}
+# Worker processes that parse fetched bodies while the network workers keep
+# fetching; 0 parses in the fetch worker itself.
+RSS_PARSE_PROCESSES = int(os.environ.get("RSS_PARSE_PROCESSES", "0"))
 AI_ANALYSIS_WORKERS = 5
 ABSTRACT_FETCH_WORKERS = 5
 CLASSIFICATION_VERSION = "v2"
+USER_AGENT = "Paper-Feed/1.0 (+https://github.com/Xiaotian-Liu-MKT/paper-feed)"
+# Shared keep-alive pools and per-host token buckets for every outbound request
+# (feeds, Crossref, Semantic Scholar), across threads and the async engine.
+RATE_LIMITER = HostRateLimiter(max_block=RSS_MAX_RETRY_AFTER)
+HTTP = HostSessions(headers={"User-Agent": USER_AGENT}, limiter=RATE_LIMITER)
 
 # OpenAI 配置
 CONFIG_FILE = "config.json"
@@ -60,7 +100,8 @@ def get_config():
     config = {
         "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY"),
         "OPENAI_BASE_URL": os.environ.get("OPENAI_BASE_URL"),
-        "OPENAI_PROXY": os.environ.get("OPENAI_PROXY")
+        "OPENAI_PROXY": os.environ.get("OPENAI_PROXY"),
+        "PAPER_FEED_DB_PROFILE": os.environ.get("PAPER_FEED_DB_PROFILE")
     }
     if os.path.exists(CONFIG_FILE):
         try:
@@ -113,7 +154,7 @@ def get_abstract_from_crossref(doi):
 
     try:
         url = f"https://api.crossref.org/works/{doi}"
-        response = requests.get(url, timeout=10)
+        response = HTTP.get(url, timeout=10)
         if response.status_code == 200:
             data = response.json()
             abstract = data['message'].get('abstract', '')
@@ -138,7 +179,7 @@ def get_abstract_from_semantic_scholar(title):
             'limit': 1,
             'fields': 'abstract,tldr,citationCount,influentialCitationCount'
         }
-        response = requests.get(url, params=params, timeout=10)
+        response = HTTP.get(url, params=params, timeout=10)
         if response.status_code == 200:
             data = response.json()
             if data.get('data') and len(data['data']) > 0:
@@ -595,56 +636,266 @@ def convert_struct_time_to_datetime(struct_time):
         return datetime.datetime.now()
     return datetime.datetime.fromtimestamp(time.mktime(struct_time))
 
-def fetch_rss_result(rss_url, retries=3):
-    """Fetch one source and retain enough status information for job reporting."""
+def conditional_headers(validators):
+    """Request headers that let a publisher answer 304 for an unchanged feed."""
+    headers = {"User-Agent": USER_AGENT}
+    if validators and validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators and validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+    return headers
+
+def unchanged_fetch_result(rss_url, status_code, attempt, validators, timings=None, headers=None):
+    """A success with nothing to ingest; validators the server sent replace the stored ones."""
+    headers = headers or {}
+    return {
+        "url": rss_url,
+        "success": True,
+        "unchanged": True,
+        "entries": [],
+        "status_code": status_code,
+        "attempts": attempt,
+        "error": None,
+        "etag": headers.get("ETag") or validators.get("etag"),
+        "last_modified": headers.get("Last-Modified") or validators.get("last_modified"),
+        "body_hash": validators.get("body_hash"),
+        "timings": timings or {},
+    }
+
+
+def fetch_result(rss_url, response, attempt, validators=None, timings=None, parser=None):
+    """Turn a 2xx (or validated 304) response into an ingestible result dict.
+
+    Many publishers ignore conditional requests, so a body identical to the last
+    ingested one is also reported as ``unchanged`` before any parsing happens.
+    *timings* holds the network phases; body size and parse time are added here.
+    With a *parser* executor the body is handed to it and the result carries the
+    pending ``parsing`` future until complete_fetch_result() merges it.
+    """
+    timings = dict(timings or {})
+    status_code = getattr(response, "status_code", None)
+    response_headers = getattr(response, "headers", None) or {}
+    content = response.content or b""
+    timings["body_bytes"] = len(content)
+    if status_code == 304 and validators:
+        print(f"Not modified: {rss_url}")
+        return unchanged_fetch_result(rss_url, status_code, attempt, validators, timings, response_headers)
+    body_hash = hashlib.sha256(content).hexdigest()
+    if validators and validators.get("body_hash") == body_hash:
+        print(f"Unchanged body: {rss_url}")
+        return unchanged_fetch_result(rss_url, status_code, attempt, validators, timings, response_headers)
+    result = {
+        "url": rss_url,
+        "success": True,
+        "status_code": status_code,
+        "attempts": attempt,
+        "error": None,
+        "etag": response_headers.get("ETag"),
+        "last_modified": response_headers.get("Last-Modified"),
+        "body_hash": body_hash,
+        "timings": timings,
+    }
+    if parser is not None:
+        result["parsing"] = parser.submit(parse_feed_body, content, validators)
+        return result
+    return merge_parsed_body(result, parse_feed_body(content, validators))
+
+
+def parse_feed_body(content, validators=None):
+    """Parse a feed body and cut its entries at the source's high-water mark.
+
+    Runs in the fetch worker or in a parse worker process, so it takes and
+    returns only plain, picklable values.
+    """
+    parse_started = time.perf_counter()
+    feed = parse_feed(content)
+    # Without a high-water mark every entry is processed, which also reconciles
+    # entries an earlier, mark-limited pass may have skipped.
+    head_guid = (validators or {}).get("head_guid")
+    ordered = newest_first(feed.entries)
+    # A known GUID only marks the end of new items in a newest-first feed.
+    entries, head_id = take_new_entries(feed_entries(feed), head_guid if ordered else None)
+    if not ordered:
+        # The head is the newest item, which an oldest-first feed lists last.
+        head_id = entry_id(feed.entries[-1])
+    return {
+        "entries": entries,
+        "head_id": head_id,
+        "high_water": {"guid": head_id},
+        "seen_count": len(feed.entries) - len(entries),
+        "full_pass": not head_guid,
+        "parse_ms": elapsed_ms(parse_started),
+    }
+
+
+def merge_parsed_body(result, parsed):
+    parsed = dict(parsed)
+    result["timings"]["parse_ms"] = parsed.pop("parse_ms")
+    result.update(parsed)
+    return result
+
+
+def complete_fetch_result(result):
+    """Wait for a result's pending parse and merge it; a parse error fails the source."""
+    pending = result.pop("parsing", None) if result else None
+    if pending is None:
+        return result
+    try:
+        parsed = pending.result()
+    except Exception as e:
+        print(f"Error parsing {result['url']}: {e}")
+        return failed_fetch_result(result["url"], result["status_code"], result["attempts"], str(e))
+    return merge_parsed_body(result, parsed)
+
+
+@contextlib.contextmanager
+def parse_pool(processes=None):
+    """Worker processes that parse fetched bodies, or None to parse in the fetch worker.
+
+    Feed parsing is CPU-bound and would otherwise serialise the fetch threads on
+    the GIL.  Workers are spawned rather than forked because the pool starts
+    while fetch threads hold sockets and locks.
+    """
+    processes = RSS_PARSE_PROCESSES if processes is None else processes
+    if processes <= 0:
+        yield None
+        return
+    with ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("spawn")) as pool:
+        yield pool
+
+
+def parse_feed(content):
+    """Parse a feed body, preferring the fast path and falling back to feedparser."""
+    feed = fastfeed.parse(content) if RSS_FAST_PARSE else None
+    return feed if feed is not None else feedparser.parse(content)
+
+
+def newest_first(feed_items):
+    """Whether a parsed feed lists newest items first (assumed when dates are missing)."""
+    if len(feed_items) < 2:
+        return True
+    first, last = (item.get('published_parsed', item.get('updated_parsed')) for item in (feed_items[0], feed_items[-1]))
+    return not (first and last) or tuple(first) >= tuple(last)
+
+
+def entry_id(item):
+    return item.get('id', item.get('link', ''))
+
+
+def feed_entries(feed):
+    """Yield the entry dict of each feed item, building each only when consumed."""
+    journal_title = feed.feed.get('title', 'Unknown Journal')
+    for entry in feed.entries:
+        pub_struct = entry.get('published_parsed', entry.get('updated_parsed'))
+        pub_date = convert_struct_time_to_datetime(pub_struct)
+
+        summary_raw = entry.get('summary', entry.get('description', ''))
+        yield {
+            'title': entry.get('title', ''),
+            'link': entry.get('link', ''),
+            'pub_date': pub_date,
+            'summary': summary_raw,
+            'journal': journal_title,
+            'id': entry_id(entry)
+        }
+
+
+def take_new_entries(entries, head_guid=None):
+    """Consume *entries* up to a source's high-water mark, the previous head GUID.
+
+    Only a newest-first feed is cut there (the caller passes no GUID otherwise).
+    Dates never skip an entry: an unseen GUID dated before the head is a late
+    addition, and ingest deduplicates GUIDs seen before.
+    Returns ``(new_entries, head_id)``.
+    """
+    taken, head_id = [], None
+    for entry in entries:
+        if head_id is None:
+            head_id = entry['id']
+        if head_guid and entry['id'] == head_guid:
+            break
+        taken.append(entry)
+    return taken, head_id
+
+
+def archive_fetch_result(result, response):
+    """Keep the raw body of a fetched feed when archiving is enabled; never fails the fetch."""
+    content = getattr(response, "content", None)
+    if not RSS_ARCHIVE or result.get("status_code") == 304 or not content:
+        return result
+    try:
+        result["archive_hash"] = store_body(RSS_ARCHIVE_DIR, content)
+    except OSError as e:
+        print(f"Warning: could not archive response for {result['url']}: {e}")
+    return result
+
+
+def failed_fetch_result(rss_url, status_code, attempts, error):
+    return {
+        "url": rss_url,
+        "success": False,
+        "entries": [],
+        "status_code": status_code,
+        "attempts": attempts,
+        "error": error or "unknown fetch failure",
+    }
+
+
+def is_fetch_response_ok(status_code, validators=None):
+    return status_code is None or 200 <= status_code < 300 or (status_code == 304 and bool(validators))
+
+
+def retry_delay(response, attempt):
+    """Seconds to back off before the next attempt; None when Retry-After is too long.
+
+    On a throttling status (RETRY_AFTER_STATUSES) with Retry-After the shared
+    rate limiter already holds every request to that host until then, so no
+    additional sleep is needed here.  Other statuses back off exponentially
+    whatever Retry-After says, as the limiter ignores it for them.
+    """
+    retry_after = retry_after_seconds(getattr(response, "headers", None))
+    if retry_after is None or getattr(response, "status_code", None) not in RETRY_AFTER_STATUSES:
+        return 2 ** (attempt - 1)
+    return None if retry_after > RSS_MAX_RETRY_AFTER else 0
+
+
+def fetch_rss_result(rss_url, retries=3, validators=None, parser=None):
+    """Fetch one source and retain enough status information for job reporting.
+
+    *validators* are the ETag/Last-Modified values stored for the source; a 304
+    reply is reported as a successful, ``unchanged`` fetch without any entries.
+    With a *parser* executor the body is parsed there (see fetch_result()).
+    """
     print(f"Fetching: {rss_url}...")
     retries = max(1, retries)
     last_error = None
     last_status = None
     for attempt in range(1, retries + 1):
+        timings = {}
         try:
-            response = requests.get(
+            response = HTTP.get(
                 rss_url,
-                headers={"User-Agent": "Paper-Feed/1.0 (+https://github.com/Xiaotian-Liu-MKT/paper-feed)"},
+                headers=conditional_headers(validators),
                 timeout=RSS_REQUEST_TIMEOUT,
+                timings=timings,
             )
             last_status = getattr(response, "status_code", None)
-            if last_status is not None and not 200 <= last_status < 300:
+            if not is_fetch_response_ok(last_status, validators):
                 last_error = f"HTTP {last_status}"
                 # Client errors (including 404) will not improve with a retry.
                 retryable = last_status == 429 or last_status >= 500
                 print(f"Error fetching {rss_url} (attempt {attempt}/{retries}): {last_error}")
-                if not retryable:
+                delay = retry_delay(response, attempt)
+                if not retryable or delay is None:
                     break
-                if attempt < retries:
-                    time.sleep(2 ** (attempt - 1))
+                if attempt < retries and delay:
+                    time.sleep(delay)
                 continue
-
-            feed = feedparser.parse(response.content)
-            entries = []
-            journal_title = feed.feed.get('title', 'Unknown Journal')
-            
-            for entry in feed.entries:
-                pub_struct = entry.get('published_parsed', entry.get('updated_parsed'))
-                pub_date = convert_struct_time_to_datetime(pub_struct)
-                
-                summary_raw = entry.get('summary', entry.get('description', ''))
-                entries.append({
-                    'title': entry.get('title', ''),
-                    'link': entry.get('link', ''),
-                    'pub_date': pub_date,
-                    'summary': summary_raw,
-                    'journal': journal_title,
-                    'id': entry.get('id', entry.get('link', ''))
-                })
-            return {
-                "url": rss_url,
-                "success": True,
-                "entries": entries,
-                "status_code": last_status,
-                "attempts": attempt,
-                "error": None,
-            }
+            return archive_fetch_result(fetch_result(rss_url, response, attempt, validators, timings, parser), response)
+        except HostSkipped as e:
+            last_error = str(e)
+            print(f"Skipping {rss_url}: {e}")
+            break
         except (requests.RequestException, OSError) as e:
             last_error = str(e)
             print(f"Error fetching {rss_url} (attempt {attempt}/{retries}): {e}")
@@ -653,14 +904,133 @@ def fetch_rss_result(rss_url, retries=3):
             print(f"Error parsing {rss_url} (attempt {attempt}/{retries}): {e}")
         if attempt < retries:
             time.sleep(2 ** (attempt - 1))
-    return {
-        "url": rss_url,
-        "success": False,
-        "entries": [],
-        "status_code": last_status,
-        "attempts": attempt,
-        "error": last_error or "unknown fetch failure",
-    }
+    return failed_fetch_result(rss_url, last_status, attempt, last_error)
+
+
+async def fetch_rss_result_async(client, rss_url, retries=3, validators=None, parser=None):
+    """Coroutine twin of fetch_rss_result; backoff awaits instead of parking a thread."""
+    print(f"Fetching: {rss_url}...")
+    retries = max(1, retries)
+    last_error = None
+    last_status = None
+    for attempt in range(1, retries + 1):
+        trace = RequestTrace()
+        try:
+            started = time.perf_counter()
+            await RATE_LIMITER.acquire_async(rss_url)
+            sent = time.perf_counter()
+            response = await client.get(rss_url, headers=conditional_headers(validators), extensions={"trace": trace})
+            timings = {"wait_ms": elapsed_ms(started, sent), **trace.timings(), "request_ms": elapsed_ms(sent)}
+            last_status = response.status_code
+            RATE_LIMITER.observe(rss_url, last_status, response.headers)
+            if not is_fetch_response_ok(last_status, validators):
+                last_error = f"HTTP {last_status}"
+                retryable = last_status == 429 or last_status >= 500
+                print(f"Error fetching {rss_url} (attempt {attempt}/{retries}): {last_error}")
+                delay = retry_delay(response, attempt)
+                if not retryable or delay is None:
+                    break
+                if attempt < retries and delay:
+                    await asyncio.sleep(delay)
+                continue
+            # Hashing, parsing and archiving the body would stall every other request; run them in a thread.
+            return await asyncio.to_thread(
+                lambda: archive_fetch_result(fetch_result(rss_url, response, attempt, validators, timings, parser), response))
+        except HostSkipped as e:
+            last_error = str(e)
+            print(f"Skipping {rss_url}: {e}")
+            break
+        except (httpx.HTTPError, OSError) as e:
+            last_error = str(e)
+            print(f"Error fetching {rss_url} (attempt {attempt}/{retries}): {e}")
+        except Exception as e:
+            last_error = str(e)
+            print(f"Error parsing {rss_url} (attempt {attempt}/{retries}): {e}")
+        if attempt < retries:
+            await asyncio.sleep(2 ** (attempt - 1))
+    return failed_fetch_result(rss_url, last_status, attempt, last_error)
+
+
+async def _fetch_sources_async(rss_urls, validators, retries, parser=None):
+    semaphore = asyncio.Semaphore(RSS_ASYNC_CONCURRENCY)
+    connect_timeout, read_timeout = RSS_REQUEST_TIMEOUT
+    timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+    limits = httpx.Limits(max_connections=RSS_ASYNC_CONCURRENCY, max_keepalive_connections=RSS_ASYNC_CONCURRENCY)
+    gates = AsyncHostGates()
+    async with httpx.AsyncClient(timeout=timeout, limits=limits, follow_redirects=True) as client:
+        async def bounded(url):
+            # Take the host slot first so a task waiting on a busy host does
+            # not hold one of the global slots.
+            async with gates.slot(url), semaphore:
+                try:
+                    return await fetch_rss_result_async(client, url, retries=retries.get(url, 3),
+                                                        validators=validators.get(url), parser=parser)
+                except Exception as e:
+                    print(f"Unexpected RSS worker failure for {url}: {e}")
+                    return failed_fetch_result(url, None, 0, str(e))
+        return await asyncio.gather(*(bounded(url) for url in rss_urls))
+
+
+def fetch_sources(rss_urls, validators=None, mode=None, retries=None, parse_processes=None):
+    """Fetch every source and return result dicts in *rss_urls* order.
+
+    ``threads`` (default) uses a blocking worker pool; ``async`` keeps all
+    requests in flight on one event loop, bounded by RSS_ASYNC_CONCURRENCY.
+    *retries* optionally maps a source to its attempt budget (default 3).
+    With *parse_processes* (default RSS_PARSE_PROCESSES) network workers hand
+    each body to a process pool and move on to the next request; parsed
+    results are collected as they complete.
+    """
+    validators = validators or {}
+    retries = retries or {}
+    mode = mode or RSS_FETCH_MODE
+    if mode not in {"threads", "async"}:
+        raise ValueError("RSS fetch mode must be 'threads' or 'async'")
+    with parse_pool(parse_processes if len(rss_urls) > 1 else 0) as parser:
+        if mode == "async":
+            fetched = asyncio.run(_fetch_sources_async(rss_urls, validators, retries, parser))
+            return [complete_fetch_result(result) for result in fetched]
+        fetched_by_index = [None for _ in rss_urls]
+        with ThreadPoolExecutor(max_workers=max(1, min(RSS_FETCH_WORKERS, len(rss_urls)))) as executor:
+            futures = {executor.submit(fetch_rss_result, url, retries=retries.get(url, 3), validators=validators.get(url),
+                                       parser=parser): index
+                       for index, url in enumerate(rss_urls)}
+            for future in as_completed(futures):
+                index = futures[future]
+                try:
+                    fetched_by_index[index] = complete_fetch_result(future.result())
+                except Exception as e:
+                    print(f"Unexpected RSS worker failure for {rss_urls[index]}: {e}")
+                    fetched_by_index[index] = failed_fetch_result(rss_urls[index], None, 0, str(e))
+        return fetched_by_index
+
+
+def replay_fetch_results(database, rss_urls, run_id=None, archive_dir=None, parse_processes=None):
+    """Rebuild fetch results for *rss_urls* from archived bodies instead of the network.
+
+    Every body is parsed afresh (no validators, so nothing short-circuits as
+    unchanged), in RSS_PARSE_PROCESSES worker processes when configured.
+    Returns ``(results, missing_sources)``.
+    """
+    archive_dir = archive_dir or RSS_ARCHIVE_DIR
+    archived = archived_responses(database, rss_urls, run_id)
+    results, missing = [], []
+    with parse_pool(parse_processes if len(archived) > 1 else 0) as parser:
+        for url in rss_urls:
+            row = archived.get(url)
+            if row is None:
+                missing.append(url)
+                continue
+            try:
+                started = time.perf_counter()
+                content = load_body(archive_dir, row["body_hash"])
+                response = SimpleNamespace(status_code=row["status_code"], content=content, headers={})
+                results.append(fetch_result(url, response, 0, timings={"load_ms": elapsed_ms(started)}, parser=parser))
+            except Exception as e:
+                print(f"Error replaying {url}: {e}")
+                results.append(failed_fetch_result(url, row["status_code"], 0, str(e)))
+        results = [complete_fetch_result(result) for result in results]
+    return results, missing
 
 
 def parse_rss(rss_url, retries=3):
@@ -702,18 +1072,8 @@ def get_existing_items():
         return [] # 如果旧文件读不了，就当做第一次运行
 
 def match_entry(entry, queries):
-    # (保持不变)
-    text_to_search = (entry['title'] + " " + entry.get('summary', '')).lower()
-    for query in queries:
-        keywords = [k.strip().lower() for k in query.split('AND')]
-        match = True
-        for keyword in keywords:
-            if keyword not in text_to_search:
-                match = False
-                break
-        if match:
-            return True
-    return False
+    """*queries* may be the keyword list or a matcher from ``compile_queries``."""
+    return compile_queries(queries).match_entry(entry)
 
 def generate_rss_xml(items, queries):
     """生成 RSS 2.0 XML 文件 (已加入非法字符清洗)"""
@@ -912,13 +1272,7 @@ def write_feed_json(items, queries):
             "pub_date": item['pub_date'].isoformat()
         })
 
-    keywords = []
-    for query in queries:
-        parts = [p.strip() for p in query.split('AND')]
-        for part in parts:
-            if part:
-                keywords.append(part)
-    keywords = sorted(set(keywords), key=str.lower)
+    keywords = query_keywords(queries)
 
     payload = {
         "generated_at": datetime.datetime.now().isoformat(),
@@ -949,7 +1303,15 @@ def analyze_database_items(database, items, config=None):
     durable = {item["paper_id"]: results[item["title"]] for item in stale if item["title"] in results}
     return save_db_translations(database, durable)
 
-def run_rss_flow():
+def run_rss_flow(force_all=None, replay=None, reconcile=False):
+    """Fetch due sources, ingest matches, and regenerate compatibility exports.
+
+    Sources are polled on an adaptive schedule learnt from their fetch history;
+    *force_all* (or ``RSS_FORCE_ALL=1``) polls every source regardless.
+    *replay* (``"latest"`` or a fetch run id) reads every source from the raw
+    response archive instead of the network, e.g. to re-ingest under new keywords.
+    *reconcile* reads every polled source in full, ignoring high-water marks.
+    """
     # 请确保这里的调用参数与你目前的 secrets 配置一致
     rss_urls = load_config('journals.dat', 'RSS_JOURNALS')
     queries = load_config('keywords.dat', 'RSS_KEYWORDS')
@@ -957,6 +1319,11 @@ def run_rss_flow():
     if not rss_urls or not queries:
         print("Error: Configuration files are empty or missing.")
         return {"successful_sources": [], "failed_sources": [], "new_items": 0, "published": False}
+    try:
+        compile_queries(queries)
+    except QueryError as error:
+        print(f"Error: invalid keyword query: {error}")
+        return {"successful_sources": [], "failed_sources": [], "new_items": 0, "published": False}
 
     os.makedirs(WEB_DIR, exist_ok=True)
     journal_hash = compute_journal_hash(rss_urls)
@@ -968,35 +1335,90 @@ def run_rss_flow():
     if prev_hash and prev_hash != journal_hash:
         print("Journal list changed. Keeping cached history; only future updates are affected.")
 
+    # Bootstrap only when no local DB exists (notably GitHub Actions).  Stored
+    # validators are only reused while the keyword filter is unchanged.
+    plan_started = time.perf_counter()
+    database = ensure_database(".", os.environ.get("PAPER_FEED_DB") or None)
+    filter_key = compute_journal_hash(queries)
+    if replay:
+        return _replay_rss_flow(database, rss_urls, queries, filter_key, None if replay == "latest" else replay)
+    reconcile_before = datetime.datetime.now(datetime.timezone.utc)
+    if not reconcile:
+        reconcile_before -= datetime.timedelta(hours=RSS_RECONCILE_HOURS)
+    validators = source_validators(database, filter_key, reconcile_before.isoformat())
+
+    if force_all is None:
+        force_all = os.environ.get("RSS_FORCE_ALL", "").lower() in {"1", "true", "yes"}
+    # Changed keywords must re-evaluate every feed, not only those already due.
+    previous_filter = last_filter_key(database)
+    force_all = force_all or (previous_filter is not None and previous_filter != filter_key)
+    due_urls, deferred = plan_polls(database, rss_urls, min_interval=datetime.timedelta(hours=RSS_POLL_MIN_HOURS),
+                                    max_interval=datetime.timedelta(hours=RSS_POLL_MAX_HOURS), force=force_all)
+    if deferred:
+        print(f"Skipping {len(deferred)} sources that are not yet due.")
+    # Chronically failing sources are skipped until their cooldown ends, then
+    # probed once instead of paying the full retry budget again.
+    circuits = circuit_states(database, due_urls)
+    breaker_skipped = [{"url": url, "consecutive_failures": failures, "retry_at": retry_at.isoformat()}
+                       for url, (state, failures, retry_at) in circuits.items() if state == "open"]
+    probes = {url: 1 for url, (state, _, _) in circuits.items() if state == "half_open"}
+    due_urls = [url for url in due_urls if circuits[url][0] != "open"]
+    if breaker_skipped:
+        print(f"Circuit open for {len(breaker_skipped)} failing sources; skipping them this run.")
+    if not due_urls:
+        print("No RSS source is due; keeping existing feed outputs unchanged.")
+        return {"status": "skipped", "successful_sources": [], "failed_sources": [],
+                "skipped_sources": sorted(deferred), "breaker_skipped_sources": breaker_skipped,
+                "new_items": 0, "published": False}
+
+    stages = {"plan": elapsed_ms(plan_started)}
     print("Starting RSS fetch from remote...")
-    with ThreadPoolExecutor(max_workers=min(RSS_FETCH_WORKERS, len(rss_urls))) as executor:
-        futures = {executor.submit(fetch_rss_result, url): index for index, url in enumerate(rss_urls)}
-        fetched_by_index = [None for _ in rss_urls]
-        for future in as_completed(futures):
-            index = futures[future]
-            try:
-                fetched_by_index[index] = future.result()
-            except Exception as e:
-                print(f"Unexpected RSS worker failure for {rss_urls[index]}: {e}")
-                fetched_by_index[index] = {
-                    "url": rss_urls[index], "success": False, "entries": [],
-                    "status_code": None, "attempts": 0, "error": str(e),
-                }
-
+    stage_started = time.perf_counter()
+    fetched_by_index = fetch_sources(due_urls, validators, retries=probes)
+    stages["fetch"] = elapsed_ms(stage_started)
+    return _ingest_and_publish(database, fetched_by_index, queries, filter_key, stages, journal_hash,
+                               skipped_sources=sorted(deferred), breaker_skipped=breaker_skipped)
+
+
+def _replay_rss_flow(database, rss_urls, queries, filter_key, run_id):
+    print("Replaying archived RSS responses...")
+    stage_started = time.perf_counter()
+    fetched_by_index, missing = replay_fetch_results(database, rss_urls, run_id)
+    stages = {"replay": elapsed_ms(stage_started)}
+    if missing:
+        print(f"No archived response for {len(missing)} sources; skipping them.")
+    if not fetched_by_index:
+        print("Nothing to replay; keeping existing feed outputs unchanged.")
+        return {"status": "skipped", "successful_sources": [], "failed_sources": [], "skipped_sources": missing,
+                "breaker_skipped_sources": [], "new_items": 0, "published": False, "replay": True}
+    result = _ingest_and_publish(database, fetched_by_index, queries, filter_key, stages, compute_journal_hash(rss_urls),
+                                 skipped_sources=missing, breaker_skipped=[], replay=True)
+    result["replay"] = True
+    return result
+
+
+def _ingest_and_publish(database, fetched_by_index, queries, filter_key, stages, journal_hash,
+                        skipped_sources, breaker_skipped, replay=False):
+    """Log and ingest one run's results, then analyse and regenerate the exports."""
     successful_sources = [result["url"] for result in fetched_by_index if result and result["success"]]
     failed_sources = [result["url"] for result in fetched_by_index if not result or not result["success"]]
-    # Bootstrap only when no local DB exists (notably GitHub Actions), then log
-    # every fetch outcome and ingest successful source entries in one transaction.
-    database = ensure_database(".", os.environ.get("PAPER_FEED_DB") or None)
-    ingestion = ingest_fetch_results(fetched_by_index, ".", database, predicate=lambda entry: match_entry(entry, queries))
+    # Log every fetch outcome and ingest successful source entries in one transaction.
+    stage_started = time.perf_counter()
+    ingestion = ingest_fetch_results(fetched_by_index, ".", database, predicate=compile_queries(queries).match_entry,
+                                     filter_key=filter_key, replay=replay)
+    stages["ingest"] = elapsed_ms(stage_started)
     if not successful_sources:
         print("All RSS sources failed; keeping existing feed outputs unchanged.")
+        record_run_timings(database, ingestion["run_id"], stages)
         return {
             "run_id": ingestion["run_id"], "status": ingestion["status"],
             "successful_sources": successful_sources,
             "failed_sources": failed_sources,
+            "skipped_sources": skipped_sources,
+            "breaker_skipped_sources": breaker_skipped,
             "new_items": 0,
             "published": False,
+            "stages_ms": stages,
         }
 
     # A successful fetch authorizes publication, including runs where no matching
@@ -1007,18 +1429,27 @@ def run_rss_flow():
     # only while ingesting newly fetched observations above; reapplying them here
     # would make a changed RSS_KEYWORDS secret erase previously published papers
     # from the compatibility exports (and from CI's legacy bootstrap).
+    stage_started = time.perf_counter()
     all_entries = database_items(database)
     analyze_database_items(database, all_entries)
-    all_entries = database_items(database)
+    stages["analyze"] = elapsed_ms(stage_started)
+    stage_started = time.perf_counter()
+    all_entries = database_items(database, limit=MAX_ITEMS)
     new_count = ingestion["new_observations"]
     print(f"Added {new_count} fetched matching entries.")
     generate_rss_xml(all_entries, queries)
+    stages["export"] = elapsed_ms(stage_started)
+    record_run_timings(database, ingestion["run_id"], stages)
     return {
         "run_id": ingestion["run_id"], "status": ingestion["status"],
         "successful_sources": successful_sources,
         "failed_sources": failed_sources,
+        "unchanged_sources": ingestion["unchanged_sources"],
+        "skipped_sources": skipped_sources,
+        "breaker_skipped_sources": breaker_skipped,
         "new_items": new_count,
         "published": True,
+        "stages_ms": stages,
     }
 
 def run_reanalysis_flow():
@@ -1033,7 +1464,7 @@ def run_reanalysis_flow():
     # redefine the already accepted historical collection.
     items = database_items(database)
     saved = analyze_database_items(database, items, config)
-    items = database_items(database)
+    items = database_items(database, limit=MAX_ITEMS)
     generate_rss_xml(items, queries)
     return {"status": "ok", "message": f"Updated {saved} paper analyses.", "updated": saved}
 
@@ -1076,8 +1507,16 @@ def summarize_specific_papers(target_ids):
     queries = load_config('keywords.dat', 'RSS_KEYWORDS')
     # Summarizing selected papers must regenerate the complete durable history,
     # regardless of later changes to the fetch keyword configuration.
-    generate_rss_xml(database_items(database), queries)
+    generate_rss_xml(database_items(database, limit=MAX_ITEMS), queries)
     return {"status": "ok", "message": f"Successfully summarized {updated_count} papers.", "updated": updated_count}
 
 if __name__ == '__main__':
-    run_rss_flow()
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--force-all", action="store_true", help="poll every source, ignoring the adaptive schedule")
+    parser.add_argument("--replay", nargs="?", const="latest", metavar="RUN_ID",
+                        help="ingest archived responses (latest per source, or those of RUN_ID) instead of fetching")
+    parser.add_argument("--reconcile", action="store_true", help="read every polled feed in full, ignoring high-water marks")
+    args = parser.parse_args()
+    use_profile(get_config().get("PAPER_FEED_DB_PROFILE"))
+    run_rss_flow(force_all=args.force_all or None, replay=args.replay, reconcile=args.reconcile)
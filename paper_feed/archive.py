@@ -0,0 +1,59 @@
+"""Content-addressed archive of raw feed bodies for offline replay and benchmarks."""
+import gzip
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+from .db import connect
+
+
+def body_path(directory, body_hash):
+    return Path(directory) / body_hash[:2] / f"{body_hash}.xml.gz"
+
+
+def store_body(directory, content):
+    """Gzip *content* under its sha256 unless an identical body is already stored."""
+    body_hash = hashlib.sha256(content).hexdigest()
+    path = body_path(directory, body_hash)
+    if path.exists():
+        return body_hash
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temporary = tempfile.mkstemp(prefix=".tmp-", dir=path.parent)
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            # mtime=0 keeps the compressed bytes a pure function of the body.
+            handle.write(gzip.compress(content, mtime=0))
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.unlink(temporary)
+        raise
+    return body_hash
+
+
+def load_body(directory, body_hash):
+    with gzip.open(body_path(directory, body_hash), "rb") as handle:
+        return handle.read()
+
+
+def archived_responses(database, sources, run_id=None):
+    """Return ``{source: row}`` for the archived body of each source.
+
+    With *run_id* only that run's responses are used; otherwise the most
+    recently archived response of every source.
+    """
+    sources = list(sources)
+    if not sources:
+        return {}
+    marks = ",".join("?" for _ in sources)
+    conn = connect(database)
+    try:
+        if run_id is not None:
+            rows = conn.execute(f"SELECT * FROM raw_responses WHERE run_id=? AND source IN ({marks})", (run_id, *sources)).fetchall()
+        else:
+            rows = conn.execute(f"""SELECT * FROM raw_responses r WHERE source IN ({marks})
+                AND fetched_at=(SELECT MAX(fetched_at) FROM raw_responses WHERE source=r.source)""", tuple(sources)).fetchall()
+    finally:
+        conn.close()
+    return {row["source"]: row for row in rows}
@@ -1,29 +1,151 @@
 """SQLite schema and repository primitives for Paper Feed."""
+import collections
 import contextlib
 import os
 import sqlite3
+import threading
 import uuid
 from datetime import datetime, timezone
 
-from .identity import canonical_url, fingerprint, identifiers, norm_text
-
-SCHEMA_VERSION = 2
+from .identity import canonical_url, fingerprint, identifiers, identifiers_many, norm_text
+from .projection import refresh_projection
 
 DDL = """
 CREATE TABLE IF NOT EXISTS schema_migrations (version INTEGER PRIMARY KEY, applied_at TEXT NOT NULL);
-CREATE TABLE IF NOT EXISTS papers (paper_id TEXT PRIMARY KEY, title TEXT NOT NULL, journal TEXT, published_at TEXT, canonical_url TEXT, created_at TEXT NOT NULL, updated_at TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS papers (paper_id TEXT PRIMARY KEY, title TEXT NOT NULL, journal TEXT, published_at TEXT, canonical_url TEXT, created_at TEXT NOT NULL, updated_at TEXT NOT NULL, title_norm TEXT);
 CREATE TABLE IF NOT EXISTS paper_identifiers (identifier_type TEXT NOT NULL, identifier_value TEXT NOT NULL, paper_id TEXT NOT NULL REFERENCES papers(paper_id) ON DELETE CASCADE, created_at TEXT NOT NULL, PRIMARY KEY(identifier_type, identifier_value));
 CREATE INDEX IF NOT EXISTS idx_paper_identifiers_paper ON paper_identifiers(paper_id);
 CREATE TABLE IF NOT EXISTS paper_observations (observation_id INTEGER PRIMARY KEY, paper_id TEXT NOT NULL REFERENCES papers(paper_id) ON DELETE CASCADE, source TEXT NOT NULL, source_guid TEXT, link TEXT, title TEXT, journal TEXT, published_at TEXT, summary TEXT, payload_json TEXT, first_seen_at TEXT NOT NULL, last_seen_at TEXT NOT NULL, UNIQUE(source, source_guid));
+CREATE INDEX IF NOT EXISTS idx_paper_observations_paper ON paper_observations(paper_id, observation_id);
 CREATE TABLE IF NOT EXISTS paper_review_state (paper_id TEXT PRIMARY KEY REFERENCES papers(paper_id) ON DELETE CASCADE, state TEXT NOT NULL CHECK(state IN ('inbox','favorite','archived','hidden')), state_changed_at TEXT NOT NULL, inboxed_at TEXT NOT NULL);
 CREATE TABLE IF NOT EXISTS paper_review_events (event_id INTEGER PRIMARY KEY, paper_id TEXT NOT NULL REFERENCES papers(paper_id) ON DELETE CASCADE, event_type TEXT NOT NULL, event_key TEXT UNIQUE, payload_json TEXT, created_at TEXT NOT NULL);
 CREATE TABLE IF NOT EXISTS paper_analyses (analysis_id INTEGER PRIMARY KEY, paper_id TEXT NOT NULL REFERENCES papers(paper_id) ON DELETE CASCADE, analysis_kind TEXT NOT NULL, analysis_version TEXT NOT NULL DEFAULT '', payload_json TEXT NOT NULL, updated_at TEXT NOT NULL, UNIQUE(paper_id, analysis_kind, analysis_version));
 CREATE TABLE IF NOT EXISTS paper_user_overrides (override_id INTEGER PRIMARY KEY, paper_id TEXT NOT NULL REFERENCES papers(paper_id) ON DELETE CASCADE, override_kind TEXT NOT NULL, payload_json TEXT NOT NULL, updated_at TEXT NOT NULL, UNIQUE(paper_id, override_kind));
 CREATE TABLE IF NOT EXISTS fetch_runs (run_id TEXT PRIMARY KEY, started_at TEXT NOT NULL, completed_at TEXT, status TEXT NOT NULL, dry_run INTEGER NOT NULL DEFAULT 0, summary_json TEXT);
 CREATE TABLE IF NOT EXISTS source_fetches (source_fetch_id INTEGER PRIMARY KEY, run_id TEXT NOT NULL REFERENCES fetch_runs(run_id) ON DELETE CASCADE, source TEXT NOT NULL, status TEXT NOT NULL, item_count INTEGER NOT NULL DEFAULT 0, detail_json TEXT, UNIQUE(run_id, source));
+CREATE INDEX IF NOT EXISTS idx_source_fetches_source ON source_fetches(source);
+CREATE TABLE IF NOT EXISTS source_state (source TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, filter_key TEXT, updated_at TEXT NOT NULL, body_hash TEXT, head_guid TEXT, reconciled_at TEXT);
+CREATE TABLE IF NOT EXISTS raw_responses (run_id TEXT NOT NULL REFERENCES fetch_runs(run_id) ON DELETE CASCADE, source TEXT NOT NULL, body_hash TEXT NOT NULL, status_code INTEGER, fetched_at TEXT NOT NULL, PRIMARY KEY(run_id, source));
+CREATE INDEX IF NOT EXISTS idx_raw_responses_source ON raw_responses(source, fetched_at);
 CREATE TABLE IF NOT EXISTS migration_unresolved (unresolved_id INTEGER PRIMARY KEY, source_kind TEXT NOT NULL, legacy_key TEXT NOT NULL, reason TEXT NOT NULL, payload_json TEXT, created_at TEXT NOT NULL, resolved_at TEXT, UNIQUE(source_kind, legacy_key, reason));
 """
 
+# Trigram FTS5 over observation titles/summaries, for matching keyword queries
+# against history.  External content: the triggers keep it in step with the table.
+OBSERVATION_INDEX_DDL = """
+CREATE VIRTUAL TABLE IF NOT EXISTS observation_fts USING fts5(title, summary, content='paper_observations', content_rowid='observation_id', tokenize='trigram');
+CREATE TRIGGER IF NOT EXISTS observation_fts_insert AFTER INSERT ON paper_observations BEGIN
+  INSERT INTO observation_fts(rowid, title, summary) VALUES (new.observation_id, new.title, new.summary); END;
+CREATE TRIGGER IF NOT EXISTS observation_fts_delete AFTER DELETE ON paper_observations BEGIN
+  INSERT INTO observation_fts(observation_fts, rowid, title, summary) VALUES ('delete', old.observation_id, old.title, old.summary); END;
+CREATE TRIGGER IF NOT EXISTS observation_fts_update AFTER UPDATE OF title, summary ON paper_observations BEGIN
+  INSERT INTO observation_fts(observation_fts, rowid, title, summary) VALUES ('delete', old.observation_id, old.title, old.summary);
+  INSERT INTO observation_fts(rowid, title, summary) VALUES (new.observation_id, new.title, new.summary); END;
+INSERT INTO observation_fts(observation_fts) VALUES ('rebuild');
+"""
+
+# Trigram FTS5 over what the API shows for a paper: latest observed title and
+# summary, AI abstract and translated title.  Rows carry the paper_id (not
+# indexed): papers has a TEXT primary key, so its implicit rowid may be
+# renumbered by VACUUM and cannot key the index.  Triggers on every source
+# table, deletes included, only mark papers dirty; PaperRepository.transaction()
+# re-indexes them in one batch before committing, so a paper touched by several
+# writes in one transaction (ingest: paper, observation, analyses) is indexed once.
+_PAPER_FTS_ROWS = """INSERT INTO paper_fts(paper_id, title, summary, abstract, title_zh) SELECT p.paper_id,
+    COALESCE(o.title, p.title), o.summary,
+    (SELECT json_extract(payload_json, '$.abstract') FROM paper_analyses a WHERE a.paper_id=p.paper_id
+       AND a.analysis_kind='abstract' AND json_valid(payload_json) ORDER BY a.updated_at DESC LIMIT 1),
+    (SELECT json_extract(payload_json, '$.zh') FROM paper_analyses a WHERE a.paper_id=p.paper_id
+       AND a.analysis_kind='translation' AND json_valid(payload_json) ORDER BY a.updated_at DESC LIMIT 1)
+  FROM papers p LEFT JOIN paper_observations o ON o.observation_id=(SELECT MAX(observation_id) FROM paper_observations WHERE paper_id=p.paper_id)"""
+
+
+def _dirty_marks(table):
+    """Trigger statements adding ``new.paper_id``/``old.paper_id`` to a dirty-paper *table*."""
+    # Not INSERT OR IGNORE: an outer statement's conflict clause would override it.
+    return {version: f"INSERT INTO {table} SELECT {version}.paper_id WHERE NOT EXISTS "
+                     f"(SELECT 1 FROM {table} WHERE paper_id={version}.paper_id);"
+            for version in ("new", "old")}
+
+
+PAPER_INDEX_DDL = """
+CREATE VIRTUAL TABLE IF NOT EXISTS paper_fts USING fts5(paper_id UNINDEXED, title, summary, abstract, title_zh, tokenize='trigram');
+CREATE TABLE IF NOT EXISTS paper_fts_dirty (paper_id TEXT PRIMARY KEY);
+CREATE TRIGGER IF NOT EXISTS paper_fts_paper_insert AFTER INSERT ON papers BEGIN {new} END;
+CREATE TRIGGER IF NOT EXISTS paper_fts_paper_update AFTER UPDATE OF title ON papers WHEN old.title IS NOT new.title BEGIN {new} END;
+CREATE TRIGGER IF NOT EXISTS paper_fts_paper_delete AFTER DELETE ON papers BEGIN {old} END;
+CREATE TRIGGER IF NOT EXISTS paper_fts_observation_insert AFTER INSERT ON paper_observations BEGIN {new} END;
+CREATE TRIGGER IF NOT EXISTS paper_fts_observation_update AFTER UPDATE OF paper_id, title, summary ON paper_observations
+  WHEN old.paper_id IS NOT new.paper_id OR old.title IS NOT new.title OR old.summary IS NOT new.summary BEGIN {old} {new} END;
+CREATE TRIGGER IF NOT EXISTS paper_fts_observation_delete AFTER DELETE ON paper_observations BEGIN {old} END;
+CREATE TRIGGER IF NOT EXISTS paper_fts_analysis_insert AFTER INSERT ON paper_analyses
+  WHEN new.analysis_kind IN ('abstract', 'translation') BEGIN {new} END;
+CREATE TRIGGER IF NOT EXISTS paper_fts_analysis_update AFTER UPDATE ON paper_analyses
+  WHEN new.analysis_kind IN ('abstract', 'translation') OR old.analysis_kind IN ('abstract', 'translation') BEGIN {old} {new} END;
+CREATE TRIGGER IF NOT EXISTS paper_fts_analysis_delete AFTER DELETE ON paper_analyses
+  WHEN old.analysis_kind IN ('abstract', 'translation') BEGIN {old} END;
+DELETE FROM paper_fts;
+{backfill};
+""".format(**_dirty_marks("paper_fts_dirty"), backfill=_PAPER_FTS_ROWS)
+
+SEARCH_INDEXES = {"observation_fts": OBSERVATION_INDEX_DDL, "paper_fts": PAPER_INDEX_DDL}
+
+# papers.latest_observation_id names the newest observation of each paper, so
+# readers join on it instead of a MAX() subquery per paper.  Observation ids
+# only grow, so an insert can only advance it; deletes and upserts that move an
+# observation to another paper recompute it from idx_paper_observations_paper.
+_LATEST = "(SELECT MAX(observation_id) FROM paper_observations WHERE paper_id=papers.paper_id)"
+LATEST_OBSERVATION_DDL = f"""
+CREATE TRIGGER IF NOT EXISTS papers_latest_observation_insert AFTER INSERT ON paper_observations BEGIN
+  UPDATE papers SET latest_observation_id=new.observation_id WHERE paper_id=new.paper_id
+    AND (latest_observation_id IS NULL OR latest_observation_id < new.observation_id); END;
+CREATE TRIGGER IF NOT EXISTS papers_latest_observation_move AFTER UPDATE OF paper_id ON paper_observations
+  WHEN old.paper_id IS NOT new.paper_id BEGIN
+  UPDATE papers SET latest_observation_id={_LATEST} WHERE paper_id IN (old.paper_id, new.paper_id); END;
+CREATE TRIGGER IF NOT EXISTS papers_latest_observation_delete AFTER DELETE ON paper_observations BEGIN
+  UPDATE papers SET latest_observation_id={_LATEST} WHERE paper_id=old.paper_id AND latest_observation_id=old.observation_id; END;
+UPDATE papers SET latest_observation_id={_LATEST};
+"""
+
+# paper_projection holds each paper's feed item and API record (see projection.py).
+# As for paper_fts, triggers only mark papers dirty when a column the projection
+# reads changes, and PaperRepository.transaction() rebuilds them before commit.
+# Review state is not projected: readers join it, so review actions mark nothing.
+PROJECTION_DDL = """
+CREATE TABLE IF NOT EXISTS paper_projection (paper_id TEXT PRIMARY KEY REFERENCES papers(paper_id) ON DELETE CASCADE, item_json TEXT NOT NULL, record_json TEXT NOT NULL, updated_at TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS paper_projection_dirty (paper_id TEXT PRIMARY KEY);
+CREATE TRIGGER IF NOT EXISTS paper_projection_paper_insert AFTER INSERT ON papers BEGIN {new} END;
+CREATE TRIGGER IF NOT EXISTS paper_projection_paper_update AFTER UPDATE OF title, journal, published_at, canonical_url, latest_observation_id ON papers
+  WHEN old.title IS NOT new.title OR old.journal IS NOT new.journal OR old.published_at IS NOT new.published_at
+    OR old.canonical_url IS NOT new.canonical_url OR old.latest_observation_id IS NOT new.latest_observation_id BEGIN {new} END;
+CREATE TRIGGER IF NOT EXISTS paper_projection_observation_update AFTER UPDATE OF paper_id, source_guid, link, title, journal, published_at, summary, payload_json ON paper_observations
+  WHEN old.paper_id IS NOT new.paper_id OR old.source_guid IS NOT new.source_guid OR old.link IS NOT new.link
+    OR old.title IS NOT new.title OR old.journal IS NOT new.journal OR old.published_at IS NOT new.published_at
+    OR old.summary IS NOT new.summary OR old.payload_json IS NOT new.payload_json BEGIN {old} {new} END;
+CREATE TRIGGER IF NOT EXISTS paper_projection_identifier_insert AFTER INSERT ON paper_identifiers
+  WHEN new.identifier_type='legacy_id' BEGIN {new} END;
+CREATE TRIGGER IF NOT EXISTS paper_projection_identifier_update AFTER UPDATE ON paper_identifiers
+  WHEN new.identifier_type='legacy_id' OR old.identifier_type='legacy_id' BEGIN {old} {new} END;
+CREATE TRIGGER IF NOT EXISTS paper_projection_identifier_delete AFTER DELETE ON paper_identifiers
+  WHEN old.identifier_type='legacy_id' BEGIN {old} END;
+CREATE TRIGGER IF NOT EXISTS paper_projection_analysis_insert AFTER INSERT ON paper_analyses
+  WHEN new.analysis_kind IN ('abstract', 'translation') BEGIN {new} END;
+CREATE TRIGGER IF NOT EXISTS paper_projection_analysis_update AFTER UPDATE OF paper_id, analysis_kind, analysis_version, payload_json ON paper_analyses
+  WHEN (new.analysis_kind IN ('abstract', 'translation') OR old.analysis_kind IN ('abstract', 'translation'))
+    AND (old.paper_id IS NOT new.paper_id OR old.analysis_kind IS NOT new.analysis_kind
+         OR old.analysis_version IS NOT new.analysis_version OR old.payload_json IS NOT new.payload_json) BEGIN {old} {new} END;
+CREATE TRIGGER IF NOT EXISTS paper_projection_analysis_delete AFTER DELETE ON paper_analyses
+  WHEN old.analysis_kind IN ('abstract', 'translation') BEGIN {old} END;
+CREATE TRIGGER IF NOT EXISTS paper_projection_override_insert AFTER INSERT ON paper_user_overrides
+  WHEN new.override_kind='user_correction' BEGIN {new} END;
+CREATE TRIGGER IF NOT EXISTS paper_projection_override_update AFTER UPDATE OF paper_id, override_kind, payload_json ON paper_user_overrides
+  WHEN (new.override_kind='user_correction' OR old.override_kind='user_correction')
+    AND (old.paper_id IS NOT new.paper_id OR old.override_kind IS NOT new.override_kind OR old.payload_json IS NOT new.payload_json) BEGIN {old} {new} END;
+CREATE TRIGGER IF NOT EXISTS paper_projection_override_delete AFTER DELETE ON paper_user_overrides
+  WHEN old.override_kind='user_correction' BEGIN {old} END;
+INSERT INTO paper_projection_dirty SELECT paper_id FROM papers WHERE paper_id NOT IN (SELECT paper_id FROM paper_projection_dirty);
+""".format(**_dirty_marks("paper_projection_dirty"))
+
 COUNT_TABLES = {
     "papers": "papers", "identifiers": "paper_identifiers", "observations": "paper_observations",
     "review_states": "paper_review_state", "review_events": "paper_review_events",
@@ -52,24 +174,441 @@ def _migrate_review_state_v1(conn):
     conn.execute("DROP TABLE paper_review_state_v1")
 
 
-def connect(path="data/paper_feed.sqlite3"):
+def _add_missing_columns(conn, table, columns):
+    """Add columns introduced after *table* was first created by an older release."""
+    existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    for name, declaration in columns.items():
+        if name not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {declaration}")
+
+
+def _backfill_title_norms(conn):
+    """Fill ``papers.title_norm`` for rows written without it (older releases, other tools)."""
+    rows = conn.execute("SELECT rowid, title FROM papers WHERE title_norm IS NULL").fetchall()
+    if rows:
+        conn.executemany("UPDATE papers SET title_norm=? WHERE rowid=?", [(norm_text(title), rowid) for rowid, title in rows])
+    return len(rows)
+
+
+def _statements(script):
+    """Split a DDL script into single statements (trigger bodies included)."""
+    statement = ""
+    for line in script.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            yield statement
+            statement = ""
+    if statement.strip():
+        yield statement
+
+
+def _execute_script(conn, script):
+    # Not executescript(): that would commit the migration transaction first.
+    for statement in _statements(script):
+        conn.execute(statement)
+
+
+def _create_search_indexes(conn):
+    """Create and backfill each FTS5 index; a no-op where SQLite lacks FTS5."""
+    for name, ddl in SEARCH_INDEXES.items():
+        if has_search_index(conn, name):
+            continue
+        conn.execute("SAVEPOINT search_index")
+        try:
+            _execute_script(conn, ddl)
+        except sqlite3.OperationalError:
+            # No FTS5/trigram in this SQLite build; searches and previews scan instead.
+            conn.execute("ROLLBACK TO search_index")
+        conn.execute("RELEASE search_index")
+
+
+def has_search_index(conn, name):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (name,)).fetchone() is not None
+
+
+def refresh_paper_index(conn):
+    """Re-index the papers marked dirty since the last refresh; returns how many."""
+    dirty = conn.execute("SELECT count(*) FROM paper_fts_dirty").fetchone()[0]
+    if dirty:
+        # One pass over the index rows; deleted papers simply are not re-inserted.
+        conn.execute("DELETE FROM paper_fts WHERE paper_id IN (SELECT paper_id FROM paper_fts_dirty)")
+        conn.execute(_PAPER_FTS_ROWS + " WHERE p.paper_id IN (SELECT paper_id FROM paper_fts_dirty)")
+        conn.execute("DELETE FROM paper_fts_dirty")
+    return dirty
+
+
+# Named connection tunings, applied to every new connection.  "durable" keeps
+# SQLite's defaults: each commit is fsynced.  "throughput" suits a single-user
+# machine: under WAL (which migrate() enables) synchronous=NORMAL fsyncs only at
+# checkpoints, so a power cut may lose the last commits but cannot corrupt the
+# file; reads go through a memory map and a larger page cache, temporary sort
+# tables stay in memory and checkpoints run less often.
+PROFILES = {
+    "durable": {},
+    "throughput": {"synchronous": "NORMAL", "mmap_size": 256 * 1024 * 1024, "cache_size": -64 * 1024,
+                   "temp_store": "MEMORY", "wal_autocheckpoint": 4000},
+}
+DEFAULT_PROFILE = "durable"
+PROFILE_ENV = "PAPER_FEED_DB_PROFILE"
+_profile = None
+
+
+def use_profile(name=None):
+    """Select the profile of connections opened from now on; returns its name.
+
+    Without *name* the ``PAPER_FEED_DB_PROFILE`` environment variable decides,
+    as it does for connections opened before any call.
+    """
+    global _profile
+    _profile = _profile_name(name)
+    return _profile
+
+
+def _profile_name(name=None):
+    name = name or _profile or os.environ.get(PROFILE_ENV) or DEFAULT_PROFILE
+    if name not in PROFILES:
+        raise ValueError(f"unknown database profile {name!r} (expected one of: {', '.join(PROFILES)})")
+    return name
+
+
+def _open(path, profile=None, **options):
     os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
-    conn = sqlite3.connect(path)
+    pragmas = PROFILES[_profile_name(profile)]
+    conn = sqlite3.connect(path, **options)
     conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA journal_mode=WAL")
     conn.execute("PRAGMA foreign_keys=ON")
     conn.execute("PRAGMA busy_timeout=5000")
-    conn.executescript(DDL)
-    _migrate_review_state_v1(conn)
-    conn.execute("INSERT OR IGNORE INTO schema_migrations(version, applied_at) VALUES (?, ?)", (SCHEMA_VERSION, now()))
+    for pragma, value in pragmas.items():
+        conn.execute(f"PRAGMA {pragma}={value}")
+    return conn
+
+
+def _add_title_norm(conn):
+    # norm_text folds Unicode word characters, which SQL cannot express, so the
+    # column is written from Python and indexed for unique_title_paper_id.
+    _add_missing_columns(conn, "papers", {"title_norm": "TEXT"})
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_papers_title_norm ON papers(title_norm)")
+    _backfill_title_norms(conn)
+
+
+def _add_latest_observation(conn):
+    _add_missing_columns(conn, "papers", {"latest_observation_id": "INTEGER"})
+    _execute_script(conn, LATEST_OBSERVATION_DDL)
+
+
+def _create_projection(conn):
+    # Marks every paper dirty; migrate() rebuilds them once all steps are applied.
+    _execute_script(conn, PROJECTION_DDL)
+
+
+def _add_publication_order(conn):
+    _add_missing_columns(conn, "paper_projection", {"published_ts": "INTEGER", "legacy_order": "INTEGER"})
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_paper_projection_published ON paper_projection(published_ts)")
+    conn.execute("""INSERT INTO paper_projection_dirty SELECT paper_id FROM paper_projection
+        WHERE paper_id NOT IN (SELECT paper_id FROM paper_projection_dirty)""")
+
+
+def _key_paper_index(conn):
+    """Rebuild paper_fts keyed by paper_id instead of the renumberable papers.rowid."""
+    if not has_search_index(conn, "paper_fts"):
+        return
+    conn.execute("DROP TRIGGER IF EXISTS paper_fts_paper_delete")
+    conn.execute("DROP TABLE paper_fts")
+    _create_search_indexes(conn)
+
+
+def _drop_head_published(conn):
+    """Remove ``source_state.head_published``: only the head GUID cuts a feed now."""
+    if "head_published" not in {row[1] for row in conn.execute("PRAGMA table_info(source_state)")}:
+        return
+    try:
+        conn.execute("ALTER TABLE source_state DROP COLUMN head_published")
+    except sqlite3.OperationalError:
+        pass  # SQLite before 3.35 cannot drop columns; the column is simply never read.
+
+
+def ensure_projection(conn):
+    """Rebuild projection rows left dirty by writes made outside PaperRepository.transaction()."""
+    if not conn.execute("SELECT 1 FROM paper_projection_dirty LIMIT 1").fetchone():
+        return
+    if conn.in_transaction:
+        refresh_projection(conn)
+        return
+    with PaperRepository(conn).transaction():
+        pass
+
+
+# Ordered schema steps; PRAGMA user_version is the last one applied.  Databases
+# written before the runner existed report 0 and replay every step, so each
+# step must tolerate finding its work already done.  Append, never reorder.
+MIGRATIONS = (
+    (1, "base schema", lambda conn: _execute_script(conn, DDL)),
+    (2, "single review state column", _migrate_review_state_v1),
+    (3, "source validator and high-water columns", lambda conn: _add_missing_columns(
+        conn, "source_state", {"body_hash": "TEXT", "head_guid": "TEXT", "reconciled_at": "TEXT"})),
+    (4, "normalized paper titles", _add_title_norm),
+    (5, "full-text search indexes", _create_search_indexes),
+    (6, "latest observation pointer", _add_latest_observation),
+    (7, "paper read projection", _create_projection),
+    (8, "projected publication timestamps", _add_publication_order),
+    (9, "paper search index keyed by paper_id", _key_paper_index),
+    (10, "drop the unused high-water date", _drop_head_published),
+)
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    """Apply pending steps under one write lock; returns the versions applied.
+
+    A current database costs one pragma read.  Otherwise ``BEGIN IMMEDIATE``
+    serializes migrating processes and the version is read again under the
+    lock, so each step runs once; a failing step rolls back the whole batch.
+    """
+    if schema_version(conn) >= SCHEMA_VERSION:
+        return []
+    # WAL is persistent, and the journal mode cannot change inside a transaction.
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        current = schema_version(conn)
+        applied = []
+        for version, _, step in MIGRATIONS:
+            if version > current:
+                step(conn)
+                conn.execute("INSERT OR IGNORE INTO schema_migrations(version, applied_at) VALUES (?, ?)", (version, now()))
+                applied.append(version)
+        if applied:
+            conn.execute(f"PRAGMA user_version={applied[-1]}")
+            # Derived rows are rebuilt against the final schema, whichever steps ran.
+            refresh_projection(conn)
+    except BaseException:
+        conn.rollback()
+        raise
     conn.commit()
+    return applied
+
+
+def connect(path="data/paper_feed.sqlite3", profile=None):
+    conn = _open(path, profile)
+    migrate(conn)
     return conn
 
 
+def _file_key(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_dev, stat.st_ino
+
+
+class PooledConnection(sqlite3.Connection):
+    """A connection whose ``close()`` hands it back to its :class:`ConnectionPool`."""
+
+    pool = None
+
+    def close(self):
+        if self.pool is None:
+            super().close()
+        else:
+            self.pool.release(self)
+
+
+class ConnectionPool:
+    """Ready connections to one database file, migrated once when the pool opens.
+
+    A connection is checked out by one caller at a time, so it may serve other
+    threads over its life; ``release`` rolls back anything left uncommitted.
+    While the pool is open at least one connection to the file stays open,
+    which pins its inode: a file replaced at the same path has a new
+    ``(st_dev, st_ino)`` and gets a new pool.
+    """
+
+    def __init__(self, path, size=4):
+        self.path = path
+        self.size = size
+        self.lock = threading.Lock()
+        self.closed = False
+        first = self._new()
+        migrate(first)
+        self.key = _file_key(path)
+        self.idle = [first]
+
+    def _new(self):
+        conn = _open(self.path, factory=PooledConnection, check_same_thread=False)
+        conn.pool = self
+        return conn
+
+    def acquire(self):
+        with self.lock:
+            if self.idle:
+                return self.idle.pop()
+        return self._new()
+
+    def release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        conn.row_factory = sqlite3.Row
+        with self.lock:
+            if not self.closed and len(self.idle) < self.size:
+                self.idle.append(conn)
+                return
+        sqlite3.Connection.close(conn)
+
+    def close(self):
+        """Close idle connections; checked-out ones close when they are released."""
+        with self.lock:
+            idle, self.idle, self.closed = self.idle, [], True
+        for conn in idle:
+            sqlite3.Connection.close(conn)
+
+
+MAX_POOLS = 8
+_POOLS = collections.OrderedDict()
+_POOLS_LOCK = threading.Lock()
+
+
+def pooled_connect(path="data/paper_feed.sqlite3"):
+    """A ready connection to *path* from this process's pool; ``close()`` returns it.
+
+    Only the first checkout per database file (or per replacement of that
+    file) runs :func:`migrate`, which :func:`connect` runs every time.
+    The least recently used of more than ``MAX_POOLS`` pools is closed.
+    """
+    path = os.path.abspath(path)
+    key = _file_key(path)
+    with _POOLS_LOCK:
+        pool = _POOLS.get(path)
+        if pool is not None and pool.key != key:
+            del _POOLS[path]
+            pool.close()
+            pool = None
+        if pool is None:
+            pool = _POOLS[path] = ConnectionPool(path)
+            while len(_POOLS) > MAX_POOLS:
+                _POOLS.popitem(last=False)[1].close()
+        else:
+            _POOLS.move_to_end(path)
+    return pool.acquire()
+
+
+def close_pools():
+    """Close every pooled connection not currently checked out."""
+    with _POOLS_LOCK:
+        pools = list(_POOLS.values())
+        _POOLS.clear()
+    for pool in pools:
+        pool.close()
+
+
 def database_counts(conn):
     return {name: conn.execute(f"SELECT count(*) FROM {table}").fetchone()[0] for name, table in COUNT_TABLES.items()}
 
 
+def record_choices(record):
+    """Identities to match *record* by, strongest first.
+
+    A title/journal/date fingerprint is only a fallback for records with no
+    durable identifier at all.  Publisher front matter can legitimately share
+    all three fields while carrying distinct DOI/PII/URL identities.  Treating
+    the fingerprint as an additional matching key merged those distinct legacy
+    RSS entries during CI bootstrap.
+    """
+    return _with_fingerprint(record, identifiers(record))
+
+
+def _with_fingerprint(record, choices):
+    if not choices:
+        paper_fingerprint = fingerprint(record)
+        if paper_fingerprint:
+            choices.append(paper_fingerprint)
+    return choices
+
+
+def legacy_choices(legacy_key):
+    """Keys ``IdentityBatch.legacy_paper_id`` may consult for *legacy_key*."""
+    return [("legacy_id", str(legacy_key))] + record_choices({"link": legacy_key})
+
+
+class IdentityBatch:
+    """Identity resolution for many records from one bulk read of ``paper_identifiers``.
+
+    Records are resolved one by one against an in-memory map, so a record sees
+    the papers and identifiers claimed by the records before it exactly as
+    repeated ``PaperRepository.resolve`` calls would.  Writes are queued and
+    applied by :meth:`flush` with ``executemany``: new papers, then touched
+    papers in record order, then identifier claims.
+    """
+
+    def __init__(self, conn, keys):
+        self.conn = conn
+        self.known = self._load(set(keys))
+        self.new_papers, self.touched, self.claims = [], [], []
+
+    def _load(self, keys):
+        if not keys:
+            return {}
+        self.conn.execute("""CREATE TEMP TABLE IF NOT EXISTS resolve_keys (identifier_type TEXT NOT NULL,
+            identifier_value TEXT NOT NULL, PRIMARY KEY(identifier_type, identifier_value)) WITHOUT ROWID""")
+        self.conn.executemany("INSERT OR IGNORE INTO resolve_keys VALUES (?, ?)", keys)
+        try:
+            rows = self.conn.execute("""SELECT k.identifier_type, k.identifier_value, i.paper_id FROM resolve_keys k
+                JOIN paper_identifiers i ON i.identifier_type=k.identifier_type AND i.identifier_value=k.identifier_value""")
+            return {(row[0], row[1]): row[2] for row in rows}
+        finally:
+            self.conn.execute("DELETE FROM resolve_keys")
+
+    def resolve(self, record, create=True, choices=None):
+        """Return a durable paper_id; title-only records never merge."""
+        choices = record_choices(record) if choices is None else choices
+        matched_ids = {self.known[key] for key in choices if key in self.known}
+        if len(matched_ids) > 1:
+            raise ValueError("conflicting existing paper identities")
+        stamp = now()
+        if matched_ids:
+            paper_id = matched_ids.pop()
+            self.touched.append((stamp, canonical_url(record.get("link")), paper_id))
+        elif not create:
+            return None
+        else:
+            paper_id = str(uuid.uuid4())
+            title = record.get("title") or "(untitled)"
+            self.new_papers.append((paper_id, title, norm_text(title), record.get("journal"),
+                                    record.get("pub_date"), canonical_url(record.get("link")), stamp, stamp))
+        self.claim(paper_id, choices, stamp)
+        return paper_id
+
+    def claim(self, paper_id, choices, stamp=None, message="conflicting existing paper identities"):
+        """Attach *choices* to *paper_id*; claims before a conflicting one stand."""
+        stamp = stamp or now()
+        for key in choices:
+            owner = self.known.get(key)
+            if owner is not None and owner != paper_id:
+                raise ValueError(message)
+            if owner is None:
+                self.known[key] = paper_id
+                self.claims.append((key[0], key[1], paper_id, stamp))
+
+    def legacy_paper_id(self, legacy_key):
+        return self.known.get(("legacy_id", str(legacy_key))) or self.resolve({"link": legacy_key}, create=False)
+
+    def add_legacy_alias(self, paper_id, legacy_key):
+        if legacy_key:
+            self.claim(paper_id, [("legacy_id", str(legacy_key))], message="conflicting legacy id alias")
+
+    def flush(self):
+        self.conn.executemany("""INSERT INTO papers(paper_id, title, title_norm, journal, published_at, canonical_url,
+            created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)""", self.new_papers)
+        self.conn.executemany("UPDATE papers SET updated_at=?, canonical_url=COALESCE(canonical_url, ?) WHERE paper_id=?",
+                              self.touched)
+        self.conn.executemany("INSERT OR IGNORE INTO paper_identifiers VALUES (?, ?, ?, ?)", self.claims)
+        self.new_papers, self.touched, self.claims = [], [], []
+
+
 class PaperRepository:
     def __init__(self, conn):
         self.conn = conn
@@ -79,97 +618,74 @@ class PaperRepository:
         self.conn.execute("BEGIN IMMEDIATE")
         try:
             yield self
+            if has_search_index(self.conn, "paper_fts"):
+                refresh_paper_index(self.conn)
+            refresh_projection(self.conn)
         except Exception:
             self.conn.rollback()
             raise
         else:
             self.conn.commit()
 
-    def resolve(self, record, create=True):
-        """Return a durable paper_id; title-only records never merge."""
-        choices = identifiers(record)
-        # A title/journal/date fingerprint is only a fallback for records with
-        # no durable identifier at all.  Publisher front matter can legitimately
-        # share all three fields while carrying distinct DOI/PII/URL identities.
-        # Treating the fingerprint as an additional matching key merged those
-        # distinct legacy RSS entries during CI bootstrap.
-        if not choices:
-            paper_fingerprint = fingerprint(record)
-            if paper_fingerprint:
-                choices.append(paper_fingerprint)
-        matched_ids = {
-            row[0]
-            for kind, value in choices
-            for row in self.conn.execute(
-                "SELECT paper_id FROM paper_identifiers WHERE identifier_type=? AND identifier_value=?",
-                (kind, value),
-            )
-        }
-        if len(matched_ids) > 1:
-            raise ValueError("conflicting existing paper identities")
+    def identity_batch(self, keys):
+        return IdentityBatch(self.conn, keys)
 
-        stamp = now()
-        if matched_ids:
-            paper_id = matched_ids.pop()
-            self.conn.execute(
-                "UPDATE papers SET updated_at=?, canonical_url=COALESCE(canonical_url, ?) WHERE paper_id=?",
-                (stamp, canonical_url(record.get("link")), paper_id),
-            )
-        elif not create:
-            return None
-        else:
-            paper_id = str(uuid.uuid4())
-            self.conn.execute(
-                "INSERT INTO papers VALUES (?, ?, ?, ?, ?, ?, ?)",
-                (paper_id, record.get("title") or "(untitled)", record.get("journal"),
-                 record.get("pub_date"), canonical_url(record.get("link")), stamp, stamp),
-            )
+    def resolve_many(self, records, create=True, conflicts=None):
+        """Resolve *records* in order with one identifier read and batched writes.
 
-        self._claim_identifiers(paper_id, choices, stamp)
-        return paper_id
+        Returns one paper_id (or None, for ``create=False`` misses) per record.
+        A conflicting record raises ``ValueError`` unless a *conflicts* list is
+        given, which then collects ``(index, error)`` while its slot is None.
+        """
+        choices = [_with_fingerprint(record, found) for record, found in zip(records, identifiers_many(records))]
+        batch = self.identity_batch(key for keys in choices for key in keys)
+        paper_ids = []
+        for index, (record, keys) in enumerate(zip(records, choices)):
+            try:
+                paper_ids.append(batch.resolve(record, create, keys))
+            except ValueError as error:
+                if conflicts is None:
+                    raise
+                conflicts.append((index, error))
+                paper_ids.append(None)
+        batch.flush()
+        return paper_ids
+
+    def resolve(self, record, create=True):
+        """Return a durable paper_id; title-only records never merge."""
+        return self.resolve_many([record], create)[0]
 
     def attach_record_identifiers(self, paper_id, record):
         """Attach durable identifiers after an importer matched a legacy alias."""
-        choices = identifiers(record)
-        if not choices:
-            paper_fingerprint = fingerprint(record)
-            if paper_fingerprint:
-                choices.append(paper_fingerprint)
-        self._claim_identifiers(paper_id, choices, now())
-
-    def _claim_identifiers(self, paper_id, choices, stamp):
-        for kind, value in choices:
-            row = self.conn.execute(
-                "SELECT paper_id FROM paper_identifiers WHERE identifier_type=? AND identifier_value=?",
-                (kind, value),
-            ).fetchone()
-            if row and row[0] != paper_id:
-                raise ValueError("conflicting existing paper identities")
-            self.conn.execute(
-                "INSERT OR IGNORE INTO paper_identifiers VALUES (?, ?, ?, ?)",
-                (kind, value, paper_id, stamp),
-            )
+        choices = record_choices(record)
+        batch = self.identity_batch(choices)
+        try:
+            batch.claim(paper_id, choices)
+        finally:
+            batch.flush()
 
     def ensure_inbox(self, paper_id):
+        self.ensure_inbox_many([paper_id])
+
+    def ensure_inbox_many(self, paper_ids):
         stamp = now()
-        self.conn.execute(
-            "INSERT OR IGNORE INTO paper_review_state VALUES (?, 'inbox', ?, ?)",
-            (paper_id, stamp, stamp),
-        )
+        self.conn.executemany("INSERT OR IGNORE INTO paper_review_state VALUES (?, 'inbox', ?, ?)",
+                              [(paper_id, stamp, stamp) for paper_id in paper_ids])
 
     def legacy_paper_id(self, legacy_key):
-        row = self.conn.execute(
-            "SELECT paper_id FROM paper_identifiers WHERE identifier_type='legacy_id' AND identifier_value=?",
-            (str(legacy_key),),
-        ).fetchone()
-        return (row[0] if row else None) or self.resolve({"link": legacy_key}, create=False)
+        batch = self.identity_batch(legacy_choices(legacy_key))
+        try:
+            return batch.legacy_paper_id(legacy_key)
+        finally:
+            batch.flush()
 
     def unique_title_paper_id(self, title):
         normalized = norm_text(title)
         if not normalized:
             return None, "empty title"
-        rows = self.conn.execute("SELECT paper_id, title FROM papers").fetchall()
-        candidates = [row[0] for row in rows if norm_text(row[1]) == normalized]
+        _backfill_title_norms(self.conn)
+        candidates = [row[0] for row in self.conn.execute(
+            "SELECT paper_id FROM papers WHERE title_norm=? LIMIT 2", (normalized,))]
         if len(candidates) == 1:
             return candidates[0], None
         if not candidates:
@@ -177,15 +693,8 @@ class PaperRepository:
         return None, "ambiguous normalized title"
 
     def add_legacy_alias(self, paper_id, legacy_key):
-        if not legacy_key:
-            return
-        row = self.conn.execute(
-            "SELECT paper_id FROM paper_identifiers WHERE identifier_type='legacy_id' AND identifier_value=?",
-            (str(legacy_key),),
-        ).fetchone()
-        if row and row[0] != paper_id:
-            raise ValueError("conflicting legacy id alias")
-        self.conn.execute(
-            "INSERT OR IGNORE INTO paper_identifiers VALUES ('legacy_id', ?, ?, ?)",
-            (str(legacy_key), paper_id, now()),
-        )
+        batch = self.identity_batch([("legacy_id", str(legacy_key))] if legacy_key else [])
+        try:
+            batch.add_legacy_alias(paper_id, legacy_key)
+        finally:
+            batch.flush()
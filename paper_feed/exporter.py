@@ -5,29 +5,23 @@ from email.utils import format_datetime, parsedate_to_datetime
 from pathlib import Path
 from xml.etree import ElementTree as ET
 
-from .db import connect
+from .db import connect, ensure_projection
+from .keywords import query_keywords
+from .projection import classification, legacy_order, published_timestamp
 
 
-def _payload(value):
-    try:
-        parsed = json.loads(value or "{}")
-        return parsed if isinstance(parsed, dict) else {}
-    except (TypeError, json.JSONDecodeError):
-        return {}
-
-
-def _date_key(value):
-    try:
-        text = str(value or "")
-        parsed = datetime.fromisoformat(text.replace("Z", "+00:00"))
-    except ValueError:
-        try: parsed = parsedate_to_datetime(text)
-        except (TypeError, ValueError): return float("-inf")
-    if parsed.tzinfo is None: parsed = parsed.replace(tzinfo=timezone.utc)
-    return parsed.timestamp()
+def _date_key(item):
+    # database_items carries the projection's epoch seconds; other items are parsed.
+    stamp = item["_published_ts"] if "_published_ts" in item else published_timestamp(item.get("pub_date"))
+    return float("-inf") if stamp is None else stamp
 
 
-def _rss_date(value):
+def _rss_date(item):
+    if "_published_ts" in item:
+        stamp = item["_published_ts"]
+        stamp = datetime.now(timezone.utc) if stamp is None else datetime.fromtimestamp(stamp, timezone.utc)
+        return format_datetime(stamp, usegmt=True)
+    value = item.get("pub_date")
     try:
         stamp = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
     except ValueError:
@@ -38,80 +32,60 @@ def _rss_date(value):
 
 
 def _legacy_order(item):
-    try:
-        return int(item.get("_legacy_order"))
-    except (TypeError, ValueError):
-        return float("inf")
+    order = legacy_order(item)
+    return float("inf") if order is None else order
 
 
 def _sort_items(items):
     """Newest first, preserving legacy RSS order for equal timestamps."""
-    return sorted(items, key=lambda item: (-_date_key(item.get("pub_date")), _legacy_order(item), item["paper_id"]))
+    return sorted(items, key=lambda item: (-_date_key(item), _legacy_order(item), item["paper_id"]))
+
 
+def database_items(database, predicate=None, limit=None):
+    """Return durable papers newest first, in ``_sort_items`` order.
 
-def database_items(database, predicate=None):
-    """Return all durable papers (the caller may impose a display predicate)."""
+    The caller may impose a display predicate; *limit* stops reading once that
+    many items passed it, so an export never loads the full history.  Each item
+    carries the projection's ``_published_ts``, so exporting it parses no dates.
+    """
     conn = connect(database)
     try:
-        rows = conn.execute("""SELECT p.paper_id,p.title,p.journal,p.published_at,p.canonical_url,
-          o.source_guid,o.link,o.title observed_title,o.journal observed_journal,o.published_at observed_published_at,o.summary,o.payload_json
-          FROM papers p LEFT JOIN paper_observations o ON o.observation_id=(SELECT MAX(observation_id) FROM paper_observations WHERE paper_id=p.paper_id)
-          ORDER BY COALESCE(o.published_at,p.published_at) DESC,p.paper_id""").fetchall()
+        ensure_projection(conn)
         items = []
-        for row in rows:
-            item = _payload(row["payload_json"])
-            item.update({"paper_id": row["paper_id"], "id": item.get("id") or row["source_guid"] or row["paper_id"],
-                         "link": row["link"] or item.get("link") or row["canonical_url"] or "",
-                         "title": row["observed_title"] or item.get("title") or row["title"],
-                         "journal": row["observed_journal"] or item.get("journal") or row["journal"] or "",
-                         "pub_date": row["observed_published_at"] or item.get("pub_date") or row["published_at"] or "",
-                         "summary": row["summary"] or item.get("summary") or ""})
-            item["legacy_ids"] = [alias[0] for alias in conn.execute(
-                "SELECT identifier_value FROM paper_identifiers WHERE paper_id=? AND identifier_type='legacy_id'", (row["paper_id"],)
-            )]
-            for table, column, kind in (("paper_analyses", "analysis_kind", "translation"), ("paper_analyses", "analysis_kind", "abstract"), ("paper_user_overrides", "override_kind", "user_correction")):
-                extra = conn.execute(f"SELECT payload_json FROM {table} WHERE paper_id=? AND {column}=?", (row["paper_id"], kind)).fetchone()
-                if extra:
-                    item[kind] = _payload(extra[0])
+        for item_json, published_ts in conn.execute("""SELECT item_json, published_ts FROM paper_projection
+                ORDER BY published_ts DESC, legacy_order NULLS LAST, paper_id"""):
+            item = json.loads(item_json)
+            item["_published_ts"] = published_ts
             if predicate is None or predicate(item):
                 items.append(item)
-        # Stable newest-first ordering before any export limit is applied.
-        return _sort_items(items)
+                if limit is not None and len(items) >= limit:
+                    break
+        return items
     finally:
         conn.close()
 
 
-def _labels(value):
-    if isinstance(value, list): return value
-    return [value] if value else []
-
-
 def export_items(items, xml_path, json_path, queries=(), limit=1000, atomic_write=None):
     """Atomically write legacy XML/JSON; limits only the presentation, never DB."""
     items = _sort_items(items)[:limit]
     data = []
     for item in items:
-        translation, abstract, correction = (item.get("translation") or {}), (item.get("abstract") or {}), (item.get("user_correction") or {})
-        methods = _labels(translation.get("methods", translation.get("method", [])))
-        topics = _labels(translation.get("topics", translation.get("topic", [])))
-        for key in ("methods", "topics", "theories", "context", "subjects", "novelty_score"):
-            if key in correction and correction[key] not in (None, [], ""):
-                if key == "methods": methods = _labels(correction[key])
-                elif key == "topics": topics = _labels(correction[key])
-                else: translation[key] = correction[key]
+        correction = item.get("user_correction") or {}
+        fields = classification(item.get("translation") or {}, item.get("abstract") or {}, correction)
+        # The legacy feed marks any stored correction as a user classification.
+        fields.update(classification_source="user" if correction else "gpt", user_corrected=bool(correction))
         data.append({"paper_id": item["paper_id"], "id": item["id"], "link": item["link"], "title": item["title"],
-          "title_zh": translation.get("zh", ""), "method": (methods[0].get("name") if methods and isinstance(methods[0], dict) else (methods[0] if methods else "Qualitative")),
-          "topic": (topics[0].get("name") if topics and isinstance(topics[0], dict) else (topics[0] if topics else "Other Marketing")),
-          "methods": methods, "topics": topics, "theories": translation.get("theories", []), "context": translation.get("context", []), "subjects": translation.get("subjects", []),
-          "novelty_score": translation.get("novelty_score"), "classification_source": "user" if correction else "gpt", "classification_version": translation.get("classification_version", ""), "user_corrected": bool(correction),
-          "summary": item.get("summary", ""), "abstract": abstract.get("abstract", ""), "raw_abstract": abstract.get("raw_abstract", ""), "abstract_source": abstract.get("source", ""), "journal": item.get("journal", ""), "pub_date": str(item.get("pub_date") or "")})
-    payload = {"generated_at": datetime.now(timezone.utc).isoformat(), "keywords": sorted({p.strip() for q in queries for p in q.split("AND") if p.strip()}, key=str.lower), "items": data}
+          "title_zh": fields["title_zh"], "method": fields["method"], "topic": fields["topic"],
+          "methods": fields["methods"], "topics": fields["topics"], "theories": fields["theories"], "context": fields["context"], "subjects": fields["subjects"],
+          "novelty_score": fields["novelty_score"], "classification_source": fields["classification_source"], "classification_version": fields["classification_version"], "user_corrected": fields["user_corrected"],
+          "summary": item.get("summary", ""), "abstract": fields["abstract"], "raw_abstract": fields["raw_abstract"], "abstract_source": fields["abstract_source"], "journal": item.get("journal", ""), "pub_date": str(item.get("pub_date") or "")})
+    payload = {"generated_at": datetime.now(timezone.utc).isoformat(), "keywords": query_keywords(queries), "items": data}
     root = ET.Element("rss", version="2.0"); channel = ET.SubElement(root, "channel")
     for tag, value in (("title", "My Customized Papers"), ("link", "https://github.com/your_username/your_repo"), ("description", "Aggregated research papers")):
         ET.SubElement(channel, tag).text = value
-    for item in data:
+    for source, item in zip(items, data):
         node = ET.SubElement(channel, "item")
-        for tag, value in (("title", item["title"]), ("link", item["link"]), ("description", item["summary"]), ("author", item["journal"]), ("guid", item["id"]), ("pubDate", _rss_date(item["pub_date"]))):
+        for tag, value in (("title", item["title"]), ("link", item["link"]), ("description", item["summary"]), ("author", item["journal"]), ("guid", item["id"]), ("pubDate", _rss_date(source))):
             ET.SubElement(node, tag).text = str(value or "")
     xml = ET.tostring(root, encoding="utf-8", xml_declaration=True)
     if atomic_write:
@@ -0,0 +1,388 @@
+"""Incremental parser for the few feed fields the pipeline reads.
+
+``parse`` walks RSS 2.0, RSS 1.0 (RDF) and Atom 1.0 documents with the stdlib
+expat pull parser and rebuilds exactly what ``feedparser.parse`` would report
+for the channel title and each entry's title, link, id, summary and
+published/updated dates.  Field values go through feedparser's own helpers
+(URI joining, HTML sanitising, date parsing), so both paths yield identical
+entry dicts.  Anything outside that subset -- other encodings, DTDs, xml:base,
+XHTML or base64 content, extension elements that feedparser would fold into
+these fields -- makes ``parse`` return None so the caller can fall back.
+"""
+import re
+from types import SimpleNamespace
+from xml.etree.ElementTree import ParseError, XMLPullParser
+
+# The private helpers below are only known to behave as mirrored here in this
+# feedparser release range (requirements.txt pins the same range).
+TESTED_FEEDPARSER = ((6, 0), (6, 1))
+
+try:
+    import feedparser
+    from feedparser.api import StrictFeedParser
+    from feedparser.datetimes import _parse_date
+    from feedparser.html import _cp1252
+    from feedparser.sanitizer import _sanitize_html
+    from feedparser.urls import _urljoin, resolve_relative_uris
+except ImportError:  # a feedparser without these internals: always fall back
+    StrictFeedParser = None
+
+CHUNK_SIZE = 64 * 1024
+
+RSS1_NS = "http://purl.org/rss/1.0/"
+RDF_NS = "http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+ATOM_NS = "http://www.w3.org/2005/Atom"
+XML_NS = "http://www.w3.org/XML/1998/namespace"
+
+ROOTS = {"rss", f"{{{RDF_NS}}}RDF", f"{{{ATOM_NS}}}feed"}
+ENTRY_TAGS = {"item", "entry"}
+TITLE_TAGS = {"title", "dc:title"}
+DESCRIPTION_TAGS = {"description", "dc:description", "summary"}
+CONTENT_TAGS = {"content": "text/plain", "content:encoded": "text/html", "fullitem": "text/html"}
+LINK_TAGS = {"link"}
+ID_TAGS = {"guid", "id"}
+PUBLISHED_TAGS = {"pubdate", "published", "issued", "dcterms:issued"}
+UPDATED_TAGS = {"updated", "modified", "lastbuilddate", "dc:date", "dcterms:modified"}
+FIELD_TAGS = TITLE_TAGS | DESCRIPTION_TAGS | set(CONTENT_TAGS) | LINK_TAGS | ID_TAGS | PUBLISHED_TAGS | UPDATED_TAGS
+# Elements feedparser handles without touching any field read here.
+HARMLESS_TAGS = {
+    "author", "category", "comments", "contributor", "email", "enclosure", "name", "rights", "uri",
+    "dc:contributor", "dc:creator", "dc:language", "dc:publisher", "dc:rights", "dc:subject",
+    "dcterms:created",
+}
+# Parents of the titles feedparser may file as the channel title.
+FEED_TAGS = {"channel", "feed", "image", "textinput", "rss"}
+# Unprefixed tags that keep feedparser's image/textinput state alive.
+IMAGE_CHILDREN = {"title", "link", "description", "url", "href", "width", "height"}
+TEXTINPUT_CHILDREN = {"title", "link", "description", "name"}
+HTML_TYPES = {"text/html", "application/xhtml+xml"}
+TEXT_TYPES = {"text/plain", "text/html"}
+
+_ENCODING = re.compile(rb"""^\s*<\?xml[^>]*?encoding\s*=\s*["']([^"']*)["']""")
+_ROOT_START = re.compile(rb"<[A-Za-z_]")
+_AMP_REFERENCE = re.compile("&([A-Za-z0-9_]+);")
+
+
+class Fallback(Exception):
+    """The document needs feedparser's full behaviour."""
+
+
+def feedparser_version():
+    """``(major, minor)`` of the installed feedparser, or None when unknown."""
+    try:
+        return tuple(int(part) for part in feedparser.__version__.split(".")[:2])
+    except (AttributeError, NameError, ValueError):
+        return None
+
+
+def available():
+    """Whether feedparser's internals are present and from a tested release."""
+    version = feedparser_version()
+    return (StrictFeedParser is not None and version is not None
+            and TESTED_FEEDPARSER[0] <= version < TESTED_FEEDPARSER[1])
+
+
+def _match_namespaces():
+    return {uri.lower(): prefix for uri, prefix in StrictFeedParser.namespaces.items()}
+
+
+def _has_handler(tag):
+    return hasattr(StrictFeedParser, "_start_" + tag.replace(":", "_"))
+
+
+def _map_content_type(value):
+    value = value.lower()
+    return {"text": "text/plain", "plain": "text/plain", "html": "text/html",
+            "xhtml": "application/xhtml+xml"}.get(value, value)
+
+
+def _looks_like_html(value):
+    return StrictFeedParser.looks_like_html(value)
+
+
+def plain_prolog(content):
+    """Whether *content* is UTF-8 XML without a DTD, i.e. safe for the fast path."""
+    if content[:2] in (b"\xff\xfe", b"\xfe\xff") or b"\x00" in content[:4]:
+        return False
+    start = _ROOT_START.search(content)
+    if start is None:
+        return False
+    prolog = content[:start.start()]
+    if b"<!DOCTYPE" in prolog:
+        return False
+    declared = _ENCODING.match(prolog.lstrip(b"\xef\xbb\xbf"))
+    return declared is None or declared.group(1).lower() == b"utf-8"
+
+
+def finish_value(element, text, content_type=None, atom=False, resolve=False):
+    """Post-process element text the way ``feedparser``'s ``pop()`` does."""
+    output = text.strip()
+    if resolve and output:
+        output = _urljoin("", output)
+    if not atom and content_type == "text/plain" and _looks_like_html(output):
+        content_type = "text/html"
+    if element in {"title", "description", "summary", "content"} and _map_content_type(content_type or "text/html") in HTML_TYPES:
+        # Sanitising text without markup or references is an identity.
+        if "<" in output or "&" in output or ">" in output:
+            output = resolve_relative_uris(output, "", "utf-8", content_type or "text/html")
+            output = _sanitize_html(output, "utf-8", content_type or "text/html")
+    try:
+        output = output.encode("iso-8859-1").decode("utf-8")
+    except (UnicodeEncodeError, UnicodeDecodeError):
+        pass
+    return output.translate(_cp1252)
+
+
+class _Document:
+    """Mirror of the feedparser state that decides where titles and entry fields land."""
+
+    def __init__(self):
+        self.matchnamespaces = _match_namespaces()
+        self.prefixes = {}
+        self.version = ""
+        self.feed = {}
+        self.entries = []
+        self.stack = []
+        self.infeed = self.inimage = self.intextinput = False
+        self.entry = None
+        self.entry_depth = 0
+        self.title_depth = -1
+        self.has_content = False
+        self.guidislink = False
+
+    def start_ns(self, prefix, uri):
+        prefix = prefix or None
+        lower = uri.lower()
+        if not self.version:
+            if (prefix, lower) == (None, "http://my.netscape.com/rdf/simple/0.9/"):
+                self.version = "rss090"
+            elif lower == RSS1_NS:
+                self.version = "rss10"
+            elif lower == ATOM_NS.lower():
+                self.version = "atom10"
+        if lower not in self.matchnamespaces:
+            if self.prefixes.setdefault(lower, prefix) != prefix:
+                raise Fallback("namespace bound to several prefixes")
+
+    def canonical(self, tag):
+        if tag[0] != "{":
+            return tag.lower()
+        uri, local = tag[1:].split("}", 1)
+        lower = uri.lower()
+        if "backend.userland.com/rss" in lower:
+            lower = "http://backend.userland.com/rss"
+        prefix = self.matchnamespaces.get(lower, self.prefixes.get(lower))
+        return f"{prefix.lower()}:{local.lower()}" if prefix else local.lower()
+
+    def attributes(self, attrib):
+        attrs = {}
+        for key, value in attrib.items():
+            if key[0] == "{":
+                uri, local = key[1:].split("}", 1)
+                if uri == XML_NS and local == "base":
+                    raise Fallback("xml:base")
+                prefix = self.matchnamespaces.get(uri.lower(), "")
+                key = f"{prefix}:{local}" if prefix else local
+            key = key.lower()
+            if key == "base":
+                raise Fallback("base attribute")
+            attrs[key] = value.lower() if key in ("rel", "type") else value
+        return attrs
+
+    def start(self, elem):
+        depth = len(self.stack) + 1
+        if depth == 1 and elem.tag not in ROOTS:
+            raise Fallback("unsupported root element")
+        tag = self.canonical(elem.tag)
+        attrs = self.attributes(elem.attrib)
+        if self.stack:
+            self.stack[-1][2] += 1
+        self.stack.append([tag, attrs, 0])
+        if ":" not in tag:
+            if tag not in TEXTINPUT_CHILDREN:
+                self.intextinput = False
+            if tag not in IMAGE_CHILDREN:
+                self.inimage = False
+        if self.entry is not None:
+            self._start_in_entry(tag, attrs, depth)
+        elif tag in ENTRY_TAGS:
+            if "lastmod" in attrs or "href" in attrs:
+                raise Fallback("CDF entry attributes")
+            self.entry = {}
+            self.entry_depth = depth
+            self.guidislink = False
+            self.title_depth = -1
+            if attrs.get("rdf:about"):
+                self.entry["id"] = attrs["rdf:about"]
+        elif tag in ("channel", "feed"):
+            self.infeed = True
+        elif tag == "image":
+            self.inimage = True
+            self.title_depth = -1
+        elif tag == "textinput":
+            self.intextinput = True
+            self.title_depth = -1
+        elif tag in TITLE_TAGS and self.stack[-2][0] not in FEED_TAGS:
+            raise Fallback("title outside the channel, image or textinput")
+        elif tag in {"summary", "source"} or tag in CONTENT_TAGS:
+            raise Fallback(f"feed-level <{tag}>")
+
+    def _start_in_entry(self, tag, attrs, depth):
+        if depth == self.entry_depth + 1:
+            if tag in ENTRY_TAGS:
+                raise Fallback("nested entry")
+            if tag in FIELD_TAGS or tag in HARMLESS_TAGS or not _has_handler(tag):
+                return
+        elif tag in HARMLESS_TAGS or not _has_handler(tag):
+            return
+        raise Fallback(f"<{tag}> inside an entry")
+
+    def end(self, elem):
+        depth = len(self.stack)
+        tag, attrs, children = self.stack.pop()
+        if children and (tag in TITLE_TAGS or (self.entry is not None and depth == self.entry_depth + 1 and tag in FIELD_TAGS)):
+            raise Fallback("markup inside a field")
+        if self.entry is not None and depth == self.entry_depth:
+            self.entries.append(self.entry)
+            self.entry = None
+            self.has_content = False
+        elif self.entry is not None and depth == self.entry_depth + 1:
+            self._end_field(elem, tag, attrs, depth)
+        elif tag in TITLE_TAGS and self.entry is None:
+            self._end_feed_title(elem, attrs, depth)
+        elif tag in ("channel", "feed"):
+            self.infeed = False
+        elif tag == "image":
+            self.inimage = False
+        elif tag == "textinput":
+            self.intextinput = False
+
+    def _text(self, elem, attrs, default_type=None):
+        if "mode" in attrs:
+            raise Fallback("content mode")
+        if default_type is None:
+            return elem.text or "", None
+        content_type = _map_content_type(attrs.get("type", default_type))
+        if content_type not in TEXT_TYPES:
+            raise Fallback(f"{content_type} content")
+        return elem.text or "", content_type
+
+    def _end_feed_title(self, elem, attrs, depth):
+        text, content_type = self._text(elem, attrs, "text/plain")
+        if not self.infeed:
+            # feedparser keeps the raw text of titles it does not store.
+            value = text.strip()
+        else:
+            value = finish_value("title", text, content_type, self.atom)
+            if not -1 < self.title_depth <= depth and not self.inimage and not self.intextinput:
+                self.feed["title"] = value
+        if value:
+            self.title_depth = depth
+
+    def _end_field(self, elem, tag, attrs, depth):
+        entry = self.entry
+        if tag in TITLE_TAGS:
+            text, content_type = self._text(elem, attrs, "text/plain")
+            if -1 < self.title_depth <= depth:
+                return  # a non-empty title was already kept for this entry
+            entry["title"] = value = finish_value("title", text, content_type, self.atom)
+            if value:
+                self.title_depth = depth
+        elif tag in DESCRIPTION_TAGS:
+            if "summary" in entry and not self.has_content:
+                # feedparser reroutes a repeated summary through its content
+                # handler, which only fills a summary that is still missing.
+                self._text(elem, attrs, "text/plain")
+                self.has_content = True
+                return
+            default = "text/plain" if tag == "summary" else "text/html"
+            text, content_type = self._text(elem, attrs, default)
+            entry["summary"] = finish_value("summary", text, content_type, self.atom)
+        elif tag in CONTENT_TAGS:
+            if "src" in attrs:
+                raise Fallback("out-of-line content")
+            self.has_content = True
+            text, content_type = self._text(elem, attrs, CONTENT_TAGS[tag])
+            if "summary" not in entry:
+                entry["summary"] = finish_value("content", text, content_type, self.atom)
+        elif tag in LINK_TAGS:
+            self._end_link(elem, attrs)
+        elif tag in ID_TAGS:
+            self.guidislink = attrs.get("ispermalink", "true") == "true"
+            text, _ = self._text(elem, attrs)
+            value = finish_value("id", text, resolve=self.guidislink)
+            entry["id"] = value
+            if self.guidislink:
+                entry.setdefault("link", value)
+        elif tag in PUBLISHED_TAGS:
+            text, _ = self._text(elem, attrs)
+            entry["published_parsed"] = _parse_date(finish_value("published", text))
+        elif tag in UPDATED_TAGS:
+            text, _ = self._text(elem, attrs)
+            entry["updated_parsed"] = _parse_date(finish_value("updated", text))
+
+    def _end_link(self, elem, attrs):
+        if "url" in attrs or "uri" in attrs:
+            raise Fallback("link url/uri attribute")
+        if "href" in attrs:
+            if not attrs["href"]:
+                raise Fallback("empty link href")
+            rel = attrs.get("rel", "alternate")
+            content_type = attrs.get("type", "application/atom+xml" if rel == "self" else "text/html")
+            if rel == "alternate" and _map_content_type(content_type) in HTML_TYPES:
+                self.entry["link"] = _urljoin("", attrs["href"])
+            return
+        text, _ = self._text(elem, attrs)
+        value = finish_value("link", text, resolve=True).replace("&amp;", "&")
+        self.entry["link"] = _AMP_REFERENCE.sub(r"&\g<1>", value)
+
+    @property
+    def atom(self):
+        return self.version.startswith("atom")
+
+    def root(self, elem):
+        if elem.tag == "rss" and not self.version.startswith("rss"):
+            self.version = "rss"
+        elif elem.tag == f"{{{ATOM_NS}}}feed" and not self.version:
+            self.version = "atom"
+
+
+def parse(content, chunk_size=CHUNK_SIZE):
+    """Parse *content* (bytes) into a feedparser-shaped result, or None to fall back.
+
+    The result has ``feed`` (a dict with the channel ``title`` when present) and
+    ``entries`` (dicts holding only the keys feedparser would set among
+    title/link/id/summary/published_parsed/updated_parsed).
+    """
+    if not available() or not content or not plain_prolog(content):
+        return None
+    document = _Document()
+    parser = XMLPullParser(events=("start", "end", "start-ns"))
+    elements = []
+    try:
+        for offset in range(0, len(content), chunk_size):
+            parser.feed(content[offset:offset + chunk_size])
+            _drain(parser, document, elements)
+        parser.close()
+        _drain(parser, document, elements)
+    except (Fallback, ParseError, ValueError):
+        return None
+    return SimpleNamespace(feed=document.feed, entries=document.entries)
+
+
+def _drain(parser, document, elements):
+    for event, value in parser.read_events():
+        if event == "start-ns":
+            document.start_ns(*value)
+        elif event == "start":
+            if not elements:
+                document.root(value)
+            document.start(value)
+            elements.append(value)
+        else:
+            document.end(value)
+            elements.pop()
+            if elements:
+                # Finished elements are dropped so memory stays flat over long
+                # feeds; a finished element is always its parent's last child.
+                del elements[-1][-1]
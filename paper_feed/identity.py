@@ -1,6 +1,7 @@
 """Conservative, deterministic identities for papers."""
 import hashlib
 import re
+from functools import lru_cache
 from urllib.parse import parse_qsl, unquote, urlencode, urlsplit, urlunsplit
 
 DOI_RE = re.compile(r"10\.\d{4,9}/[^\s<>\"')\]]+", re.I)
@@ -13,6 +14,9 @@ ARXIV_URL_RE = re.compile(
 )
 PMID_RE = re.compile(r"(?:pmid[:/ ]|pubmed\.ncbi\.nlm\.nih\.gov/)(\d+)", re.I)
 PII_RE = re.compile(r"(?:/pii/|pii:)([A-Z0-9-]{6,})", re.I)
+# Lower-case markers every match of each pattern contains; identifiers() only
+# runs the patterns whose marker occurs in an ASCII haystack.
+MARKERS = (("doi", ("10.",)), ("pii", ("pii",)), ("pmid", ("pmid", "pubmed.ncbi")), ("arxiv", ("arxiv",)))
 TRACKING_PARAMETERS = {
     "dgcid", "fbclid", "gclid", "rss", "rss_source", "rss_campaign", "feed", "feed_name",
     "utm_source", "utm_medium", "utm_campaign", "utm_term", "utm_content",
@@ -23,6 +27,7 @@ def norm_text(value):
     return " ".join(re.sub(r"[^\w]+", " ", (value or "").casefold()).split())
 
 
+@lru_cache(maxsize=16384)
 def canonical_url(value):
     if not value:
         return None
@@ -30,13 +35,15 @@ def canonical_url(value):
         bits = urlsplit(unquote(value.strip()))
         if not bits.scheme or not bits.netloc:
             return None
-        query = [
+        query = bits.query and urlencode(sorted(
             (key, value)
             for key, value in parse_qsl(bits.query, keep_blank_values=True)
             if key.casefold() not in TRACKING_PARAMETERS and not key.casefold().startswith("utm_")
-        ]
-        path = re.sub(r"/+", "/", bits.path).rstrip("/") or "/"
-        return urlunsplit((bits.scheme.casefold(), bits.netloc.casefold(), path, urlencode(sorted(query)), ""))
+        ))
+        path = bits.path
+        if "//" in path:
+            path = re.sub(r"/+", "/", path)
+        return urlunsplit((bits.scheme.casefold(), bits.netloc.casefold(), path.rstrip("/") or "/", query, ""))
     except ValueError:
         return None
 
@@ -48,9 +55,24 @@ def normalize_doi(value):
     match = DOI_RE.search(text)
     if not match:
         return None
+    return _clean_doi(match.group(0))
+
+
+def _clean_doi(doi):
     # Queries/fragments are URL syntax, not DOI syntax.  Keep DOI-internal punctuation intact.
-    doi = match.group(0).split("?", 1)[0].split("#", 1)[0]
-    return doi.rstrip(".,;:").casefold() or None
+    return doi.split("?", 1)[0].split("#", 1)[0].rstrip(".,;:").casefold() or None
+
+
+def _present(haystack):
+    """Kinds whose marker occurs in *haystack*; all kinds when it is not ASCII.
+
+    Outside ASCII, ``re.I`` also folds characters such as U+0131 (dotless i)
+    that ``str.lower`` keeps, so only the patterns themselves can decide.
+    """
+    if not haystack.isascii():
+        return {kind for kind, _ in MARKERS}
+    text = haystack.lower()
+    return {kind for kind, markers in MARKERS if any(marker in text for marker in markers)}
 
 
 def identifiers(record):
@@ -58,17 +80,24 @@ def identifiers(record):
     link = record.get("link", "")
     guid = record.get("guid") or record.get("id", "")
     haystack = " ".join(str(value or "") for value in (record.get("doi"), link, guid))
+    present = _present(haystack)
     found = []
-    doi = normalize_doi(haystack)
+    if "%" in haystack:
+        doi = normalize_doi(haystack)
+    else:
+        # Without escapes, normalize_doi's unquoting and prefix stripping cannot move the first match.
+        match = DOI_RE.search(haystack) if "doi" in present else None
+        doi = match and _clean_doi(match.group(0))
     if doi:
         found.append(("doi", doi))
     for kind, regex in (("pii", PII_RE), ("pmid", PMID_RE)):
-        match = regex.search(haystack)
+        match = regex.search(haystack) if kind in present else None
         if match:
             found.append((kind, match.group(1).casefold()))
-    arxiv_match = ARXIV_EXPLICIT_RE.search(haystack) or ARXIV_URL_RE.search(haystack)
-    if arxiv_match:
-        found.append(("arxiv", arxiv_match.group(1).casefold()))
+    if "arxiv" in present:
+        arxiv_match = ARXIV_EXPLICIT_RE.search(haystack) or ARXIV_URL_RE.search(haystack)
+        if arxiv_match:
+            found.append(("arxiv", arxiv_match.group(1).casefold()))
     url = canonical_url(link)
     if url:
         found.append(("url", url))
@@ -78,6 +107,11 @@ def identifiers(record):
     return found
 
 
+def identifiers_many(records):
+    """:func:`identifiers` for each of *records*, in order."""
+    return [identifiers(record) for record in records]
+
+
 def fingerprint(record):
     journal = norm_text(record.get("journal"))
     title = norm_text(record.get("title"))
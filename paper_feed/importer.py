@@ -9,7 +9,7 @@ from datetime import datetime
 from pathlib import Path
 from xml.etree import ElementTree as ET
 
-from .db import PaperRepository, connect, database_counts, now
+from .db import PaperRepository, connect, database_counts, legacy_choices, now, record_choices
 
 LEGACY_FILES = (
     "filtered_feed.xml", "web/feed.json", "web/interactions.json",
@@ -144,6 +144,12 @@ class LegacyImporter:
         }
 
     def _import_records(self, conn, repo, records, summary, unresolved, fail_after):
+        keys = []
+        for record in records:
+            legacy_key = record.get("id") or record.get("guid")
+            keys += record_choices(record) + (legacy_choices(legacy_key) if legacy_key else [])
+        batch = repo.identity_batch(keys)
+        inbox, observations = [], []
         for index, record in enumerate(records, 1):
             try:
                 legacy_key = record.get("id") or record.get("guid")
@@ -151,32 +157,36 @@ class LegacyImporter:
                 # paper set but carry different source labels.  Resolve their
                 # shared legacy GUID first, so importing both files cannot turn
                 # one feed into two partially overlapping collections.
-                paper_id = repo.legacy_paper_id(legacy_key) if legacy_key else None
+                paper_id = batch.legacy_paper_id(legacy_key) if legacy_key else None
                 if paper_id:
-                    repo.attach_record_identifiers(paper_id, record)
+                    batch.claim(paper_id, record_choices(record))
                 else:
-                    paper_id = repo.resolve(record)
-                repo.add_legacy_alias(paper_id, legacy_key)
-                repo.ensure_inbox(paper_id)
+                    paper_id = batch.resolve(record)
+                batch.add_legacy_alias(paper_id, legacy_key)
             except ValueError as exc:
                 unresolved.append(("record", str(record.get("id") or record.get("link") or index), str(exc), record))
                 continue
+            inbox.append(paper_id)
             stamp = now()
-            conn.execute(
-                """INSERT INTO paper_observations(
-                    paper_id, source, source_guid, link, title, journal, published_at, summary,
-                    payload_json, first_seen_at, last_seen_at)
-                VALUES (?,?,?,?,?,?,?,?,?,?,?)
-                ON CONFLICT(source,source_guid) DO UPDATE SET
-                    paper_id=excluded.paper_id, last_seen_at=excluded.last_seen_at,
-                    payload_json=excluded.payload_json""",
+            observations.append(
                 (paper_id, record.get("source") or "legacy", record.get("guid") or record.get("id") or record.get("link"),
                  record.get("link"), record.get("title"), record.get("journal"), record.get("pub_date"),
-                 record.get("summary"), json.dumps(record), stamp, stamp),
-            )
+                 record.get("summary"), json.dumps(record), stamp, stamp))
             summary["observations"] += 1
             if fail_after and index >= fail_after:
                 raise RuntimeError("injected import failure")
+        batch.flush()
+        repo.ensure_inbox_many(inbox)
+        conn.executemany(
+            """INSERT INTO paper_observations(
+                paper_id, source, source_guid, link, title, journal, published_at, summary,
+                payload_json, first_seen_at, last_seen_at)
+            VALUES (?,?,?,?,?,?,?,?,?,?,?)
+            ON CONFLICT(source,source_guid) DO UPDATE SET
+                paper_id=excluded.paper_id, last_seen_at=excluded.last_seen_at,
+                payload_json=excluded.payload_json""",
+            observations,
+        )
 
     @staticmethod
     def _record_source_fetches(conn, run_id, records):
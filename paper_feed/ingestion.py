@@ -1,11 +1,13 @@
 """Transactional RSS ingestion.  The SQLite store, not generated files, is history."""
 import json
+import time
 import uuid
 from datetime import datetime
 from pathlib import Path
 
 from .db import PaperRepository, connect, now
 from .importer import LegacyImporter
+from .transport import elapsed_ms
 
 
 def _iso(value):
@@ -21,11 +23,44 @@ def ensure_database(root=".", database=None):
     return database
 
 
-def ingest_fetch_results(results, root=".", database=None, predicate=None):
+def source_validators(database, filter_key=None, reconcile_before=None):
+    """Return stored HTTP validators, body hashes and head GUIDs for sources last ingested under *filter_key*.
+
+    Validators recorded under a different keyword filter are withheld: a 304 or an
+    identical body would otherwise hide feed entries that only the new keywords accept.
+    Sources not fully processed since *reconcile_before* (an ISO timestamp) are
+    withheld too, so their next fetch re-reads every entry.
+    """
+    conn = connect(database)
+    try:
+        rows = conn.execute("""SELECT source, etag, last_modified, body_hash, head_guid FROM source_state
+            WHERE filter_key IS ? AND (? IS NULL OR reconciled_at >= ?)""", (filter_key, reconcile_before, reconcile_before)).fetchall()
+    finally:
+        conn.close()
+    keys = ("etag", "last_modified", "body_hash", "head_guid")
+    return {row["source"]: {key: row[key] for key in keys} for row in rows if any(row[key] for key in keys)}
+
+
+def last_filter_key(database):
+    """Return the keyword filter key of the most recent successful ingest, if any."""
+    conn = connect(database)
+    try:
+        row = conn.execute("SELECT filter_key FROM source_state ORDER BY updated_at DESC LIMIT 1").fetchone()
+    finally:
+        conn.close()
+    return row[0] if row else None
+
+
+def ingest_fetch_results(results, root=".", database=None, predicate=None, filter_key=None, replay=False):
     """Persist one fetch attempt and every successful observation atomically.
 
     A total outage intentionally commits only the audit rows.  Any insertion failure
     rolls back the entire run, so a partial paper set is never published as success.
+    A source answering 304 Not Modified, or repeating the last ingested body byte
+    for byte, is a successful ``unchanged`` fetch with nothing to ingest.
+
+    *replay* results come from the raw-response archive: they are logged as
+    ``replayed`` and leave the live HTTP validators and poll history untouched.
     """
     database = ensure_database(root, database)
     conn = connect(database)
@@ -41,41 +76,109 @@ def ingest_fetch_results(results, root=".", database=None, predicate=None):
             for result in results:
                 source = (result or {}).get("url") or "unknown"
                 ok = bool(result and result.get("success"))
+                unchanged = ok and bool(result.get("unchanged"))
                 fetched = result.get("entries", []) if ok else []
                 entries = [entry for entry in fetched if predicate is None or predicate(entry)]
                 detail = {key: (result or {}).get(key) for key in ("status_code", "attempts", "error")}
                 detail.update({"fetched_count": len(fetched), "matched_count": len(entries)})
-                conn.execute("INSERT INTO source_fetches(run_id,source,status,item_count,detail_json) VALUES (?,?,?,?,?)",
-                             (run_id, source, "succeeded" if ok else "failed", len(entries), json.dumps(detail)))
-                if not ok:
-                    continue
-                for entry in entries:
-                    record = dict(entry)
-                    record["source"] = source
-                    record["guid"] = record.get("guid") or record.get("id") or record.get("link")
-                    record["pub_date"] = _iso(record.get("pub_date"))
-                    exists = conn.execute("SELECT 1 FROM paper_observations WHERE source=? AND source_guid=?", (source, record["guid"])).fetchone()
-                    paper_id = repo.resolve(record)
-                    repo.ensure_inbox(paper_id)
+                if ok and result.get("seen_count"):
+                    detail["seen_count"] = result["seen_count"]
+                # The newest entry's identity lets the poll scheduler learn when a feed
+                # changes; fetchers report it even when the high-water mark left no entries.
+                head_id = result.get("head_id") if ok else None
+                if head_id is None and fetched:
+                    head_id = fetched[0].get("id") or fetched[0].get("link") or ""
+                if head_id is not None:
+                    detail["head_id"] = str(head_id)
+                fetch_status = "unchanged" if unchanged else ("failed" if not ok else ("replayed" if replay else "succeeded"))
+                ingest_started = time.perf_counter()
+                if ok and result.get("archive_hash"):
+                    conn.execute("INSERT INTO raw_responses(run_id,source,body_hash,status_code,fetched_at) VALUES (?,?,?,?,?)",
+                                 (run_id, source, result["archive_hash"], result.get("status_code"), now()))
+                if ok and not unchanged and not replay:
+                    # Validators describe the body just ingested; absent headers clear stale ones.
+                    # The high-water mark only moves when the feed reported one.
+                    high_water = result.get("high_water") or {}
+                    conn.execute("""INSERT INTO source_state(source,etag,last_modified,body_hash,filter_key,updated_at,head_guid,reconciled_at)
+                        VALUES (?,?,?,?,?,?,?,?)
+                        ON CONFLICT(source) DO UPDATE SET etag=excluded.etag,last_modified=excluded.last_modified,
+                        body_hash=excluded.body_hash,filter_key=excluded.filter_key,updated_at=excluded.updated_at,
+                        head_guid=COALESCE(excluded.head_guid,source_state.head_guid),
+                        reconciled_at=COALESCE(excluded.reconciled_at,source_state.reconciled_at)""",
+                                 (source, result.get("etag"), result.get("last_modified"), result.get("body_hash"), filter_key, now(),
+                                  high_water.get("guid"), now() if result.get("full_pass") else None))
+                elif unchanged and not replay:
+                    # A server may rotate its ETag while serving the same body; keep the
+                    # latest validators so the next request can still be answered with 304.
+                    conn.execute("UPDATE source_state SET etag=?,last_modified=? WHERE source=?",
+                                 (result.get("etag"), result.get("last_modified"), source))
+                if ok and not unchanged and entries:
+                    records = []
+                    for entry in entries:
+                        record = dict(entry)
+                        record["source"] = source
+                        record["guid"] = record.get("guid") or record.get("id") or record.get("link")
+                        record["pub_date"] = _iso(record.get("pub_date"))
+                        records.append(record)
+                    guids = [record["guid"] for record in records]
+                    seen = {row[0] for row in conn.execute("""SELECT source_guid FROM paper_observations
+                        WHERE source=? AND source_guid IN (SELECT value FROM json_each(?))""", (source, json.dumps(guids)))}
+                    paper_ids = repo.resolve_many(records)
+                    repo.ensure_inbox_many(paper_ids)
                     stamp = now()
-                    conn.execute("""INSERT INTO paper_observations(paper_id,source,source_guid,link,title,journal,published_at,summary,payload_json,first_seen_at,last_seen_at)
+                    conn.executemany("""INSERT INTO paper_observations(paper_id,source,source_guid,link,title,journal,published_at,summary,payload_json,first_seen_at,last_seen_at)
                         VALUES (?,?,?,?,?,?,?,?,?,?,?)
                         ON CONFLICT(source,source_guid) DO UPDATE SET paper_id=excluded.paper_id,link=excluded.link,title=excluded.title,
                         journal=excluded.journal,published_at=excluded.published_at,summary=excluded.summary,payload_json=excluded.payload_json,last_seen_at=excluded.last_seen_at""",
-                                 (paper_id, source, record["guid"], record.get("link"), record.get("title"), record.get("journal"),
-                                  record.get("pub_date"), record.get("summary"), json.dumps(record, default=_iso), stamp, stamp))
-                    imported += 1
-                    new_observations += not bool(exists)
+                                     [(paper_id, source, record["guid"], record.get("link"), record.get("title"), record.get("journal"),
+                                       record.get("pub_date"), record.get("summary"), json.dumps(record, default=_iso), stamp, stamp)
+                                      for paper_id, record in zip(paper_ids, records)])
+                    imported += len(records)
+                    for guid in guids:
+                        # A feed repeating a GUID observes it once; NULL GUIDs never collide.
+                        new_observations += guid not in seen
+                        if guid is not None:
+                            seen.add(guid)
+                timings = dict((result or {}).get("timings") or {})
+                if ok and not unchanged:
+                    timings["ingest_ms"] = elapsed_ms(ingest_started)
+                if timings:
+                    detail["timings"] = timings
+                conn.execute("INSERT INTO source_fetches(run_id,source,status,item_count,detail_json) VALUES (?,?,?,?,?)",
+                             (run_id, source, fetch_status, len(entries), json.dumps(detail)))
             new_papers = conn.execute("SELECT count(*) FROM papers").fetchone()[0] - before_papers
-            summary = {"successful_sources": len(successes), "failed_sources": len(results) - len(successes), "observations": imported, "new_observations": new_observations, "new_papers": new_papers}
+            unchanged_sources = [r["url"] for r in successes if r.get("unchanged")]
+            summary = {"successful_sources": len(successes), "failed_sources": len(results) - len(successes), "unchanged_sources": len(unchanged_sources),
+                       "observations": imported, "new_observations": new_observations, "new_papers": new_papers}
+            if replay:
+                summary["replay"] = True
             conn.execute("UPDATE fetch_runs SET completed_at=?,status=?,summary_json=? WHERE run_id=?", (now(), status, json.dumps(summary), run_id))
     finally:
         conn.close()
-    return {"run_id": run_id, "status": status, "successful_sources": [r["url"] for r in successes],
+    return {"run_id": run_id, "status": status, "successful_sources": [r["url"] for r in successes], "unchanged_sources": unchanged_sources,
             "failed_sources": [(r or {}).get("url") for r in results if not r or not r.get("success")], "observations": imported,
             "new_observations": new_observations, "new_papers": new_papers}
 
 
+def record_run_timings(database, run_id, stages):
+    """Merge run-level stage durations (``{"fetch": ms, ...}``) into a run's summary.
+
+    Analysis and export happen after the ingest transaction commits, so their
+    durations are attached to the already recorded run afterwards.
+    """
+    conn = connect(database)
+    try:
+        with PaperRepository(conn).transaction():
+            row = conn.execute("SELECT summary_json FROM fetch_runs WHERE run_id=?", (run_id,)).fetchone()
+            if row is None:
+                return
+            summary = json.loads(row[0] or "{}")
+            summary["stages_ms"] = {**summary.get("stages_ms", {}), **stages}
+            conn.execute("UPDATE fetch_runs SET summary_json=? WHERE run_id=?", (json.dumps(summary), run_id))
+    finally:
+        conn.close()
+
+
 def save_translations(database, records_by_id):
     """Persist GPT classifications by durable ID so exports never rely on a cache."""
     if not records_by_id:
@@ -0,0 +1,281 @@
+"""Keyword queries compiled once per run and matched against feed entries.
+
+Each line of ``keywords.dat`` is one query; an entry is kept when any query
+matches.  A query combines terms with ``AND``, ``OR`` and ``NOT`` (upper case,
+whole words; ``NOT`` binds tightest, then ``AND``, then ``OR``) and
+parentheses.  A term is a run of plain words (``social media``), or a
+``"quoted phrase"`` that may contain operator words, matched case-insensitively
+as a substring of the title and summary.  A ``title:``, ``summary:`` (alias
+``abstract:``) or ``journal:`` prefix scopes the following term or group:
+
+    social media AND (trust OR loyalty) NOT journal:"working paper"
+
+Lines written for the old ``a AND b`` filter keep their meaning; a dangling
+``AND`` or ``OR``, which the old filter read as "match everything", is an error.
+"""
+import re
+from functools import lru_cache
+
+FIELDS = {"title": "title", "summary": "summary", "abstract": "summary", "journal": "journal"}
+DEFAULT_FIELD = "text"
+OPERATORS = {"AND", "OR", "NOT"}
+TOKEN_RE = re.compile(
+    r'(?P<open>\()|(?P<close>\))|"(?P<quoted>[^"]*)"|(?P<field>(?:%s)):|(?P<word>[^\s()"]+)|(?P<stray>")'
+    % "|".join(FIELDS)
+)
+
+
+class QueryError(ValueError):
+    """A keyword query that cannot be parsed."""
+
+
+def _tokens(query):
+    """Yield ``(kind, value, start)``; runs of plain words become one ``term``."""
+    phrase = None
+    for match in TOKEN_RE.finditer(query):
+        kind, value = match.lastgroup, match.group(match.lastgroup)
+        if kind == "word" and value not in OPERATORS:
+            phrase = (phrase[0], match.end()) if phrase else (match.start(), match.end())
+            continue
+        if phrase:
+            yield "term", query[phrase[0]:phrase[1]], phrase[0]
+            phrase = None
+        if kind == "stray":
+            raise QueryError(f"unterminated quote at column {match.start() + 1}: {query!r}")
+        if kind == "word":
+            kind = value
+        yield kind, value, match.start()
+    if phrase:
+        yield "term", query[phrase[0]:phrase[1]], phrase[0]
+
+
+class _Parser:
+    """Recursive descent over the token stream; every ``AND``/``OR`` needs a term on both sides."""
+
+    def __init__(self, query):
+        self.query = query
+        self.tokens = list(_tokens(query))
+        self.position = 0
+
+    def peek(self):
+        return self.tokens[self.position][0] if self.position < len(self.tokens) else None
+
+    def take(self):
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+
+    def error(self, message, position=None):
+        position = self.position if position is None else position
+        column = self.tokens[position][2] + 1 if position < len(self.tokens) else len(self.query)
+        return QueryError(f"{message} at column {column}: {self.query!r}")
+
+    def parse(self):
+        if not self.tokens:
+            return ("and", ())
+        node = self.disjunction(None)
+        if self.peek() is not None:
+            raise self.error("unexpected ')'")
+        return node
+
+    def disjunction(self, field):
+        branches = [self.conjunction(field)]
+        while self.peek() == "OR":
+            self.take()
+            branches.append(self.conjunction(field))
+        return ("or", tuple(branches)) if len(branches) > 1 else branches[0]
+
+    def conjunction(self, field):
+        parts = [self.term(field)]
+        while self.peek() not in (None, "OR", "close"):
+            if self.peek() == "AND":
+                self.take()
+                parts.append(self.term(field))
+            else:
+                parts.append(self.negation(field))
+        return ("and", tuple(parts)) if len(parts) > 1 else parts[0]
+
+    def term(self, field):
+        """The operand that must start a group, a line or follow ``AND``/``OR``."""
+        following = self.peek()
+        if following not in (None, "OR", "AND", "close"):
+            return self.negation(field)
+        before = self.tokens[self.position - 1][0] if self.position else None
+        if before == "open":
+            raise self.error("empty parentheses" if following == "close" else "missing ')'")
+        if before in ("AND", "OR"):
+            raise self.error(f"{before} needs a term on both sides")
+        if following == "close":
+            raise self.error("unexpected ')'")
+        raise self.error(f"{following} needs a term on both sides")
+
+    def negation(self, field):
+        if self.peek() == "NOT":
+            self.take()
+            if self.peek() in (None, "OR", "AND", "close"):
+                raise self.error("NOT needs a term")
+            return ("not", self.negation(field))
+        return self.operand(field)
+
+    def operand(self, field):
+        kind, value, _ = self.take()
+        if kind == "field":
+            if field is not None:
+                raise self.error(f"field {value!r} inside a scoped term")
+            if self.peek() in (None, "OR", "AND", "NOT", "close"):
+                raise self.error(f"{value}: needs a term")
+            return self.operand(FIELDS[value])
+        if kind == "open":
+            node = self.disjunction(field)
+            if self.peek() != "close":
+                raise self.error("missing ')'")
+            self.take()
+            return node
+        if kind == "quoted" and not value.strip():
+            raise self.error("empty phrase", self.position - 1)
+        if kind in ("term", "quoted"):
+            return ("term", field or DEFAULT_FIELD, value)
+        raise self.error("unexpected ')'")
+
+
+def parse_query(query):
+    """Parse one query line into a tuple tree of ``term``/``and``/``or``/``not`` nodes.
+
+    ``("term", field, text)`` keeps the text as written.  Only a blank line
+    gives the empty ``and``, which matches every entry as under the old filter;
+    an operator without a term on each side or an empty ``()`` raises QueryError.
+    """
+    return _Parser(query).parse()
+
+
+def query_keywords(queries):
+    """Display terms of *queries* (those not under ``NOT``), sorted case-insensitively."""
+    keywords = set()
+
+    def collect(node):
+        if node[0] == "term":
+            if node[2]:
+                keywords.add(node[2])
+        elif node[0] != "not":
+            for child in node[1]:
+                collect(child)
+
+    for query in queries:
+        try:
+            collect(parse_query(query))
+        except QueryError:
+            keywords.add(query.strip())
+    return sorted(keywords, key=lambda keyword: (keyword.lower(), keyword))
+
+
+def _entry_texts(entry, fields):
+    title, summary = entry["title"], entry.get("summary", "")
+    values = {DEFAULT_FIELD: title + " " + summary, "title": title, "summary": summary,
+              "journal": entry.get("journal", "")}
+    return {field: values[field].lower() for field in fields}
+
+
+class KeywordMatcher:
+    """Any-of-queries matcher over entries lower-cased once per field.
+
+    Each distinct ``(field, term)`` is searched for at most once per entry,
+    however many queries share it.  Queries that are a plain ``AND`` of
+    title/summary terms (every legacy line) skip the tree walk: single terms
+    are tried first in one ``any`` sweep, then the conjunctions, with any
+    conjunction implied by a smaller one dropped.  Other queries are compiled
+    to nested closures.
+    """
+
+    def __init__(self, queries):
+        self.terms = []
+        self._ids = {}
+        self.trees = []
+        self.always = False
+        groups = set()
+        for query in queries:
+            node = parse_query(query)
+            conjunction = self._conjunction(node)
+            if conjunction is None:
+                self.trees.append(self._compile(node))
+            elif not conjunction:
+                self.always = True
+            else:
+                groups.add(conjunction)
+        self.fields = {field for field, _ in self.terms} | {DEFAULT_FIELD}
+        # Fewest terms first: the cheapest groups decide most entries.
+        kept, kept_by_term = [], {}
+        for ids in sorted(groups, key=lambda ids: (len(ids), sorted(ids))):
+            if any(smaller <= ids for term_id in ids for smaller in kept_by_term.get(term_id, ())):
+                continue
+            kept.append(ids)
+            for term_id in ids:
+                kept_by_term.setdefault(term_id, []).append(ids)
+        self.singles = tuple(self.terms[next(iter(ids))][1] for ids in kept if len(ids) == 1)
+        self.groups = tuple(tuple(sorted(ids)) for ids in kept if len(ids) > 1)
+
+    def _term_id(self, field, text):
+        key = (field, text.lower())
+        if key not in self._ids:
+            self._ids[key] = len(self.terms)
+            self.terms.append(key)
+        return self._ids[key]
+
+    def _conjunction(self, node):
+        """Term ids of a plain AND of title/summary terms, else ``None``."""
+        parts = node[1] if node[0] == "and" else (node,)
+        if not all(part[0] == "term" and part[1] == DEFAULT_FIELD for part in parts):
+            return None
+        return frozenset(self._term_id(DEFAULT_FIELD, part[2]) for part in parts if part[2])
+
+    def _compile(self, node):
+        kind = node[0]
+        if kind == "term":
+            if not node[2]:
+                return lambda texts, found: True
+            term_id = self._term_id(node[1], node[2])
+            field, needle = self.terms[term_id]
+
+            def evaluate(texts, found):
+                hit = found.get(term_id)
+                if hit is None:
+                    hit = found[term_id] = needle in texts[field]
+                return hit
+            return evaluate
+        if kind == "not":
+            inner = self._compile(node[1])
+            return lambda texts, found: not inner(texts, found)
+        parts = tuple(self._compile(child) for child in node[1])
+        combine = all if kind == "and" else any
+        return lambda texts, found: combine(part(texts, found) for part in parts)
+
+    def match_entry(self, entry):
+        if self.always:
+            return True
+        texts = _entry_texts(entry, self.fields)
+        text = texts[DEFAULT_FIELD]
+        if any(term in text for term in self.singles):
+            return True
+        terms = self.terms
+        found = {}
+        for group in self.groups:
+            for term_id in group:
+                hit = found.get(term_id)
+                if hit is None:
+                    hit = found[term_id] = terms[term_id][1] in text
+                if not hit:
+                    break
+            else:
+                return True
+        return any(tree(texts, found) for tree in self.trees)
+
+
+@lru_cache(maxsize=16)
+def _compiled(queries):
+    return KeywordMatcher(queries)
+
+
+def compile_queries(queries):
+    """Return the cached :class:`KeywordMatcher` for *queries* (or *queries* itself if compiled)."""
+    if isinstance(queries, KeywordMatcher):
+        return queries
+    return _compiled(tuple(queries))
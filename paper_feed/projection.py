@@ -0,0 +1,173 @@
+"""Per-paper read models kept in ``paper_projection``.
+
+A paper is shown from its latest observation, its legacy aliases, the AI
+translation and abstract analyses and the user's classification correction.
+This module is the one place that merges them: ``refresh_projection`` rebuilds
+the papers the triggers marked dirty into two JSON documents,
+
+* ``item_json``: the durable feed item returned by ``exporter.database_items``
+  (raw analysis payloads included, for re-analysis and exports), and
+* ``record_json``: the ``/api/papers`` record, minus the review state, which
+  readers join from ``paper_review_state`` so a review action rewrites nothing.
+
+Feeds give publication dates as RFC 822 or ISO 8601 strings, which do not sort
+as text.  Each row also stores the item's ``pub_date`` as epoch seconds
+(``published_ts``, indexed) and its legacy RSS position, so readers order and
+limit in SQL; the strings themselves are kept as received.
+"""
+import json
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+EXTRA_KINDS = ("translation", "abstract", "user_correction")
+CORRECTION_KEYS = ("methods", "topics", "theories", "context", "subjects", "novelty_score")
+
+_DIRTY = "paper_projection_dirty d"
+
+
+def payload(value):
+    """A stored JSON object, or ``{}`` for anything missing, invalid or not an object."""
+    try:
+        parsed = json.loads(value or "{}")
+        return parsed if isinstance(parsed, dict) else {}
+    except (TypeError, json.JSONDecodeError):
+        return {}
+
+
+def published_timestamp(value):
+    """Whole epoch seconds of an ISO 8601 or RFC 822 date (naive means UTC), or ``None``."""
+    text = str(value or "")
+    try:
+        parsed = datetime.fromisoformat(text.replace("Z", "+00:00"))
+    except ValueError:
+        try:
+            parsed = parsedate_to_datetime(text)
+        except (TypeError, ValueError):
+            return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
+
+
+def legacy_order(item):
+    try:
+        return int(item.get("_legacy_order"))
+    except (TypeError, ValueError):
+        return None
+
+
+def labels(value):
+    if isinstance(value, list):
+        return value
+    return [value] if value else []
+
+
+def primary(values, fallback):
+    if not values:
+        return fallback
+    first = values[0]
+    return first.get("name") if isinstance(first, dict) else first
+
+
+def classification(translation, abstract, correction):
+    """Display fields: AI classification first, its abstract second, then non-empty human edits.
+
+    The inputs are not modified.  ``user_corrected`` is true only when the
+    correction changed a field.
+    """
+    translation = dict(translation)
+    methods = labels(translation.get("methods", translation.get("method", [])))
+    topics = labels(translation.get("topics", translation.get("topic", [])))
+    corrected = False
+    for key in CORRECTION_KEYS:
+        if key in correction and correction[key] not in (None, [], ""):
+            corrected = True
+            if key == "methods":
+                methods = labels(correction[key])
+            elif key == "topics":
+                topics = labels(correction[key])
+            else:
+                translation[key] = correction[key]
+    return {
+        "title_zh": translation.get("zh", ""), "methods": methods, "topics": topics,
+        "method": primary(methods, "Qualitative"), "topic": primary(topics, "Other Marketing"),
+        "theories": translation.get("theories", []), "context": translation.get("context", []),
+        "subjects": translation.get("subjects", []), "novelty_score": translation.get("novelty_score"),
+        "classification_source": "user" if corrected else "gpt",
+        "classification_version": translation.get("classification_version", ""),
+        "user_corrected": corrected,
+        "abstract": abstract.get("abstract", ""), "raw_abstract": abstract.get("raw_abstract", ""),
+        "abstract_source": abstract.get("source", ""),
+    }
+
+
+def feed_item(row, legacy_ids, extras):
+    """The durable item of one paper; *extras* maps EXTRA_KINDS to stored payload text."""
+    item = payload(row["payload_json"])
+    item.update({"paper_id": row["paper_id"], "id": item.get("id") or row["source_guid"] or row["paper_id"],
+                 "link": row["link"] or item.get("link") or row["canonical_url"] or "",
+                 "title": row["observed_title"] or item.get("title") or row["title"],
+                 "journal": row["observed_journal"] or item.get("journal") or row["journal"] or "",
+                 "pub_date": row["observed_published_at"] or item.get("pub_date") or row["published_at"] or "",
+                 "summary": row["summary"] or item.get("summary") or ""})
+    item["legacy_ids"] = list(legacy_ids)
+    for kind in EXTRA_KINDS:
+        if kind in extras:
+            item[kind] = payload(extras[kind])
+    return item
+
+
+def api_record(row, legacy_ids, extras):
+    """The API record of one paper, without ``state``."""
+    item = payload(row["payload_json"])
+    legacy_id = legacy_ids[-1] if legacy_ids else None
+    # Preserve current feed shape, while durable identifiers always win.
+    item.update({key: value for key, value in {
+        "paper_id": row["paper_id"], "id": item.get("id") or legacy_id,
+        "link": row["link"] or item.get("link") or row["canonical_url"], "title": row["observed_title"] or row["title"],
+        "journal": row["observed_journal"] or row["journal"], "pub_date": row["observed_published_at"] or row["published_at"],
+        "summary": row["summary"] or item.get("summary"),
+    }.items() if value is not None})
+    item["legacy_id"] = legacy_id or item.get("id")
+    item["legacy_link"] = item.get("link")
+    item.update(classification(*(payload(extras.get(kind)) for kind in EXTRA_KINDS)))
+    return item
+
+
+def refresh_projection(conn):
+    """Rebuild the projection rows of the papers marked dirty; returns how many were marked.
+
+    Each input is read with one query over all dirty papers.  Papers deleted
+    since they were marked simply lose their row.
+    """
+    dirty = conn.execute("SELECT count(*) FROM paper_projection_dirty").fetchone()[0]
+    if not dirty:
+        return 0
+    legacy_ids = {}
+    for paper_id, value in conn.execute(f"""SELECT i.paper_id, i.identifier_value FROM {_DIRTY}
+            JOIN paper_identifiers i ON i.paper_id=d.paper_id WHERE i.identifier_type='legacy_id' ORDER BY i.rowid"""):
+        legacy_ids.setdefault(paper_id, []).append(value)
+    extras = {}
+    for paper_id, kind, _, value in conn.execute(f"""SELECT a.paper_id, a.analysis_kind, a.analysis_version, a.payload_json
+            FROM {_DIRTY} JOIN paper_analyses a ON a.paper_id=d.paper_id WHERE a.analysis_kind IN ('translation', 'abstract')
+            UNION ALL SELECT u.paper_id, u.override_kind, '', u.payload_json FROM {_DIRTY}
+            JOIN paper_user_overrides u ON u.paper_id=d.paper_id WHERE u.override_kind='user_correction'
+            ORDER BY 1, 2, 3"""):
+        # The unversioned ('') analysis sorts first and is the one shown.
+        extras.setdefault(paper_id, {}).setdefault(kind, value)
+    stamp = datetime.now(timezone.utc).isoformat()
+    rows = []
+    for row in conn.execute(f"""SELECT p.paper_id, p.title, p.journal, p.published_at, p.canonical_url,
+            o.source_guid, o.link, o.title AS observed_title, o.journal AS observed_journal,
+            o.published_at AS observed_published_at, o.summary, o.payload_json
+            FROM {_DIRTY} JOIN papers p ON p.paper_id=d.paper_id
+            LEFT JOIN paper_observations o ON o.observation_id=p.latest_observation_id"""):
+        aliases, stored = legacy_ids.get(row["paper_id"], ()), extras.get(row["paper_id"], {})
+        item = feed_item(row, aliases, stored)
+        rows.append((row["paper_id"], json.dumps(item), json.dumps(api_record(row, aliases, stored)),
+                     published_timestamp(item["pub_date"]), legacy_order(item), stamp))
+    conn.execute("DELETE FROM paper_projection WHERE paper_id IN (SELECT paper_id FROM paper_projection_dirty)")
+    conn.executemany("""INSERT INTO paper_projection(paper_id, item_json, record_json, published_ts, legacy_order, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?)""", rows)
+    conn.execute("DELETE FROM paper_projection_dirty")
+    return dirty
@@ -0,0 +1,115 @@
+"""Adaptive per-source polling and circuit breaking from the fetch audit history."""
+import json
+import statistics
+from datetime import datetime, timedelta, timezone
+
+from .db import connect
+
+MIN_INTERVAL = timedelta(hours=1)
+MAX_INTERVAL = timedelta(days=3)
+HISTORY_LIMIT = 60
+BREAKER_THRESHOLD = 3
+BREAKER_BASE_COOLDOWN = timedelta(hours=1)
+BREAKER_MAX_COOLDOWN = timedelta(days=7)
+
+
+def _stamp(value):
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def source_history(conn, sources):
+    """Return per-source ``(started_at, status, head_id)`` rows, oldest first."""
+    history = {source: [] for source in sources}
+    if not history:
+        return history
+    marks = ",".join("?" for _ in history)
+    rows = conn.execute(f"""SELECT f.source, r.started_at, f.status, f.detail_json FROM source_fetches f
+        JOIN fetch_runs r ON r.run_id=f.run_id WHERE r.dry_run=0 AND f.status NOT IN ('imported', 'replayed') AND f.source IN ({marks})
+        ORDER BY r.started_at""", tuple(history)).fetchall()
+    for row in rows:
+        try:
+            detail = json.loads(row["detail_json"] or "{}")
+        except json.JSONDecodeError:
+            detail = {}
+        history[row["source"]].append((_stamp(row["started_at"]), row["status"], detail.get("head_id")))
+    return {source: rows[-HISTORY_LIMIT:] for source, rows in history.items()}
+
+
+def poll_interval(history, now, min_interval=MIN_INTERVAL, max_interval=MAX_INTERVAL):
+    """Half the typical gap between observed feed changes, clamped to the bounds.
+
+    A change is a successful fetch whose newest entry differs from the previous
+    one.  Until two changes are known, the time observed so far stands in for the
+    gap, so a quiet feed backs off gradually instead of all at once.
+    """
+    head = None
+    changes = []
+    for stamp, status, head_id in history:
+        if status != "succeeded" or head_id is None:
+            continue
+        if head is not None and head_id != head:
+            changes.append(stamp)
+        head = head_id
+    if len(changes) >= 2:
+        gap = statistics.median((b - a).total_seconds() for a, b in zip(changes, changes[1:]))
+    elif history:
+        gap = (now - (changes[-1] if changes else history[0][0])).total_seconds()
+    else:
+        return min_interval
+    return max(min_interval, min(max_interval, timedelta(seconds=gap / 2)))
+
+
+def plan_polls(database, sources, now=None, min_interval=MIN_INTERVAL, max_interval=MAX_INTERVAL, force=False):
+    """Split *sources* into those due now and a ``{source: next_due}`` map of the rest."""
+    if force:
+        return list(sources), {}
+    now = now or datetime.now(timezone.utc)
+    conn = connect(database)
+    try:
+        history = source_history(conn, sources)
+    finally:
+        conn.close()
+    due, deferred = [], {}
+    for source in sources:
+        polled = [stamp for stamp, status, _ in history[source] if status in {"succeeded", "unchanged"}]
+        if not polled:
+            due.append(source)
+            continue
+        next_due = polled[-1] + poll_interval(history[source], now, min_interval, max_interval)
+        if next_due <= now:
+            due.append(source)
+        else:
+            deferred[source] = next_due.isoformat()
+    return due, deferred
+
+
+def circuit_state(history, now, threshold=BREAKER_THRESHOLD, base=BREAKER_BASE_COOLDOWN, ceiling=BREAKER_MAX_COOLDOWN):
+    """Return ``(state, consecutive_failures, retry_at)`` for one source.
+
+    After *threshold* consecutive failed runs the circuit opens; each further
+    failure doubles the cooldown.  Once the cooldown has elapsed the circuit is
+    ``half_open``: the caller makes a single probe attempt, whose outcome either
+    closes the circuit (success) or extends the cooldown (another failure).
+    """
+    failures = 0
+    for _, status, _ in reversed(history):
+        if status != "failed":
+            break
+        failures += 1
+    if failures < threshold:
+        return "closed", failures, None
+    cooldown = min(ceiling, base * 2 ** (failures - threshold))
+    retry_at = history[-1][0] + cooldown
+    return ("open" if now < retry_at else "half_open"), failures, retry_at
+
+
+def circuit_states(database, sources, now=None, threshold=BREAKER_THRESHOLD):
+    """Return ``{source: (state, consecutive_failures, retry_at)}`` for *sources*."""
+    now = now or datetime.now(timezone.utc)
+    conn = connect(database)
+    try:
+        history = source_history(conn, sources)
+    finally:
+        conn.close()
+    return {source: circuit_state(history[source], now, threshold) for source in sources}
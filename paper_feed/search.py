@@ -0,0 +1,217 @@
+"""Paper search and keyword previews, backed by the trigram FTS5 indexes.
+
+    python -m paper_feed.search papers "brand loyalty" --database data/paper_feed.sqlite3
+    python -m paper_feed.search preview "brand AND loyalty" --database data/paper_feed.sqlite3
+    python -m paper_feed.search preview --keywords keywords.dat
+"""
+import argparse
+import html
+import json
+import re
+import time
+
+from .db import PaperRepository, connect, has_search_index
+from .keywords import DEFAULT_FIELD, KeywordMatcher, QueryError, parse_query
+
+TRIGRAM = 3
+FTS_COLUMNS = {DEFAULT_FIELD: "{title summary}", "title": "title", "summary": "summary"}
+PAPER_COLUMNS = ("title", "summary", "abstract", "title_zh")
+# bm25 column weights, in PAPER_COLUMNS order: a title hit outranks a summary hit.
+PAPER_WEIGHTS = (10.0, 1.0, 2.0, 5.0)
+VIEWS = {"inbox", "favorite", "archived", "hidden", "all"}
+SEARCH_TERM_RE = re.compile(r'"([^"]*)"|(\S+)')
+# Private-use characters bracket hits inside snippet(), so the text around them
+# can be escaped before the caller's markers go in.
+HIT_START, HIT_END = "\ue000", "\ue001"
+
+
+class SearchUnavailable(RuntimeError):
+    """The database has no paper_fts index (SQLite built without FTS5)."""
+
+
+def _phrase(text):
+    return '"' + text.replace('"', '""') + '"'
+
+
+def fts_filter(node):
+    """An FTS5 expression every match of *node* satisfies, or ``None`` for "anything".
+
+    Only positive terms of three or more characters in indexed columns narrow
+    the candidates (the trigram tokenizer cannot look up shorter strings);
+    ``NOT`` and ``journal:`` are left to the exact check that follows.
+    """
+    kind = node[0]
+    if kind == "term":
+        column = FTS_COLUMNS.get(node[1])
+        if column is None or len(node[2].strip()) < TRIGRAM:
+            return None
+        return f"{column} : {_phrase(node[2])}"
+    if kind == "not":
+        return None
+    parts = [fts_filter(child) for child in node[1]]
+    if kind == "and":
+        parts = [part for part in parts if part is not None]
+        if not parts:
+            return None
+        return parts[0] if len(parts) == 1 else "(" + " AND ".join(parts) + ")"
+    if not parts or None in parts:
+        return None
+    return parts[0] if len(parts) == 1 else "(" + " OR ".join(parts) + ")"
+
+
+def _candidates(conn, node, indexed):
+    columns = "o.observation_id, o.paper_id, o.title, o.summary, o.journal, o.published_at"
+    expression = fts_filter(node) if indexed else None
+    if expression is None:
+        return conn.execute(f"SELECT {columns} FROM paper_observations o").fetchall()
+    return conn.execute(f"""SELECT {columns} FROM observation_fts f JOIN paper_observations o ON o.observation_id=f.rowid
+        WHERE observation_fts MATCH ?""", (expression,)).fetchall()
+
+
+def preview_queries(conn, queries, samples=5):
+    """Evaluate candidate keyword *queries* against every stored observation.
+
+    Each query is answered exactly as ``match_entry`` would have answered it at
+    ingest time: the index only narrows the rows handed to the compiled
+    matcher.  A term spanning the title/summary boundary is the one match the
+    index can miss.  Returns per-query observation and paper counts with the
+    newest matching papers as samples, plus the size of the union.
+    """
+    started = time.perf_counter()
+    indexed = has_search_index(conn, "observation_fts")
+    matched_papers, results = set(), []
+    for query in queries:
+        try:
+            node = parse_query(query)
+        except QueryError as error:
+            results.append({"query": query, "error": str(error)})
+            continue
+        matcher = KeywordMatcher([query])
+        papers = {}
+        observations = 0
+        for row in _candidates(conn, node, indexed):
+            entry = {"title": row["title"] or "", "summary": row["summary"] or "", "journal": row["journal"] or ""}
+            if matcher.match_entry(entry):
+                observations += 1
+                newest = papers.get(row["paper_id"])
+                if newest is None or (row["published_at"] or "") > (newest["published_at"] or ""):
+                    papers[row["paper_id"]] = {"paper_id": row["paper_id"], "title": row["title"],
+                                               "journal": row["journal"], "published_at": row["published_at"]}
+        matched_papers.update(papers)
+        newest_first = sorted(papers.values(), key=lambda paper: (paper["published_at"] or "", paper["paper_id"]), reverse=True)
+        results.append({"query": query, "observations": observations, "papers": len(papers),
+                        "samples": newest_first[:samples]})
+    return {"indexed": indexed, "matched_papers": len(matched_papers),
+            "total_papers": conn.execute("SELECT count(*) FROM papers").fetchone()[0],
+            "queries": results, "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)}
+
+
+def search_terms(text):
+    """Quoted phrases and bare words of a search box string; all must match."""
+    return [term for term in (quoted or word for quoted, word in SEARCH_TERM_RE.findall(text or "")) if term.strip()]
+
+
+def _like(term):
+    return "%" + re.sub(r"([%_\\])", r"\\\1", term) + "%"
+
+
+def marked_snippet(snippet, mark, escape=True):
+    """*snippet* with hits wrapped in *mark*; the feed text is HTML-escaped when *escape*."""
+    if snippet is None:
+        return None
+    text = html.escape(snippet, quote=False) if escape else snippet
+    return text.replace(HIT_START, mark[0]).replace(HIT_END, mark[1])
+
+
+def search_papers(conn, text, view="all", limit=20, offset=0, mark=("<mark>", "</mark>"), escape=True):
+    """Rank papers whose indexed text contains every term of *text*, best first.
+
+    Terms of three or more characters are answered by the trigram index and
+    ranked with bm25; shorter ones (common in Chinese titles) filter with LIKE.
+    Snippets wrap hits in *mark*; the feed text around them is HTML-escaped
+    unless *escape* is false, so feed markup shows as text rather than HTML.
+    """
+    started = time.perf_counter()
+    if view not in VIEWS:
+        raise ValueError("view must be inbox, favorite, archived, hidden, or all")
+    terms = search_terms(text)
+    if not terms:
+        raise ValueError("q must contain a search term")
+    if not has_search_index(conn, "paper_fts"):
+        raise SearchUnavailable("full-text search needs SQLite with FTS5")
+    if conn.execute("SELECT 1 FROM paper_fts_dirty LIMIT 1").fetchone():
+        # Rows written outside PaperRepository.transaction() are indexed here.
+        with PaperRepository(conn).transaction():
+            pass
+    indexed = [term for term in terms if len(term) >= TRIGRAM]
+    where, args = [], []
+    if indexed:
+        where.append("paper_fts MATCH ?")
+        args.append(" AND ".join(_phrase(term) for term in indexed))
+    for term in terms:
+        if len(term) < TRIGRAM:
+            where.append("(" + " OR ".join(f"f.{column} LIKE ? ESCAPE '\\'" for column in PAPER_COLUMNS) + ")")
+            args += [_like(term)] * len(PAPER_COLUMNS)
+    if view != "all":
+        where.append("s.state=?")
+        args.append(view)
+    tables = """paper_fts f JOIN papers p ON p.paper_id=f.paper_id JOIN paper_review_state s ON s.paper_id=p.paper_id
+        LEFT JOIN paper_projection r ON r.paper_id=p.paper_id WHERE """ + " AND ".join(where)
+    total = conn.execute(f"SELECT count(*) FROM {tables}", args).fetchone()[0]
+    if indexed:
+        # The first column is the unindexed paper_id.
+        score = "-bm25(paper_fts, 0.0, %s)" % ", ".join(map(str, PAPER_WEIGHTS))
+        snippet = "snippet(paper_fts, -1, ?, ?, '…', 64)"
+        select_args = [HIT_START, HIT_END]
+    else:
+        score, snippet, select_args = "0.0", "NULL", []
+    rows = conn.execute(f"""SELECT p.paper_id, f.title, f.title_zh, p.journal, p.published_at, s.state,
+            {score} AS score, {snippet} AS snippet FROM {tables}
+        ORDER BY score DESC, r.published_ts DESC, p.paper_id LIMIT ? OFFSET ?""",
+                        select_args + args + [limit, offset]).fetchall()
+    items = [{"paper_id": row["paper_id"], "title": row["title"], "title_zh": row["title_zh"] or "",
+              "journal": row["journal"], "pub_date": row["published_at"], "state": row["state"],
+              "score": row["score"], "snippet": marked_snippet(row["snippet"], mark, escape)} for row in rows]
+    return {"query": text, "view": view, "total": total, "offset": offset, "limit": limit, "items": items,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    preview = commands.add_parser("preview", help="count and sample stored papers a keyword set would match")
+    preview.add_argument("queries", nargs="*", help="keyword queries (one per argument)")
+    preview.add_argument("--keywords", help="read queries from a keywords.dat-style file")
+    preview.add_argument("--database", default="data/paper_feed.sqlite3")
+    preview.add_argument("--samples", type=int, default=5)
+    papers = commands.add_parser("papers", help="full-text search of stored papers")
+    papers.add_argument("text")
+    papers.add_argument("--database", default="data/paper_feed.sqlite3")
+    papers.add_argument("--view", default="all", choices=sorted(VIEWS))
+    papers.add_argument("--limit", type=int, default=20)
+    papers.add_argument("--offset", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.command == "papers":
+        conn = connect(args.database)
+        try:
+            print(json.dumps(search_papers(conn, args.text, args.view, args.limit, args.offset, ("[", "]"), escape=False),
+                             ensure_ascii=False, indent=2))
+        finally:
+            conn.close()
+        return
+    queries = list(args.queries)
+    if args.keywords:
+        with open(args.keywords, encoding="utf-8") as handle:
+            queries += [line.strip() for line in handle if line.strip() and not line.startswith("#")]
+    if not queries:
+        parser.error("give at least one query or --keywords")
+    conn = connect(args.database)
+    try:
+        print(json.dumps(preview_queries(conn, queries, args.samples), ensure_ascii=False, indent=2))
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
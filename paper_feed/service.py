@@ -5,11 +5,13 @@ import threading
 import uuid
 from pathlib import Path
 
-from .db import PaperRepository, connect, now
+from .db import PaperRepository, connect, ensure_projection, now, pooled_connect
 from .importer import LEGACY_FILES, LegacyImporter
+from .search import preview_queries, search_papers
 
 
 _INITIALIZATION_LOCK = threading.RLock()
+_INITIALIZED = set()
 
 
 class PaperNotFound(ValueError):
@@ -20,118 +22,57 @@ class PaperReferenceError(ValueError):
     pass
 
 
-def _labels(value):
-    if isinstance(value, list):
-        return value
-    return [value] if value else []
-
-
-def _primary(labels, fallback):
-    if not labels:
-        return fallback
-    first = labels[0]
-    return first.get("name") if isinstance(first, dict) else first
-
-
 class PaperFeedService:
-    """Never retains a connection: each public call opens and closes one."""
+    """Never retains a connection: each public call checks one out and closes it."""
     def __init__(self, root=".", database=None):
         self.root = Path(root)
         self.database = str(database or self.root / "data" / "paper_feed.sqlite3")
 
     def _ensure_database(self):
         # The importer is deliberately called only for a missing formal database.
-        if not os.path.exists(self.database):
-            # Server handlers create service instances per request.  This lock and
-            # inner check make first-open import/backup a once-only operation.
-            with _INITIALIZATION_LOCK:
-                if not os.path.exists(self.database):
-                    has_legacy = any((self.root / name).exists() for name in LEGACY_FILES)
-                    if has_legacy:
-                        LegacyImporter(self.root, self.database).run()
-                    else:
-                        conn = connect(self.database)
-                        conn.close()
+        if self.database in _INITIALIZED and os.path.exists(self.database):
+            return
+        # Server handlers create service instances per request.  This lock and
+        # inner check make first-open import/backup a once-only operation, and
+        # keep other threads off a file that exists but is still being imported.
+        with _INITIALIZATION_LOCK:
+            if not os.path.exists(self.database):
+                has_legacy = any((self.root / name).exists() for name in LEGACY_FILES)
+                if has_legacy:
+                    LegacyImporter(self.root, self.database).run()
+                else:
+                    conn = connect(self.database)
+                    conn.close()
+            _INITIALIZED.add(self.database)
 
     def _connection(self):
         self._ensure_database()
-        return connect(self.database)
+        # Closing a pooled connection returns it; only the first checkout per
+        # database file runs the schema bootstrap.
+        return pooled_connect(self.database)
 
     @staticmethod
-    def _aliases(conn, paper_id):
-        rows = conn.execute("SELECT identifier_type, identifier_value FROM paper_identifiers WHERE paper_id=?", (paper_id,))
-        aliases = {row[0]: row[1] for row in rows}
-        return aliases
+    def _records(conn, where="", args=()):
+        # The API record is stored whole in paper_projection; only the review
+        # state is read live.  Newest first; undated papers sort last.
+        ensure_projection(conn)
+        rows = conn.execute(f"""SELECT r.record_json, s.state FROM papers p
+            JOIN paper_review_state s ON s.paper_id=p.paper_id JOIN paper_projection r ON r.paper_id=p.paper_id
+            {where} ORDER BY r.published_ts DESC, p.title COLLATE NOCASE, p.paper_id""", args)
+        return [dict(json.loads(record_json), state=state) for record_json, state in rows]
 
     def _record(self, conn, paper_id):
-        row = conn.execute("""SELECT p.*, s.state, s.state_changed_at, o.link, o.title AS observed_title,
-            o.journal AS observed_journal, o.published_at AS observed_published_at, o.summary, o.payload_json
-            FROM papers p JOIN paper_review_state s ON s.paper_id=p.paper_id
-            LEFT JOIN paper_observations o ON o.observation_id=(SELECT MAX(observation_id) FROM paper_observations WHERE paper_id=p.paper_id)
-            WHERE p.paper_id=?""", (paper_id,)).fetchone()
-        if not row:
-            return None
-        payload = json.loads(row["payload_json"] or "{}")
-        # Preserve current feed shape, while durable identifiers always win.
-        item = payload if isinstance(payload, dict) else {}
-        item.update({key: value for key, value in {
-            "paper_id": paper_id, "id": item.get("id") or self._aliases(conn, paper_id).get("legacy_id"),
-            "link": row["link"] or item.get("link") or row["canonical_url"], "title": row["observed_title"] or row["title"],
-            "journal": row["observed_journal"] or row["journal"], "pub_date": row["observed_published_at"] or row["published_at"],
-            "summary": row["summary"] or item.get("summary"), "state": row["state"],
-        }.items() if value is not None})
-        aliases = self._aliases(conn, paper_id)
-        item["legacy_id"] = aliases.get("legacy_id") or item.get("id")
-        item["legacy_link"] = item.get("link")
-        def payload(table, column, kind):
-            data = conn.execute(f"SELECT payload_json FROM {table} WHERE paper_id=? AND {column}=?", (paper_id, kind)).fetchone()
-            try:
-                parsed = json.loads(data[0]) if data else {}
-            except (TypeError, json.JSONDecodeError):
-                parsed = {}
-            return parsed if isinstance(parsed, dict) else {}
-
-        # Keep the exact projection semantics of exporter.feed_items: AI
-        # classification first, its abstract second, then non-empty human edits.
-        # Copies ensure an API read never mutates stored JSON payloads.
-        translation = dict(payload("paper_analyses", "analysis_kind", "translation"))
-        abstract = dict(payload("paper_analyses", "analysis_kind", "abstract"))
-        correction = dict(payload("paper_user_overrides", "override_kind", "user_correction"))
-        methods = _labels(translation.get("methods", translation.get("method", [])))
-        topics = _labels(translation.get("topics", translation.get("topic", [])))
-        effective_correction = False
-        for key in ("methods", "topics", "theories", "context", "subjects", "novelty_score"):
-            if key in correction and correction[key] not in (None, [], ""):
-                effective_correction = True
-                if key == "methods":
-                    methods = _labels(correction[key])
-                elif key == "topics":
-                    topics = _labels(correction[key])
-                else:
-                    translation[key] = correction[key]
-        item.update({
-            "title_zh": translation.get("zh", ""), "methods": methods, "topics": topics,
-            "method": _primary(methods, "Qualitative"), "topic": _primary(topics, "Other Marketing"),
-            "theories": translation.get("theories", []), "context": translation.get("context", []),
-            "subjects": translation.get("subjects", []), "novelty_score": translation.get("novelty_score"),
-            "classification_source": "user" if effective_correction else "gpt",
-            "classification_version": translation.get("classification_version", ""),
-            "user_corrected": effective_correction,
-            "abstract": abstract.get("abstract", ""), "raw_abstract": abstract.get("raw_abstract", ""),
-            "abstract_source": abstract.get("source", ""),
-        })
-        return item
+        records = self._records(conn, "WHERE p.paper_id=?", (paper_id,))
+        return records[0] if records else None
 
     def list_papers(self, view="inbox"):
         if view not in {"inbox", "favorite", "archived", "hidden", "all"}:
             raise ValueError("view must be inbox, favorite, archived, hidden, or all")
         conn = self._connection()
         try:
-            where = "" if view == "all" else "WHERE s.state=?"
-            args = () if view == "all" else (view,)
-            ids = conn.execute(f"""SELECT p.paper_id FROM papers p JOIN paper_review_state s ON s.paper_id=p.paper_id
-                {where} ORDER BY COALESCE(p.published_at, '') DESC, p.title COLLATE NOCASE, p.paper_id""", args).fetchall()
-            return [self._record(conn, row[0]) for row in ids]
+            if view == "all":
+                return self._records(conn)
+            return self._records(conn, "WHERE s.state=?", (view,))
         finally: conn.close()
 
     def get_paper(self, paper_id):
@@ -202,6 +143,51 @@ class PaperFeedService:
                      ON CONFLICT(paper_id,override_kind) DO UPDATE SET payload_json=excluded.payload_json,updated_at=excluded.updated_at""", (paper_id, kind, json.dumps(payload), now()))
         finally: conn.close()
 
+    def fetch_timings(self, run_id=None):
+        """Stage and per-source phase timings of one fetch run, slowest source first.
+
+        Without *run_id* the latest real fetch is reported (dry runs and legacy
+        imports carry no timings).  Returns None for an unknown run.
+        """
+        conn = self._connection()
+        try:
+            if run_id is None:
+                run = conn.execute("""SELECT * FROM fetch_runs r WHERE r.dry_run=0 AND NOT EXISTS
+                    (SELECT 1 FROM source_fetches f WHERE f.run_id=r.run_id AND f.status='imported')
+                    ORDER BY r.started_at DESC LIMIT 1""").fetchone()
+            else:
+                run = conn.execute("SELECT * FROM fetch_runs WHERE run_id=?", (run_id,)).fetchone()
+            if run is None:
+                return None
+            sources = []
+            for row in conn.execute("SELECT source, status, item_count, detail_json FROM source_fetches WHERE run_id=?", (run["run_id"],)):
+                detail = json.loads(row["detail_json"] or "{}")
+                timings = detail.get("timings") or {}
+                total = sum(timings.get(key) or 0 for key in ("wait_ms", "request_ms", "parse_ms", "ingest_ms"))
+                sources.append({"source": row["source"], "status": row["status"], "item_count": row["item_count"],
+                                "status_code": detail.get("status_code"), "attempts": detail.get("attempts"),
+                                "timings": timings, "total_ms": round(total, 1)})
+            sources.sort(key=lambda item: item["total_ms"], reverse=True)
+            summary = json.loads(run["summary_json"] or "{}")
+            return {"run_id": run["run_id"], "started_at": run["started_at"], "completed_at": run["completed_at"],
+                    "status": run["status"], "stages_ms": summary.get("stages_ms", {}), "sources": sources}
+        finally: conn.close()
+
+    def search(self, text, view="all", limit=20, offset=0):
+        """One page of full-text matches, best first; see ``search.search_papers``."""
+        limit, offset = max(1, min(int(limit), 100)), max(0, int(offset))
+        conn = self._connection()
+        try: return search_papers(conn, text, view, limit, offset)
+        finally: conn.close()
+
+    def preview_keywords(self, queries, samples=5):
+        """What each candidate keyword query would have matched among stored observations."""
+        if not isinstance(queries, list) or not all(isinstance(query, str) for query in queries):
+            raise ValueError("queries must be a list of strings")
+        conn = self._connection()
+        try: return preview_queries(conn, [query.strip() for query in queries if query.strip()], max(0, min(int(samples), 50)))
+        finally: conn.close()
+
     def favorite_legacy_ids(self):
         conn = self._connection()
         try:
@@ -0,0 +1,343 @@
+"""Pooled outbound HTTP: keep-alive sessions, per-host concurrency caps and rate limits."""
+import asyncio
+import contextlib
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+DEFAULT_HOST_LIMIT = 4
+# Hosts serving many of our feeds (or API lookups) get their own pool size.
+HOST_LIMITS = {
+    "rss.sciencedirect.com": 6,
+    "pubsonline.informs.org": 4,
+    "journals.sagepub.com": 4,
+    "onlinelibrary.wiley.com": 4,
+    "api.crossref.org": 4,
+    "api.semanticscholar.org": 2,
+}
+
+DEFAULT_HOST_RATE = (2.0, 4)
+# (requests per second, burst) per host; publishers answer bursts with 429s.
+HOST_RATES = {
+    "rss.sciencedirect.com": (1.0, 3),
+    "onlinelibrary.wiley.com": (1.0, 3),
+    "api.crossref.org": (5.0, 5),
+    "api.semanticscholar.org": (0.3, 1),
+}
+RETRY_AFTER_STATUSES = {429, 503}
+# Longest Retry-After the limiter waits out; a longer one skips the host instead.
+MAX_RETRY_AFTER = 120
+
+
+def elapsed_ms(started, finished=None):
+    """Milliseconds between two ``time.perf_counter()`` readings, rounded for storage."""
+    return round(((time.perf_counter() if finished is None else finished) - started) * 1000, 1)
+
+
+def host_of(url):
+    return (urlsplit(str(url)).hostname or "").casefold()
+
+
+def retry_after_seconds(headers, now=None):
+    """Parse a Retry-After header (delta seconds or HTTP date); None when absent."""
+    value = (headers or {}).get("Retry-After")
+    if not value:
+        return None
+    value = str(value).strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - (now or datetime.now(timezone.utc))).total_seconds())
+
+
+class HostSkipped(requests.RequestException):
+    """The host asked for a pause longer than the limiter waits; no request was sent."""
+
+
+class TokenBucket:
+    """Reservation-style token bucket: callers learn how long to wait, then wait unlocked."""
+
+    def __init__(self, rate, burst, clock=time.monotonic):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.clock = clock
+        self.tokens = float(burst)
+        self.updated = clock()
+        self.blocked_until = 0.0
+        self.skipped_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Take one token and return the delay (seconds) before it may be used."""
+        with self._lock:
+            current = self.clock()
+            self.tokens = min(self.burst, self.tokens + (current - self.updated) * self.rate)
+            self.updated = current
+            self.tokens -= 1
+            delay = 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+            return max(delay, self.blocked_until - current)
+
+    def block_for(self, seconds):
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, self.clock() + seconds)
+
+    def skip_for(self, seconds):
+        with self._lock:
+            self.skipped_until = max(self.skipped_until, self.clock() + seconds)
+
+    def skipped(self):
+        """Seconds the host stays skipped, or 0."""
+        with self._lock:
+            return max(0.0, self.skipped_until - self.clock())
+
+
+class HostRateLimiter:
+    """Token buckets keyed by host, shared by every thread and event loop.
+
+    A Retry-After up to *max_block* seconds holds every request to the host
+    until then.  A longer one is not waited out: until it expires, acquiring a
+    token for the host raises :class:`HostSkipped`, so callers give up on that
+    host's sources at once instead of parking workers (and, in the async engine,
+    host and global slots) for the whole pause.
+    """
+
+    def __init__(self, host_rates=None, default_rate=DEFAULT_HOST_RATE, clock=time.monotonic, max_block=MAX_RETRY_AFTER):
+        self.host_rates = dict(HOST_RATES if host_rates is None else host_rates)
+        self.default_rate = default_rate
+        self.clock = clock
+        self.max_block = max_block
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, host):
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                rate, burst = self.host_rates.get(host, self.default_rate)
+                bucket = self._buckets[host] = TokenBucket(rate, burst, self.clock)
+            return bucket
+
+    def reserve(self, url):
+        """Seconds to wait before requesting *url*; raises HostSkipped for a skipped host."""
+        host = host_of(url)
+        bucket = self.bucket(host)
+        remaining = bucket.skipped()
+        if remaining:
+            raise HostSkipped(f"{host} asked to pause for {remaining:.0f}s more (Retry-After); skipped")
+        return bucket.reserve()
+
+    def acquire(self, url):
+        delay = self.reserve(url)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self, url):
+        delay = self.reserve(url)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def observe(self, url, status_code, headers):
+        """Pause the whole host when it answers 429/503 with Retry-After (see the class docstring)."""
+        if status_code in RETRY_AFTER_STATUSES:
+            delay = retry_after_seconds(headers)
+            if not delay:
+                return
+            bucket = self.bucket(host_of(url))
+            if delay > self.max_block:
+                bucket.skip_for(delay)
+            else:
+                bucket.block_for(delay)
+
+
+_connect_clock = threading.local()
+
+
+class _TimedConnect:
+    """Adds the time spent opening the socket (DNS, TCP, TLS) to this thread's clock."""
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            _connect_clock.seconds = getattr(_connect_clock, "seconds", 0.0) + time.perf_counter() - started
+
+
+class _TimedHTTPConnection(_TimedConnect, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnect, HTTPSConnection):
+    pass
+
+
+class _TimedHTTPPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class TimedAdapter(HTTPAdapter):
+    """``HTTPAdapter`` that sets ``response.connect_ms`` to its connection setup time.
+
+    ``0.0`` means a keep-alive connection was reused.  A request runs on the
+    calling thread, so a thread-local clock attributes each connect to it.
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": _TimedHTTPPool, "https": _TimedHTTPSPool}
+
+    def send(self, request, **kwargs):
+        _connect_clock.seconds = 0.0
+        response = super().send(request, **kwargs)
+        response.connect_ms = round(_connect_clock.seconds * 1000, 1)
+        return response
+
+
+class HostSessions:
+    """One keep-alive ``requests.Session`` shared by worker threads.
+
+    Every configured host is mounted on its own adapter whose pool holds exactly
+    as many connections as the host may use concurrently, so repeated requests
+    reuse DNS/TCP/TLS setup and a pool never has to discard an overflow socket.
+    """
+
+    def __init__(self, host_limits=None, default_limit=DEFAULT_HOST_LIMIT, headers=None, limiter=None):
+        self.host_limits = dict(HOST_LIMITS if host_limits is None else host_limits)
+        self.default_limit = default_limit
+        self.headers = dict(headers or {})
+        self.limiter = limiter
+        self._session = None
+        self._gates = {}
+        self._lock = threading.Lock()
+
+    def limit(self, host):
+        return self.host_limits.get(host, self.default_limit)
+
+    def _build_session(self):
+        session = requests.Session()
+        session.headers.update(self.headers)
+        default = TimedAdapter(pool_connections=32, pool_maxsize=self.default_limit)
+        session.mount("https://", default)
+        session.mount("http://", default)
+        for host, limit in self.host_limits.items():
+            adapter = TimedAdapter(pool_connections=1, pool_maxsize=limit)
+            session.mount(f"https://{host}/", adapter)
+            session.mount(f"http://{host}/", adapter)
+        return session
+
+    @property
+    def session(self):
+        with self._lock:
+            if self._session is None:
+                self._session = self._build_session()
+            return self._session
+
+    def gate(self, host):
+        with self._lock:
+            gate = self._gates.get(host)
+            if gate is None:
+                gate = self._gates[host] = threading.BoundedSemaphore(self.limit(host))
+            return gate
+
+    def get(self, url, timings=None, **kwargs):
+        """GET through the shared session; *timings*, when a dict, receives phase durations.
+
+        ``requests`` reports when the response headers arrived, counted from before
+        the connection was opened; ``ttfb_ms`` is that minus ``connect_ms``.  Both
+        add up every redirect hop, as ``request_ms`` spans them all.
+        """
+        started = time.perf_counter()
+        # Wait for a rate token before taking a connection slot, never while holding one.
+        if self.limiter is not None:
+            self.limiter.acquire(url)
+        with self.gate(host_of(url)):
+            sent = time.perf_counter()
+            response = self.session.get(url, **kwargs)
+            received = time.perf_counter()
+        if timings is not None:
+            hops = [*(getattr(response, "history", None) or ()), response]
+            elapsed = [getattr(hop, "elapsed", None) for hop in hops]
+            headers_ms = None if None in elapsed else round(sum(e.total_seconds() for e in elapsed) * 1000, 1)
+            connects = [getattr(hop, "connect_ms", None) for hop in hops]
+            connect = None if None in connects else round(sum(connects), 1)
+            ttfb = headers_ms if headers_ms is None or connect is None else max(0.0, round(headers_ms - connect, 1))
+            request_ms = elapsed_ms(sent, received)
+            timings.update({"wait_ms": elapsed_ms(started, sent), "connect_ms": connect, "ttfb_ms": ttfb,
+                            "download_ms": None if headers_ms is None else max(0.0, round(request_ms - headers_ms, 1)),
+                            "request_ms": request_ms})
+        if self.limiter is not None:
+            self.limiter.observe(url, response.status_code, response.headers)
+        return response
+
+    def close(self):
+        with self._lock:
+            session, self._session = self._session, None
+        if session is not None:
+            session.close()
+
+
+class AsyncHostGates:
+    """Per-host semaphores for one event loop (create inside the running loop)."""
+
+    def __init__(self, host_limits=None, default_limit=DEFAULT_HOST_LIMIT):
+        self.host_limits = dict(HOST_LIMITS if host_limits is None else host_limits)
+        self.default_limit = default_limit
+        self._gates = {}
+
+    def gate(self, host):
+        gate = self._gates.get(host)
+        if gate is None:
+            gate = self._gates[host] = asyncio.Semaphore(self.host_limits.get(host, self.default_limit))
+        return gate
+
+    @contextlib.asynccontextmanager
+    async def slot(self, url):
+        async with self.gate(host_of(url)):
+            yield
+
+
+class RequestTrace:
+    """httpx ``trace`` extension callback that splits one request into phases.
+
+    ``connect_ms`` is 0 when a keep-alive connection was reused; every phase is
+    None when the transport emits no trace events (e.g. a mock transport).
+    """
+
+    def __init__(self):
+        self.events = {}
+
+    async def __call__(self, name, info):
+        # "connection.connect_tcp.started", "http11.receive_response_headers.complete", ...
+        self.events.setdefault(name.split(".", 1)[-1] if name.startswith("http") else name, time.perf_counter())
+
+    def _span(self, start, end):
+        if start in self.events and end in self.events:
+            return elapsed_ms(self.events[start], self.events[end])
+        return None
+
+    def timings(self):
+        if not self.events:
+            return {"connect_ms": None, "ttfb_ms": None, "download_ms": None}
+        connect_end = "connection.start_tls.complete" if "connection.start_tls.complete" in self.events else "connection.connect_tcp.complete"
+        connect = self._span("connection.connect_tcp.started", connect_end)
+        return {
+            "connect_ms": 0.0 if connect is None else connect,
+            "ttfb_ms": self._span("send_request_headers.started", "receive_response_headers.complete"),
+            "download_ms": self._span("receive_response_headers.complete", "receive_response_body.complete"),
+        }
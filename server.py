@@ -12,6 +12,8 @@ import queue
 import uuid
 from functools import partial
 from urllib.parse import parse_qs, urlparse
+from paper_feed.db import close_pools, use_profile
+from paper_feed.search import SearchUnavailable
 from paper_feed.service import PaperFeedService, PaperNotFound, PaperReferenceError
 
 # 导入 RSS 抓取逻辑
@@ -101,7 +103,10 @@ class JobRunner:
             try:
                 result = action() or {}
                 status = "succeeded"
-                if isinstance(result, dict) and result.get("status") == "error":
+                if isinstance(result, dict) and result.get("status") == "skipped":
+                    # Nothing was due on the polling schedule; this is not an outage.
+                    pass
+                elif isinstance(result, dict) and result.get("status") == "error":
                     status = "failed"
                 elif isinstance(result, dict) and result.get("published") is False and not result.get("successful_sources"):
                     status = "failed"
@@ -122,8 +127,8 @@ class JobRunner:
 JOB_RUNNER = JobRunner()
 
 
-def run_fetch_job():
-    return run_rss_flow()
+def run_fetch_job(force_all=None):
+    return run_rss_flow(force_all=force_all)
 
 
 def run_reanalysis_job():
@@ -884,6 +889,17 @@ class CustomHandler(http.server.SimpleHTTPRequestHandler):
                 self.send_json(400, {"status": "error", "message": str(error)})
             return
 
+        if path == '/api/search':
+            params = parse_qs(parsed.query)
+            try:
+                self.send_json(200, paper_service().search(params.get("q", [""])[0], params.get("view", ["all"])[0],
+                                                           params.get("limit", ["20"])[0], params.get("offset", ["0"])[0]))
+            except SearchUnavailable as error:
+                self.send_json(503, {"status": "error", "message": str(error)})
+            except ValueError as error:
+                self.send_json(400, {"status": "error", "message": str(error)})
+            return
+
         if path.startswith('/api/papers/'):
             paper_id = path[len('/api/papers/'):]
             if '/' not in paper_id and paper_id:
@@ -909,6 +925,12 @@ class CustomHandler(http.server.SimpleHTTPRequestHandler):
             self.wfile.write(json.dumps(safe_config).encode('utf-8'))
             return
 
+        if path == '/api/fetch_timings':
+            run_id = parse_qs(parsed.query).get("run_id", [None])[0]
+            timings = paper_service().fetch_timings(run_id)
+            self.send_json(200 if timings else 404, timings or {"status": "error", "message": "Fetch run not found"})
+            return
+
         if path.startswith('/api/jobs/'):
             job = JOB_RUNNER.get(path.rsplit('/', 1)[-1])
             if not job:
@@ -1018,6 +1040,13 @@ class CustomHandler(http.server.SimpleHTTPRequestHandler):
                 # JSON error shape and leave SQLite untouched.
                 self.send_json(500, {"status": "error", "message": "RIS export failed", "detail": str(error)[:400]})
             return
+        if path == '/api/keywords/preview':
+            try:
+                req_data = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))).decode('utf-8'))
+                self.send_json(200, paper_service().preview_keywords(req_data.get("queries"), req_data.get("samples", 5)))
+            except (ValueError, TypeError, AttributeError) as error:
+                self.send_json(400, {"status": "error", "message": str(error)})
+            return
         if path.startswith('/api/papers/') and path.endswith('/review'):
             paper_id = path[len('/api/papers/'):-len('/review')].strip('/')
             try:
@@ -1271,8 +1300,10 @@ class CustomHandler(http.server.SimpleHTTPRequestHandler):
             self.send_json(202, {"job": job, "duplicate": duplicate})
             return
 
-        if self.path == '/api/fetch':
-            job, duplicate = JOB_RUNNER.enqueue("fetch", run_fetch_job)
+        if path == '/api/fetch':
+            # ?force=1 polls every source instead of only those due on the adaptive schedule.
+            force = parse_qs(parsed.query).get("force", [""])[0].lower() in {"1", "true", "yes"}
+            job, duplicate = JOB_RUNNER.enqueue("fetch", partial(run_fetch_job, force_all=force or None))
             self.send_json(202, {"job": job, "duplicate": duplicate})
             return
 
@@ -1281,6 +1312,7 @@ class CustomHandler(http.server.SimpleHTTPRequestHandler):
         return
 
 def run_server():
+    use_profile(get_config().get("PAPER_FEED_DB_PROFILE"))
     # 允许地址重用，防止重启时端口被占
     http.server.ThreadingHTTPServer.allow_reuse_address = True
     with http.server.ThreadingHTTPServer(('127.0.0.1', PORT), CustomHandler) as httpd:
@@ -1291,6 +1323,8 @@ def run_server():
         except KeyboardInterrupt:
             print("\nShutting down server...")
             httpd.shutdown()
+        finally:
+            close_pools()
 
 if __name__ == "__main__":
     run_server()
@@ -0,0 +1,96 @@
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import feedparser
+
+import get_RSS
+from paper_feed import fastfeed
+
+CORPUS = Path(__file__).with_name("feed_corpus")
+FIELDS = ("title", "link", "id", "summary", "published_parsed", "updated_parsed")
+
+
+def entry_fields(entry):
+    # dict.get: FeedParserDict would answer updated_parsed with published_parsed.
+    return {key: dict.get(entry, key, "<missing>") for key in FIELDS}
+
+
+def pipeline_entries(feed):
+    """What fetch_result keeps of each entry, with undated entries left undated."""
+    with patch.object(get_RSS, "convert_struct_time_to_datetime", side_effect=lambda value: value):
+        return list(get_RSS.feed_entries(feed))
+
+
+class FastFeedParityTests(unittest.TestCase):
+    def test_corpus_matches_feedparser(self):
+        samples = sorted(CORPUS.glob("*.xml"))
+        self.assertGreaterEqual(len(samples), 5)
+        for path in samples:
+            with self.subTest(feed=path.name):
+                content = path.read_bytes()
+                fast, slow = fastfeed.parse(content), feedparser.parse(content)
+                self.assertIsNotNone(fast)
+                self.assertFalse(slow.bozo)
+                self.assertEqual(fast.feed.get("title"), slow.feed.get("title"))
+                self.assertEqual([entry_fields(entry) for entry in fast.entries],
+                                 [entry_fields(entry) for entry in slow.entries])
+                self.assertEqual(pipeline_entries(fast), pipeline_entries(slow))
+                self.assertEqual(get_RSS.newest_first(fast.entries), get_RSS.newest_first(slow.entries))
+
+    def test_exotic_documents_fall_back(self):
+        samples = {
+            "latin-1": b'<?xml version="1.0" encoding="ISO-8859-1"?><rss version="2.0"><channel><title>Caf\xe9</title></channel></rss>',
+            "doctype": b'<?xml version="1.0"?><!DOCTYPE rss [<!ENTITY j "Journal">]><rss><channel><title>&j;</title></channel></rss>',
+            "malformed": b'<rss version="2.0"><channel><item><title>Broken &nbsp; entity</title></item></channel></rss>',
+            "xml:base": b'<feed xmlns="http://www.w3.org/2005/Atom" xml:base="https://example.test/"><entry><link href="a"/></entry></feed>',
+            "xhtml": b'<feed xmlns="http://www.w3.org/2005/Atom"><entry><content type="xhtml"><div xmlns="http://www.w3.org/1999/xhtml">x</div></content></entry></feed>',
+            "markup in field": b'<rss><channel><item><title>A <b>bold</b> title</title></item></channel></rss>',
+            "media title": b'<rss xmlns:media="http://search.yahoo.com/mrss/"><channel><item><media:title>t</media:title></item></channel></rss>',
+            "atom 0.3": b'<feed version="0.3" xmlns="http://purl.org/atom/ns#"><entry><title>t</title></entry></feed>',
+            "html page": b"<html><body>Not a feed</body></html>",
+        }
+        for name, content in samples.items():
+            with self.subTest(sample=name):
+                self.assertIsNone(fastfeed.parse(content))
+
+    def test_untested_feedparser_release_falls_back(self):
+        content = (CORPUS / "sciencedirect_rss2.xml").read_bytes()
+        self.assertTrue(fastfeed.available())
+        for version in ("6.1.0", "7.0", "5.2.1", "dev"):
+            with self.subTest(version=version), patch.object(feedparser, "__version__", version):
+                self.assertFalse(fastfeed.available())
+                self.assertIsNone(fastfeed.parse(content))
+
+    def test_small_chunks_give_the_same_result(self):
+        content = (CORPUS / "atypon_rdf.xml").read_bytes()
+        whole = fastfeed.parse(content)
+        chunked = fastfeed.parse(content, chunk_size=7)
+        self.assertEqual((chunked.feed, chunked.entries), (whole.feed, whole.entries))
+
+
+class ParseFeedTests(unittest.TestCase):
+    def test_fast_path_is_used_and_feedparser_catches_fallbacks(self):
+        content = (CORPUS / "sciencedirect_rss2.xml").read_bytes()
+        with patch.object(get_RSS.feedparser, "parse") as slow:
+            feed = get_RSS.parse_feed(content)
+        slow.assert_not_called()
+        self.assertEqual(len(feed.entries), 3)
+
+        fallback = SimpleNamespace(feed={}, entries=[])
+        with patch.object(get_RSS.fastfeed, "parse", return_value=None), \
+                patch.object(get_RSS.feedparser, "parse", return_value=fallback) as slow:
+            self.assertIs(get_RSS.parse_feed(content), fallback)
+        slow.assert_called_once_with(content)
+
+    def test_fast_path_can_be_disabled(self):
+        content = (CORPUS / "atom.xml").read_bytes()
+        with patch.object(get_RSS, "RSS_FAST_PARSE", False), patch.object(get_RSS.fastfeed, "parse") as fast:
+            feed = get_RSS.parse_feed(content)
+        fast.assert_not_called()
+        self.assertEqual(len(feed.entries), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import random
+import unittest
+
+import get_RSS
+from paper_feed.keywords import KeywordMatcher, QueryError, compile_queries, parse_query, query_keywords
+
+
+def reference_match(entry, queries):
+    """The original per-entry implementation of match_entry."""
+    text = (entry["title"] + " " + entry.get("summary", "")).lower()
+    return any(all(term.strip().lower() in text for term in query.split("AND")) for query in queries)
+
+
+def match(query, **entry):
+    entry.setdefault("title", "")
+    return KeywordMatcher([query]).match_entry(entry)
+
+
+class KeywordMatcherTests(unittest.TestCase):
+    def test_legacy_queries_match_like_the_original_loop(self):
+        rng = random.Random(13)
+        words = ["brand", "loyalty", "price", "consumer", "social media", "trust", "Brand", "pricing"]
+        for _ in range(400):
+            queries = [" AND ".join(rng.sample(words, rng.randint(1, 3))) for _ in range(rng.randint(0, 6))]
+            queries += rng.sample(["price AND consumer", "  ", "social media AND consumer", ""], rng.randint(0, 2))
+            entry = {"title": " ".join(rng.choices(words, k=5)), "summary": " ".join(rng.choices(words, k=8))}
+            if rng.random() < 0.2:
+                del entry["summary"]
+            with self.subTest(queries=queries, entry=entry):
+                self.assertEqual(KeywordMatcher(queries).match_entry(entry), reference_match(entry, queries))
+
+    def test_shared_terms_are_compiled_once_and_implied_queries_dropped(self):
+        matcher = KeywordMatcher(["trust AND brand", "Brand", "brand AND loyalty", "price AND trust"])
+        self.assertEqual(sorted(text for _, text in matcher.terms), ["brand", "loyalty", "price", "trust"])
+        self.assertEqual((matcher.singles, len(matcher.groups), matcher.trees), (("brand",), 1, []))
+        self.assertTrue(matcher.match_entry({"title": "A BRAND study"}))
+        self.assertFalse(matcher.match_entry({"title": "Trust in science"}))
+
+    def test_compiled_matchers_are_cached_and_accepted_by_match_entry(self):
+        queries = ["social media AND consumer behavior"]
+        matcher = compile_queries(queries)
+        self.assertIs(compile_queries(list(queries)), matcher)
+        self.assertIs(compile_queries(matcher), matcher)
+        entry = {"title": "Social media and consumer behavior"}
+        self.assertTrue(get_RSS.match_entry(entry, matcher))
+        self.assertFalse(get_RSS.match_entry(entry, []))
+
+
+class QueryLanguageTests(unittest.TestCase):
+    def test_operators_precedence_and_grouping(self):
+        self.assertEqual(parse_query("a OR b c AND NOT d"),
+                         ("or", (("term", "text", "a"), ("and", (("term", "text", "b c"), ("not", ("term", "text", "d")))))))
+        self.assertTrue(match("trust OR loyalty", title="Brand loyalty"))
+        self.assertFalse(match("brand NOT loyalty", title="Brand loyalty"))
+        self.assertTrue(match("brand AND (trust OR loyalty)", title="Brand", summary="customer loyalty"))
+        self.assertFalse(match("brand AND (trust OR price)", title="Brand", summary="customer loyalty"))
+
+    def test_operators_are_whole_upper_case_words(self):
+        self.assertTrue(match("BRANDING", title="Rebranding a firm"))
+        self.assertTrue(match("trust and loyalty", title="Trust and loyalty"))
+        self.assertFalse(match("trust and loyalty", title="Trust or loyalty"))
+
+    def test_quoted_phrases_and_field_scopes(self):
+        self.assertTrue(match('"pay AND go"', title="The pay and go model"))
+        self.assertTrue(match('title:brand', title="Brand", summary=""))
+        self.assertFalse(match('title:brand', title="Retail", summary="brand"))
+        self.assertTrue(match('abstract:brand', title="Retail", summary="brand"))
+        self.assertTrue(match('brand NOT journal:"working paper"', title="Brand", journal="Journal of Marketing"))
+        self.assertFalse(match('brand NOT journal:"working paper"', title="Brand", journal="SSRN Working Paper"))
+        self.assertTrue(match("title:(trust OR loyalty)", title="Loyalty"))
+
+    def test_malformed_queries_raise(self):
+        for query in ('"open quote', "(brand", "brand)", "NOT", "brand AND NOT", "title:", "title:(journal:x)"):
+            with self.subTest(query=query), self.assertRaises(QueryError):
+                KeywordMatcher([query])
+
+    def test_operators_without_terms_and_empty_groups_raise(self):
+        for query in ("OR", "AND", "()", "a OR", "OR a", "a AND", "a AND AND b", "(a OR) b", "title:()", "brand ()",
+                      '""', '" "', 'a AND ""', 'title:""'):
+            with self.subTest(query=query), self.assertRaises(QueryError):
+                parse_query(query)
+
+    def test_only_a_blank_line_matches_everything(self):
+        for query in ("", "   "):
+            with self.subTest(query=query):
+                self.assertEqual(parse_query(query), ("and", ()))
+                self.assertTrue(match(query, title="Anything"))
+
+    def test_keywords_list_only_positive_terms(self):
+        self.assertEqual(query_keywords(["social media AND Trust", 'title:"pay AND go" NOT retail', "trust", '"open']),
+                         ['"open', "pay AND go", "social media", "Trust", "trust"])
+
+
+if __name__ == "__main__":
+    unittest.main()
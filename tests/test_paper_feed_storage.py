@@ -1,12 +1,17 @@
 import json
 import os
+import sqlite3
 import tempfile
 import unittest
 from pathlib import Path
+from unittest.mock import patch
 
-from paper_feed.db import SCHEMA_VERSION, PaperRepository, connect
+from paper_feed import db
+from paper_feed.db import SCHEMA_VERSION, PaperRepository, close_pools, connect, migrate, pooled_connect, schema_version
 from paper_feed.exporter import database_items
+from paper_feed.identity import identifiers, identifiers_many
 from paper_feed.importer import LegacyImporter
+from paper_feed.service import PaperFeedService
 
 
 def write_json(root, name, value):
@@ -16,6 +21,10 @@ def write_json(root, name, value):
         json.dump(value, handle)
 
 
+def has_table(conn, name):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE name=?", (name,)).fetchone() is not None
+
+
 class PaperFeedStorageTests(unittest.TestCase):
     def test_doi_merges_sources_but_title_alone_does_not(self):
         with tempfile.TemporaryDirectory() as directory:
@@ -75,6 +84,73 @@ class PaperFeedStorageTests(unittest.TestCase):
             self.assertEqual(repo.conn.execute("SELECT count(*) FROM papers").fetchone()[0], 2)
             repo.conn.close()
 
+    def test_identifier_extraction_covers_overlapping_encoded_and_non_ascii_forms(self):
+        records = [
+            {"source": "s", "id": "g", "link": "https://x.test/doi/10.1016/pii:S0148296324001234?utm_source=rss"},
+            {"link": "https://x.test/doi/10.1287%2Fmksc.2024.0101"},
+            {"link": "https://x.test/a", "id": "PMID:123 arXiv:2401.01234v2 https://arxiv.org/abs/2402.00001"},
+            {"link": "https://x.test/a", "id": "p\u0131i:S01482963"},
+            {"link": "https://x.test//a//b/", "id": "no identifiers here"},
+        ]
+        self.assertEqual(identifiers_many(records), [identifiers(record) for record in records])
+        self.assertEqual(identifiers(records[0]), [
+            ("doi", "10.1016/pii:s0148296324001234"), ("pii", "s0148296324001234"),
+            ("url", "https://x.test/doi/10.1016/pii:S0148296324001234"), ("source_guid", "s\x1fg")])
+        self.assertEqual(identifiers(records[1])[0], ("doi", "10.1287/mksc.2024.0101"))
+        self.assertEqual(identifiers(records[2])[:2], [("pmid", "123"), ("arxiv", "2401.01234v2")])
+        self.assertEqual(identifiers(records[3])[0], ("pii", "s01482963"))
+        self.assertEqual(identifiers(records[4]), [("url", "https://x.test/a/b")])
+
+    def test_resolve_many_matches_within_the_batch_and_reads_identifiers_once(self):
+        with tempfile.TemporaryDirectory() as directory:
+            repo = PaperRepository(connect(os.path.join(directory, "p.sqlite3")))
+            with repo.transaction():
+                existing = repo.resolve({"source": "a", "id": "a1", "link": "https://doi.org/10.1000/old"})
+            records = [
+                {"source": "b", "id": "b1", "link": "https://doi.org/10.1000/NEW", "title": "New"},
+                {"source": "c", "id": "c1", "doi": "10.1000/new", "link": "https://x.test/new"},
+                {"source": "d", "id": "d1", "link": "https://x.test/new?utm_source=rss"},
+                {"source": "e", "id": "e1", "link": "https://doi.org/10.1000/old", "title": "Old again"},
+                {"source": "f", "id": "f1", "doi": "10.1000/old", "link": "https://x.test/new"},
+            ]
+            statements = []
+            conflicts = []
+            with repo.transaction():
+                # Only resolve_many: the commit then rebuilds derived rows.
+                repo.conn.set_trace_callback(statements.append)
+                paper_ids = repo.resolve_many(records, conflicts=conflicts)
+                repo.conn.set_trace_callback(None)
+            self.assertEqual(paper_ids[:4], [paper_ids[0]] * 3 + [existing])
+            self.assertNotEqual(paper_ids[0], existing)
+            self.assertEqual((paper_ids[4], [index for index, _ in conflicts]), (None, [4]))
+            self.assertEqual(sum(sql.lstrip().startswith("SELECT") and "paper_identifiers" in sql for sql in statements), 1)
+            with repo.transaction(), self.assertRaises(ValueError):
+                repo.resolve_many(records[4:])
+            self.assertEqual(repo.resolve_many([{"source": "z", "id": "z1"}], create=False), [None])
+            self.assertEqual(repo.conn.execute("SELECT count(*) FROM papers").fetchone()[0], 2)
+            repo.conn.close()
+
+    def test_unique_title_lookup_uses_the_normalized_title_index(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "p.sqlite3")
+            repo = PaperRepository(connect(path))
+            with repo.transaction():
+                first = repo.resolve({"source": "a", "id": "1", "title": "The Paper: An Example"})
+                repo.resolve({"source": "a", "id": "2", "title": "Same Title"})
+                repo.resolve({"source": "a", "id": "3", "title": "same title!"})
+            # A row written without title_norm (an older release) is backfilled.
+            repo.conn.execute("INSERT INTO papers(paper_id, title, created_at, updated_at) VALUES ('old', 'Ünïcode—Title', '', '')")
+            repo.conn.commit()
+            self.assertEqual(repo.unique_title_paper_id("the paper an example"), (first, None))
+            self.assertEqual(repo.unique_title_paper_id("ünïcode title"), ("old", None))
+            self.assertEqual(repo.unique_title_paper_id("Same Title"), (None, "ambiguous normalized title"))
+            self.assertEqual(repo.unique_title_paper_id("Missing"), (None, "no paper with matching title"))
+            self.assertEqual(repo.unique_title_paper_id(" -- "), (None, "empty title"))
+            plan = " ".join(row[3] for row in repo.conn.execute(
+                "EXPLAIN QUERY PLAN SELECT paper_id FROM papers WHERE title_norm=? LIMIT 2", ("x",)))
+            self.assertIn("idx_papers_title_norm", plan)
+            repo.conn.close()
+
     def test_importer_merges_matching_xml_and_json_legacy_guids_only_once(self):
         with tempfile.TemporaryDirectory() as directory:
             root = Path(directory)
@@ -257,6 +333,238 @@ class PaperFeedStorageTests(unittest.TestCase):
             self.assertIsNotNone(conn.execute("SELECT applied_at FROM schema_migrations WHERE version=?", (SCHEMA_VERSION,)).fetchone())
             conn.close()
 
+    def test_migrations_run_once_and_a_current_database_costs_one_pragma(self):
+        with tempfile.TemporaryDirectory() as directory:
+            conn = connect(os.path.join(directory, "p.sqlite3"))
+            self.assertEqual(schema_version(conn), SCHEMA_VERSION)
+            self.assertEqual([row[0] for row in conn.execute("SELECT version FROM schema_migrations ORDER BY version")],
+                             [version for version, _, _ in db.MIGRATIONS])
+            statements = []
+            conn.set_trace_callback(statements.append)
+            self.assertEqual(migrate(conn), [])
+            self.assertEqual(statements, ["PRAGMA user_version"])
+            conn.close()
+
+    def test_database_from_before_the_runner_is_upgraded_in_place(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "p.sqlite3")
+            old = sqlite3.connect(path)
+            old.executescript("""
+                CREATE TABLE schema_migrations (version INTEGER PRIMARY KEY, applied_at TEXT NOT NULL);
+                INSERT INTO schema_migrations VALUES (1, 'then');
+                CREATE TABLE papers (paper_id TEXT PRIMARY KEY, title TEXT NOT NULL, journal TEXT, published_at TEXT, canonical_url TEXT, created_at TEXT NOT NULL, updated_at TEXT NOT NULL);
+                INSERT INTO papers VALUES ('p', 'Old: Title', NULL, NULL, NULL, '', '');
+                CREATE TABLE paper_review_state (paper_id TEXT PRIMARY KEY, favorite INTEGER, archived INTEGER, hidden INTEGER, updated_at TEXT);
+                INSERT INTO paper_review_state VALUES ('p', 1, 0, 0, 'then');
+                CREATE TABLE source_state (source TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, filter_key TEXT, updated_at TEXT NOT NULL);
+            """)
+            old.close()
+            conn = connect(path)
+            self.assertEqual(schema_version(conn), SCHEMA_VERSION)
+            self.assertEqual(conn.execute("SELECT state FROM paper_review_state").fetchone()[0], "favorite")
+            self.assertEqual(conn.execute("SELECT title_norm FROM papers").fetchone()[0], "old title")
+            self.assertIn("head_guid", {row[1] for row in conn.execute("PRAGMA table_info(source_state)")})
+            self.assertEqual(conn.execute("SELECT applied_at FROM schema_migrations WHERE version=1").fetchone()[0], "then")
+            conn.close()
+
+    def test_unused_high_water_date_column_is_dropped(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "p.sqlite3")
+            conn = connect(path)
+            conn.execute("INSERT INTO source_state(source, updated_at, head_guid) VALUES ('s', '', 'g')")
+            conn.execute("ALTER TABLE source_state ADD COLUMN head_published TEXT")
+            conn.execute("PRAGMA user_version=9")  # as written before the column was dropped
+            conn.commit()
+            conn.close()
+            conn = connect(path)
+            self.assertNotIn("head_published", {row[1] for row in conn.execute("PRAGMA table_info(source_state)")})
+            self.assertEqual(conn.execute("SELECT head_guid FROM source_state").fetchone()[0], "g")
+            conn.close()
+
+    def test_failing_migration_step_rolls_back_the_batch(self):
+        def broken(conn):
+            conn.execute("CREATE TABLE half_done (x)")
+            raise sqlite3.OperationalError("step failed")
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "p.sqlite3")
+            connect(path).close()
+            steps = db.MIGRATIONS + ((SCHEMA_VERSION + 1, "added column", lambda conn: conn.execute("ALTER TABLE papers ADD COLUMN extra TEXT")),
+                                     (SCHEMA_VERSION + 2, "broken", broken))
+            with patch.object(db, "MIGRATIONS", steps), patch.object(db, "SCHEMA_VERSION", SCHEMA_VERSION + 2):
+                with self.assertRaises(sqlite3.OperationalError):
+                    connect(path)
+            conn = connect(path)
+            self.assertEqual(schema_version(conn), SCHEMA_VERSION)
+            self.assertNotIn("extra", {row[1] for row in conn.execute("PRAGMA table_info(papers)")})
+            self.assertFalse(has_table(conn, "half_done"))
+            conn.close()
+
+    def test_latest_observation_pointer_follows_inserts_moves_and_deletes(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "p.sqlite3")
+            conn = connect(path)
+            repo = PaperRepository(conn)
+
+            def observe(paper_id, guid):
+                conn.execute("""INSERT INTO paper_observations(paper_id, source, source_guid, first_seen_at, last_seen_at)
+                    VALUES (?, 's', ?, '', '') ON CONFLICT(source, source_guid) DO UPDATE SET paper_id=excluded.paper_id""",
+                             (paper_id, guid))
+                return conn.execute("SELECT observation_id FROM paper_observations WHERE source_guid=?", (guid,)).fetchone()[0]
+
+            def latest():
+                return dict(conn.execute("SELECT paper_id, latest_observation_id FROM papers").fetchall())
+
+            with repo.transaction():
+                one, two = repo.resolve({"source": "s", "id": "1"}), repo.resolve({"source": "s", "id": "2"})
+            self.assertEqual(latest(), {one: None, two: None})
+            with repo.transaction():
+                first, second = observe(one, "a"), observe(one, "b")
+            self.assertEqual(latest(), {one: second, two: None})
+            with repo.transaction():
+                observe(two, "b")
+            self.assertEqual(latest(), {one: first, two: second})
+            with repo.transaction():
+                conn.execute("DELETE FROM paper_observations WHERE observation_id=?", (first,))
+            self.assertEqual(latest(), {one: None, two: second})
+            # Databases from before the pointer are backfilled by the migration.
+            conn.execute("UPDATE papers SET latest_observation_id=NULL")
+            conn.execute("PRAGMA user_version=5")
+            conn.commit()
+            conn.close()
+            conn = connect(path)
+            self.assertEqual(latest(), {one: None, two: second})
+            conn.close()
+
+    def test_paper_projection_follows_writes_and_ignores_review_changes(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "p.sqlite3")
+            conn = connect(path)
+            repo = PaperRepository(conn)
+
+            def projected(paper_id):
+                row = conn.execute("SELECT item_json, record_json, updated_at FROM paper_projection WHERE paper_id=?",
+                                   (paper_id,)).fetchone()
+                return row and (json.loads(row[0]), json.loads(row[1]), row[2])
+
+            with repo.transaction():
+                paper_id = repo.resolve({"source": "s", "id": "g1", "title": "Stored"})
+                repo.ensure_inbox(paper_id)
+                conn.execute("""INSERT INTO paper_observations(paper_id, source, source_guid, title, payload_json, first_seen_at, last_seen_at)
+                    VALUES (?, 's', 'g1', 'Observed', '{"id": "g1", "extra": 1}', '', '')""", (paper_id,))
+            item, record, _ = projected(paper_id)
+            self.assertEqual((item["title"], item["extra"], item["legacy_ids"]), ("Observed", 1, []))
+            self.assertEqual((record["title"], record["method"], record["user_corrected"]), ("Observed", "Qualitative", False))
+            with repo.transaction():
+                repo.add_legacy_alias(paper_id, "legacy-1")
+                conn.execute("""INSERT INTO paper_analyses(paper_id, analysis_kind, payload_json, updated_at)
+                    VALUES (?, 'translation', '{"zh": "标题", "methods": ["Survey"]}', '')""", (paper_id,))
+                conn.execute("""INSERT INTO paper_user_overrides(paper_id, override_kind, payload_json, updated_at)
+                    VALUES (?, 'user_correction', '{"topics": ["Branding"]}', '')""", (paper_id,))
+            item, record, stamp = projected(paper_id)
+            self.assertEqual((item["legacy_ids"], item["translation"]["zh"], item["user_correction"]),
+                             (["legacy-1"], "标题", {"topics": ["Branding"]}))
+            self.assertEqual((record["legacy_id"], record["method"], record["topic"], record["classification_source"]),
+                             ("legacy-1", "Survey", "Branding", "user"))
+            # Review state is joined at read time; re-seeing an unchanged observation is not a change.
+            with repo.transaction():
+                conn.execute("UPDATE paper_review_state SET state='favorite' WHERE paper_id=?", (paper_id,))
+                conn.execute("UPDATE paper_observations SET last_seen_at='later', title='Observed' WHERE source_guid='g1'")
+                self.assertIsNone(conn.execute("SELECT 1 FROM paper_projection_dirty").fetchone())
+            self.assertEqual(projected(paper_id)[2], stamp)
+            # Writes outside PaperRepository.transaction() are projected before the next read.
+            conn.execute("UPDATE paper_observations SET summary='New summary' WHERE source_guid='g1'")
+            conn.commit()
+            conn.close()
+            self.assertEqual([item["summary"] for item in database_items(path)], ["New summary"])
+            conn = connect(path)
+            repo = PaperRepository(conn)
+            with repo.transaction():
+                conn.execute("DELETE FROM papers WHERE paper_id=?", (paper_id,))
+            self.assertIsNone(projected(paper_id))
+            self.assertEqual(conn.execute("SELECT count(*) FROM paper_projection_dirty").fetchone()[0], 0)
+            conn.close()
+
+    def test_mixed_date_formats_order_chronologically_in_sql(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "p.sqlite3")
+            conn = connect(path)
+            repo = PaperRepository(conn)
+            dates = {"rfc-new": "Tue, 02 Jan 2024 09:00:00 +0100", "iso-old": "2023-12-31T23:00:00Z",
+                     "iso-newest": "2024-01-02T08:30:00Z", "undated": "", "bad": "not a date"}
+            with repo.transaction():
+                for guid, date in dates.items():
+                    paper_id = repo.resolve({"source": "s", "id": guid, "title": guid})
+                    repo.ensure_inbox(paper_id)
+                    conn.execute("""INSERT INTO paper_observations(paper_id, source, source_guid, title, published_at, first_seen_at, last_seen_at)
+                        VALUES (?, 's', ?, ?, ?, '', '')""", (paper_id, guid, guid, date))
+            stamps = dict(conn.execute("""SELECT json_extract(item_json, '$.title'), published_ts FROM paper_projection"""))
+            conn.close()
+            self.assertEqual((stamps["iso-newest"], stamps["rfc-new"], stamps["bad"]), (1704184200, 1704182400, None))
+            newest = ["iso-newest", "rfc-new", "iso-old"]
+            self.assertEqual([item["title"] for item in database_items(path, limit=3)], newest)
+            titles = [item["title"] for item in database_items(path)]
+            self.assertEqual((titles[:3], sorted(titles[3:])), (newest, ["bad", "undated"]))
+            try:
+                listed = [item["title"] for item in PaperFeedService(directory, path).list_papers("all")]
+            finally:
+                close_pools()
+            self.assertEqual(listed, newest + ["bad", "undated"])
+
+    def test_connection_profile_comes_from_argument_or_environment(self):
+        def pragmas(conn):
+            return tuple(conn.execute(f"PRAGMA {name}").fetchone()[0]
+                         for name in ("synchronous", "cache_size", "temp_store", "wal_autocheckpoint", "journal_mode"))
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "p.sqlite3")
+            with patch.dict(os.environ, {"PAPER_FEED_DB_PROFILE": ""}):
+                conn = connect(path)
+                plain = sqlite3.connect(path)
+                # The default profile keeps whatever this SQLite build defaults to.
+                self.assertEqual(pragmas(conn), pragmas(plain))
+                plain.close()
+                conn.close()
+            with patch.dict(os.environ, {"PAPER_FEED_DB_PROFILE": "throughput"}):
+                conn = connect(path)
+                self.assertEqual(pragmas(conn), (1, -65536, 2, 4000, "wal"))
+                conn.close()
+                conn = connect(path, "durable")
+                self.assertNotEqual(pragmas(conn)[0], 1)
+                conn.close()
+            with patch.dict(os.environ, {"PAPER_FEED_DB_PROFILE": "fastest"}):
+                with self.assertRaisesRegex(ValueError, "unknown database profile 'fastest'"):
+                    connect(path)
+
+    def test_pooled_connections_bootstrap_once_and_come_back_clean(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "p.sqlite3")
+            try:
+                with patch.object(db, "migrate", wraps=db.migrate) as bootstrap:
+                    first = pooled_connect(path)
+                    self.assertEqual(first.execute("PRAGMA foreign_keys").fetchone()[0], 1)
+                    first.execute("BEGIN IMMEDIATE")
+                    first.execute("INSERT INTO papers(paper_id, title, created_at, updated_at) VALUES ('p', 't', '', '')")
+                    first.close()
+                    again = pooled_connect(path)
+                    self.assertIs(again, first)
+                    self.assertFalse(again.in_transaction)
+                    self.assertEqual(again.execute("SELECT count(*) FROM papers").fetchone()[0], 0)
+                    other = pooled_connect(path)
+                    self.assertIsNot(other, again)
+                    other.close()
+                    again.close()
+                    self.assertEqual(bootstrap.call_count, 1)
+                    # A file replaced at the same path is a different database.
+                    os.rename(path, path + ".old")
+                    fresh = pooled_connect(path)
+                    self.assertIsNot(fresh, first)
+                    self.assertEqual(bootstrap.call_count, 2)
+                    fresh.close()
+            finally:
+                close_pools()
+            with self.assertRaises(sqlite3.ProgrammingError):
+                first.execute("SELECT 1")
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,14 +1,20 @@
 import datetime
+import hashlib
 import json
 import os
 import tempfile
+import threading
 import unittest
+from concurrent.futures import Future
+from functools import partial
 from types import SimpleNamespace
 from unittest.mock import patch
 
+import httpx
+
 import get_RSS
 from paper_feed.db import connect
-from paper_feed.ingestion import ensure_database
+from paper_feed.ingestion import ensure_database, ingest_fetch_results, source_validators
 
 
 RSS_XML = b"""<?xml version="1.0"?><rss version="2.0"><channel><title>Test Journal</title>
@@ -20,7 +26,7 @@ RSS_XML = b"""<?xml version="1.0"?><rss version="2.0"><channel><title>Test Journ
 class FetchRetryTests(unittest.TestCase):
     def test_404_is_not_retried(self):
         response = SimpleNamespace(status_code=404, content=b"")
-        with patch.object(get_RSS.requests, "get", return_value=response) as request, patch.object(get_RSS.time, "sleep"):
+        with patch.object(get_RSS.HTTP, "get", return_value=response) as request, patch.object(get_RSS.time, "sleep"):
             result = get_RSS.fetch_rss_result("https://example.test/missing", retries=3)
 
         self.assertFalse(result["success"])
@@ -34,7 +40,7 @@ class FetchRetryTests(unittest.TestCase):
                     SimpleNamespace(status_code=status, content=b""),
                     SimpleNamespace(status_code=200, content=RSS_XML),
                 ]
-                with patch.object(get_RSS.requests, "get", side_effect=responses) as request, patch.object(get_RSS.time, "sleep"):
+                with patch.object(get_RSS.HTTP, "get", side_effect=responses) as request, patch.object(get_RSS.time, "sleep"):
                     result = get_RSS.fetch_rss_result("https://example.test/feed", retries=3)
 
                 self.assertTrue(result["success"])
@@ -42,6 +48,256 @@ class FetchRetryTests(unittest.TestCase):
                 self.assertEqual(request.call_count, 2)
 
 
+    def test_long_retry_after_abandons_source_for_this_run(self):
+        response = SimpleNamespace(status_code=429, content=b"", headers={"Retry-After": "3600"})
+        with patch.object(get_RSS.HTTP, "get", return_value=response) as request, patch.object(get_RSS.time, "sleep") as sleep:
+            result = get_RSS.fetch_rss_result("https://example.test/feed", retries=3)
+
+        self.assertFalse(result["success"])
+        self.assertEqual(request.call_count, 1)
+        sleep.assert_not_called()
+
+    def test_long_retry_after_skips_the_host_through_the_real_limiter(self):
+        limiter = get_RSS.HostRateLimiter(max_block=get_RSS.RSS_MAX_RETRY_AFTER)
+        sessions = get_RSS.HostSessions(limiter=limiter)
+        throttled = SimpleNamespace(status_code=429, content=b"", headers={"Retry-After": "3600"}, elapsed=None)
+        fresh = SimpleNamespace(status_code=200, content=RSS_XML, headers={}, elapsed=None)
+
+        def fake_get(url, **kwargs):
+            return throttled if url.endswith("/first") else fresh
+
+        with patch.object(get_RSS, "HTTP", sessions), patch.object(sessions.session, "get", side_effect=fake_get) as request, \
+             patch.object(get_RSS.time, "sleep") as sleep:
+            first = get_RSS.fetch_rss_result("https://rss.sciencedirect.com/first", retries=3)
+            second = get_RSS.fetch_rss_result("https://rss.sciencedirect.com/second", retries=3)
+            other = get_RSS.fetch_rss_result("https://example.test/feed", retries=3)
+
+        self.assertFalse(first["success"] or second["success"])
+        self.assertIn("skipped", second["error"])
+        self.assertTrue(other["success"])
+        self.assertEqual([call.args[0] for call in request.call_args_list],
+                         ["https://rss.sciencedirect.com/first", "https://example.test/feed"])
+        sleep.assert_not_called()
+        self.assertLessEqual(limiter.bucket("rss.sciencedirect.com").blocked_until, limiter.clock())
+
+    def test_long_retry_after_on_a_server_error_backs_off_normally(self):
+        limiter = get_RSS.HostRateLimiter(max_block=get_RSS.RSS_MAX_RETRY_AFTER)
+        sessions = get_RSS.HostSessions(limiter=limiter)
+        failing = SimpleNamespace(status_code=500, content=b"", headers={"Retry-After": "3600"}, elapsed=None)
+        fresh = SimpleNamespace(status_code=200, content=RSS_XML, headers={}, elapsed=None)
+
+        with patch.object(get_RSS, "HTTP", sessions), \
+             patch.object(sessions.session, "get", side_effect=[failing, fresh]) as request, \
+             patch.object(get_RSS.time, "sleep") as sleep:
+            result = get_RSS.fetch_rss_result("https://example.test/feed", retries=3)
+
+        self.assertEqual((result["success"], result["attempts"], request.call_count), (True, 2, 2))
+        sleep.assert_called_once_with(1)
+        self.assertEqual(limiter.bucket("example.test").skipped(), 0.0)
+
+
+class ConditionalFetchTests(unittest.TestCase):
+    def test_validators_are_sent_and_304_is_an_unchanged_success(self):
+        response = SimpleNamespace(status_code=304, content=b"", headers={})
+        validators = {"etag": '"v1"', "last_modified": "Mon, 01 Jan 2024 00:00:00 GMT"}
+        with patch.object(get_RSS.HTTP, "get", return_value=response) as request, \
+             patch.object(get_RSS.feedparser, "parse") as parse:
+            result = get_RSS.fetch_rss_result("https://example.test/feed", validators=validators)
+
+        headers = request.call_args.kwargs["headers"]
+        self.assertEqual((headers["If-None-Match"], headers["If-Modified-Since"]), ('"v1"', validators["last_modified"]))
+        self.assertTrue(result["success"] and result["unchanged"])
+        self.assertEqual((result["entries"], result["etag"]), ([], '"v1"'))
+        parse.assert_not_called()
+
+    def test_fresh_body_reports_response_validators(self):
+        response = SimpleNamespace(status_code=200, content=RSS_XML, headers={"ETag": '"v2"', "Last-Modified": "Tue, 02 Jan 2024 00:00:00 GMT"})
+        with patch.object(get_RSS.HTTP, "get", return_value=response) as request:
+            result = get_RSS.fetch_rss_result("https://example.test/feed")
+
+        self.assertNotIn("If-None-Match", request.call_args.kwargs["headers"])
+        self.assertFalse(result.get("unchanged"))
+        self.assertEqual((result["etag"], result["last_modified"]), ('"v2"', "Tue, 02 Jan 2024 00:00:00 GMT"))
+        self.assertEqual(result["timings"]["body_bytes"], len(RSS_XML))
+        self.assertGreaterEqual(result["timings"]["parse_ms"], 0)
+
+
+class BodyHashTests(unittest.TestCase):
+    def test_identical_body_is_unchanged_without_parsing(self):
+        first = SimpleNamespace(status_code=200, content=RSS_XML, headers={})
+        with patch.object(get_RSS.HTTP, "get", return_value=first):
+            fresh = get_RSS.fetch_rss_result("https://example.test/feed")
+        self.assertEqual(len(fresh["entries"]), 1)
+        self.assertTrue(fresh["body_hash"])
+
+        with patch.object(get_RSS.HTTP, "get", return_value=first), patch.object(get_RSS.feedparser, "parse") as parse:
+            repeat = get_RSS.fetch_rss_result("https://example.test/feed", validators={"body_hash": fresh["body_hash"]})
+        parse.assert_not_called()
+        self.assertTrue(repeat["success"] and repeat["unchanged"])
+        self.assertEqual((repeat["status_code"], repeat["body_hash"]), (200, fresh["body_hash"]))
+
+        changed = SimpleNamespace(status_code=200, content=RSS_XML.replace(b"paper-1", b"paper-2"), headers={})
+        with patch.object(get_RSS.HTTP, "get", return_value=changed):
+            updated = get_RSS.fetch_rss_result("https://example.test/feed", validators={"body_hash": fresh["body_hash"]})
+        self.assertFalse(updated.get("unchanged"))
+        self.assertNotEqual(updated["body_hash"], fresh["body_hash"])
+
+    def test_missing_body_is_hashed_and_parsed_as_empty(self):
+        response = SimpleNamespace(status_code=200, content=None, headers={})
+        with patch.object(get_RSS.HTTP, "get", return_value=response):
+            result = get_RSS.fetch_rss_result("https://example.test/feed", retries=1)
+        self.assertTrue(result["success"])
+        self.assertEqual((result["entries"], result["timings"]["body_bytes"]), ([], 0))
+        self.assertEqual(result["body_hash"], hashlib.sha256(b"").hexdigest())
+
+    def test_rotated_etag_on_an_identical_body_replaces_the_stored_validators(self):
+        first = SimpleNamespace(status_code=200, content=RSS_XML, headers={"ETag": '"v1"'})
+        rotated = SimpleNamespace(status_code=200, content=RSS_XML, headers={"ETag": '"v2"', "Last-Modified": "Tue, 02 Jan 2024 00:00:00 GMT"})
+        with tempfile.TemporaryDirectory() as directory:
+            database = os.path.join(directory, "feed.sqlite3")
+            with patch.object(get_RSS.HTTP, "get", return_value=first):
+                ingest_fetch_results([get_RSS.fetch_rss_result("https://example.test/feed")], directory, database, filter_key="k")
+            stored = source_validators(database, "k")["https://example.test/feed"]
+            with patch.object(get_RSS.HTTP, "get", return_value=rotated):
+                repeat = get_RSS.fetch_rss_result("https://example.test/feed", validators=stored)
+            self.assertTrue(repeat["unchanged"])
+            ingest_fetch_results([repeat], directory, database, filter_key="k")
+            updated = source_validators(database, "k")["https://example.test/feed"]
+        self.assertEqual((stored["etag"], updated["etag"]), ('"v1"', '"v2"'))
+        self.assertEqual((updated["last_modified"], updated["body_hash"]), ("Tue, 02 Jan 2024 00:00:00 GMT", stored["body_hash"]))
+
+
+def rss_items(*items):
+    body = "".join(f"<item><title>Marketing {guid}</title><link>https://example.test/{guid}</link><guid>{guid}</guid>"
+                   f"<pubDate>{date} 00:00:00 +0000</pubDate><description>marketing</description></item>" for guid, date in items)
+    return f'<?xml version="1.0"?><rss version="2.0"><channel><title>Test Journal</title>{body}</channel></rss>'.encode()
+
+
+class HighWaterMarkTests(unittest.TestCase):
+    def fetch(self, content, validators=None):
+        with patch.object(get_RSS.HTTP, "get", return_value=SimpleNamespace(status_code=200, content=content, headers={})):
+            return get_RSS.fetch_rss_result("https://example.test/feed", validators=validators)
+
+    def test_only_entries_ahead_of_the_stored_mark_are_ingested(self):
+        first = self.fetch(rss_items(("b", "Tue, 02 Jan 2024"), ("a", "Mon, 01 Jan 2024")))
+        self.assertTrue(first["full_pass"])
+        with tempfile.TemporaryDirectory() as directory:
+            database = os.path.join(directory, "feed.sqlite3")
+            ingest_fetch_results([first], directory, database, filter_key="k")
+            mark = source_validators(database, "k")["https://example.test/feed"]
+            self.assertEqual((mark["head_guid"], first["high_water"]), ("b", {"guid": "b"}))
+            # "late" is older than the mark but unseen, so it is kept; "b" ends the new items.
+            second = self.fetch(rss_items(("c", "Wed, 03 Jan 2024"), ("late", "Sun, 31 Dec 2023"), ("b", "Tue, 02 Jan 2024"),
+                                          ("a", "Mon, 01 Jan 2024")), mark)
+            self.assertEqual([e["id"] for e in second["entries"]], ["c", "late"])
+            self.assertEqual((second["head_id"], second["seen_count"], second["full_pass"]), ("c", 2, False))
+            run_id = ingest_fetch_results([second], directory, database, filter_key="k")["run_id"]
+            self.assertEqual(source_validators(database, "k")["https://example.test/feed"]["head_guid"], "c")
+            # Unreconciled since the cutoff: the mark is withheld and the next read is full.
+            self.assertEqual(source_validators(database, "k", "9999-01-01T00:00:00+00:00"), {})
+            conn = connect(database)
+            detail = json.loads(conn.execute("SELECT detail_json FROM source_fetches WHERE run_id=?", (run_id,)).fetchone()[0])
+            conn.close()
+        self.assertEqual((detail["head_id"], detail["seen_count"]), ("c", 2))
+
+    def test_unchanged_head_yields_no_entries_but_keeps_head_id(self):
+        content = rss_items(("b", "Tue, 02 Jan 2024"), ("a", "Mon, 01 Jan 2024"))
+        repeat = self.fetch(content, {"head_guid": "b"})
+        self.assertEqual((repeat["entries"], repeat["head_id"]), ([], "b"))
+
+    def test_known_guid_does_not_end_an_oldest_first_feed(self):
+        content = rss_items(("a", "Mon, 01 Jan 2024"), ("b", "Tue, 02 Jan 2024"))
+        result = self.fetch(content, {"head_guid": "a"})
+        self.assertEqual([e["id"] for e in result["entries"]], ["a", "b"])
+
+    def test_future_dated_head_does_not_hide_later_entries(self):
+        day = lambda days: (datetime.datetime.now() + datetime.timedelta(days=days)).strftime("%a, %d %b %Y")
+        first = self.fetch(rss_items(("future", day(400)), ("a", "Mon, 01 Jan 2024")))
+        second = self.fetch(rss_items(("next", day(1)), ("future", day(400)), ("a", "Mon, 01 Jan 2024")),
+                            {"head_guid": first["high_water"]["guid"]})
+        self.assertEqual([e["id"] for e in second["entries"]], ["next"])
+
+
+class AsyncFetchEngineTests(unittest.TestCase):
+    def test_async_mode_returns_ordered_results_with_retries_and_validators(self):
+        calls = []
+
+        def handler(request):
+            calls.append((str(request.url), request.headers.get("If-None-Match")))
+            if request.url.host == "flaky.test" and len([c for c in calls if "flaky" in c[0]]) == 1:
+                return httpx.Response(503)
+            if request.url.host == "cached.test":
+                return httpx.Response(304)
+            if request.url.host == "missing.test":
+                return httpx.Response(404)
+            return httpx.Response(200, content=RSS_XML, headers={"ETag": '"fresh"'})
+
+        urls = ["https://flaky.test/rss", "https://cached.test/rss", "https://missing.test/rss"]
+        client = partial(httpx.AsyncClient, transport=httpx.MockTransport(handler))
+        with patch.object(get_RSS.httpx, "AsyncClient", client), patch.object(get_RSS.asyncio, "sleep", return_value=None):
+            results = get_RSS.fetch_sources(urls, {"https://cached.test/rss": {"etag": '"old"'}}, mode="async")
+
+        self.assertEqual([r["url"] for r in results], urls)
+        self.assertEqual((results[0]["success"], results[0]["attempts"], results[0]["etag"]), (True, 2, '"fresh"'))
+        self.assertEqual(results[0]["entries"][0]["id"], "paper-1")
+        self.assertTrue(results[1]["unchanged"])
+        self.assertEqual((results[2]["success"], results[2]["status_code"]), (False, 404))
+        self.assertIn(("https://cached.test/rss", '"old"'), calls)
+        self.assertLessEqual({"wait_ms", "connect_ms", "ttfb_ms", "download_ms", "request_ms", "parse_ms"}, set(results[0]["timings"]))
+        self.assertEqual(results[0]["timings"]["body_bytes"], len(RSS_XML))
+
+    def test_async_mode_parses_bodies_off_the_event_loop(self):
+        parsed_on = []
+        parse = get_RSS.parse_feed_body
+
+        def recording_parse(*args):
+            parsed_on.append(threading.current_thread())
+            return parse(*args)
+
+        client = partial(httpx.AsyncClient, transport=httpx.MockTransport(lambda request: httpx.Response(200, content=RSS_XML)))
+        with patch.object(get_RSS.httpx, "AsyncClient", client), patch.object(get_RSS, "parse_feed_body", recording_parse):
+            results = get_RSS.fetch_sources(["https://one.test/rss"], mode="async", parse_processes=0)
+        self.assertEqual(results[0]["entries"][0]["id"], "paper-1")
+        self.assertEqual(len(parsed_on), 1)
+        self.assertIsNot(parsed_on[0], threading.main_thread())
+
+    def test_unknown_fetch_mode_is_rejected(self):
+        with self.assertRaises(ValueError):
+            get_RSS.fetch_sources(["https://one.test/rss"], mode="fibers")
+
+
+class ParseProcessTests(unittest.TestCase):
+    def test_bodies_parsed_in_worker_processes_match_in_thread_parsing(self):
+        urls = [f"https://journal{i}.test/rss" for i in range(3)]
+
+        def respond(url, **kwargs):
+            guid = url.split("//")[1].split(".")[0]
+            return SimpleNamespace(status_code=200, content=rss_items((guid, "Mon, 01 Jan 2024")), headers={})
+
+        with patch.object(get_RSS.HTTP, "get", side_effect=respond):
+            pooled = get_RSS.fetch_sources(urls, parse_processes=2)
+            inline = get_RSS.fetch_sources(urls, parse_processes=0)
+        for result in pooled + inline:
+            result["timings"].pop("parse_ms")
+        self.assertEqual(pooled, inline)
+        self.assertEqual([r["entries"][0]["id"] for r in pooled], ["journal0", "journal1", "journal2"])
+        self.assertNotIn("parsing", pooled[0])
+
+    def test_parse_failure_fails_only_that_source_without_refetching(self):
+        class BrokenParser:
+            def submit(self, fn, *args):
+                future = Future()
+                future.set_exception(ValueError("bad feed"))
+                return future
+
+        response = SimpleNamespace(status_code=200, content=RSS_XML, headers={})
+        with patch.object(get_RSS.HTTP, "get", return_value=response) as request:
+            pending = get_RSS.fetch_rss_result("https://example.test/feed", parser=BrokenParser())
+        result = get_RSS.complete_fetch_result(pending)
+        self.assertEqual(request.call_count, 1)
+        self.assertEqual((result["success"], result["status_code"], result["error"]), (False, 200, "bad feed"))
+
+
 class PublicationReliabilityTests(unittest.TestCase):
     def _entry(self):
         return {
@@ -111,6 +367,46 @@ class PublicationReliabilityTests(unittest.TestCase):
             self.assertEqual(conn.execute("SELECT count(*) FROM papers").fetchone()[0], 1)
             conn.close()
 
+    def test_run_without_due_sources_is_skipped_without_fetching(self):
+        with tempfile.TemporaryDirectory() as directory:
+            database = os.path.join(directory, "paper_feed.sqlite3")
+            connect(database).close()
+            with patch.object(get_RSS, "WEB_DIR", directory), \
+                patch.object(get_RSS, "JOURNAL_HASH_FILE", os.path.join(directory, "journals.hash")), \
+                patch.dict(os.environ, {"PAPER_FEED_DB": database}), \
+                patch.object(get_RSS, "load_config", side_effect=[["https://one.test/rss"], ["marketing"]]), \
+                patch.object(get_RSS, "plan_polls", return_value=([], {"https://one.test/rss": "2024-01-02T00:00:00+00:00"})), \
+                patch.object(get_RSS, "fetch_rss_result") as fetch, \
+                patch.object(get_RSS, "generate_rss_xml") as publish:
+                outcome = get_RSS.run_rss_flow()
+
+        self.assertEqual((outcome["status"], outcome["published"]), ("skipped", False))
+        self.assertEqual(outcome["skipped_sources"], ["https://one.test/rss"])
+        fetch.assert_not_called()
+        publish.assert_not_called()
+
+    def test_open_circuit_skips_source_and_half_open_source_is_probed_once(self):
+        urls = ["https://dead.test/rss", "https://probe.test/rss", "https://one.test/rss"]
+        retry_at = datetime.datetime(2030, 1, 1, tzinfo=datetime.timezone.utc)
+        states = {urls[0]: ("open", 4, retry_at), urls[1]: ("half_open", 3, retry_at), urls[2]: ("closed", 0, None)}
+        results = {url: {"url": url, "success": True, "entries": [self._entry()] if url == urls[2] else []} for url in urls[1:]}
+        with tempfile.TemporaryDirectory() as directory:
+            database = os.path.join(directory, "paper_feed.sqlite3")
+            connect(database).close()
+            with patch.object(get_RSS, "WEB_DIR", directory), \
+                patch.object(get_RSS, "JOURNAL_HASH_FILE", os.path.join(directory, "journals.hash")), \
+                patch.dict(os.environ, {"PAPER_FEED_DB": database}), \
+                patch.object(get_RSS, "load_config", side_effect=[urls, ["marketing"]]), \
+                patch.object(get_RSS, "circuit_states", return_value=states), \
+                patch.object(get_RSS, "fetch_rss_result", side_effect=lambda url, **_: results[url]) as fetch, \
+                patch.object(get_RSS, "get_config", return_value={}), \
+                patch.object(get_RSS, "generate_rss_xml"):
+                outcome = get_RSS.run_rss_flow()
+
+        self.assertEqual(sorted(call.args[0] for call in fetch.call_args_list), sorted(urls[1:]))
+        self.assertEqual({call.args[0]: call.kwargs["retries"] for call in fetch.call_args_list}, {urls[1]: 1, urls[2]: 3})
+        self.assertEqual(outcome["breaker_skipped_sources"], [{"url": urls[0], "consecutive_failures": 4, "retry_at": retry_at.isoformat()}])
+
     def test_total_failure_does_not_overwrite_published_outputs(self):
         urls = ["https://one.test/rss", "https://two.test/rss"]
         results = [{"url": url, "success": False, "entries": []} for url in urls]
@@ -148,6 +444,52 @@ class PublicationReliabilityTests(unittest.TestCase):
                 self.assertEqual(handle.read(), b"existing json")
 
 
+class RawArchiveReplayTests(unittest.TestCase):
+    url = "https://example.test/feed"
+
+    def replay(self, directory, archive, database):
+        with patch.object(get_RSS, "RSS_ARCHIVE_DIR", archive), \
+            patch.object(get_RSS, "WEB_DIR", directory), \
+            patch.object(get_RSS, "JOURNAL_HASH_FILE", os.path.join(directory, "journals.hash")), \
+            patch.dict(os.environ, {"PAPER_FEED_DB": database}), \
+            patch.object(get_RSS, "load_config", side_effect=[[self.url], ["marketing"]]), \
+            patch.object(get_RSS.HTTP, "get") as network, \
+            patch.object(get_RSS, "get_config", return_value={}), \
+            patch.object(get_RSS, "generate_rss_xml"):
+            outcome = get_RSS.run_rss_flow(replay="latest")
+        network.assert_not_called()
+        return outcome
+
+    def test_archived_body_is_deduplicated_and_replays_under_new_keywords(self):
+        response = SimpleNamespace(status_code=200, content=RSS_XML, headers={"ETag": '"v1"'})
+        with tempfile.TemporaryDirectory() as directory:
+            archive = os.path.join(directory, "archive")
+            database = os.path.join(directory, "paper_feed.sqlite3")
+            connect(database).close()
+            with patch.object(get_RSS, "RSS_ARCHIVE", True), patch.object(get_RSS, "RSS_ARCHIVE_DIR", archive), \
+                 patch.object(get_RSS.HTTP, "get", return_value=response):
+                first = get_RSS.fetch_rss_result(self.url)
+                again = get_RSS.fetch_rss_result(self.url)
+            self.assertEqual(first["archive_hash"], again["archive_hash"])
+            self.assertEqual(sum(len(files) for _, _, files in os.walk(archive)), 1)
+            # The live run's keywords matched nothing; the replay applies new ones.
+            ingest_fetch_results([first], directory, database, predicate=lambda entry: False, filter_key="old")
+            outcome = self.replay(directory, archive, database)
+
+            self.assertEqual((outcome["replay"], outcome["published"], outcome["new_items"]), (True, True, 1))
+            conn = connect(database)
+            self.assertEqual(conn.execute("SELECT status FROM source_fetches WHERE run_id=?", (outcome["run_id"],)).fetchone()[0], "replayed")
+            self.assertEqual(tuple(conn.execute("SELECT etag, filter_key FROM source_state").fetchone()), ('"v1"', "old"))
+            conn.close()
+
+    def test_replay_without_archived_responses_is_skipped(self):
+        with tempfile.TemporaryDirectory() as directory:
+            database = os.path.join(directory, "paper_feed.sqlite3")
+            connect(database).close()
+            outcome = self.replay(directory, os.path.join(directory, "archive"), database)
+        self.assertEqual((outcome["status"], outcome["skipped_sources"]), ("skipped", [self.url]))
+
+
 class AtomicWriteTests(unittest.TestCase):
     def test_atomic_write_fsyncs_then_replaces_destination(self):
         with tempfile.TemporaryDirectory() as directory:
@@ -0,0 +1,94 @@
+import json
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+
+import get_RSS
+from paper_feed.db import connect
+from paper_feed.scheduler import circuit_state, circuit_states, plan_polls, poll_interval
+
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def record_runs(database, source, heads):
+    """Record one fetch run per (hours_after_start, head_id, status) tuple."""
+    conn = connect(database)
+    with conn:
+        for index, (hours, head, status) in enumerate(heads):
+            run_id = f"{source}-{index}"
+            conn.execute("INSERT INTO fetch_runs(run_id,started_at,status,dry_run) VALUES (?,?,'succeeded',0)",
+                         (run_id, (START + timedelta(hours=hours)).isoformat()))
+            conn.execute("INSERT INTO source_fetches(run_id,source,status,item_count,detail_json) VALUES (?,?,?,0,?)",
+                         (run_id, source, status, json.dumps({"head_id": head})))
+    conn.close()
+
+
+class PollSchedulerTests(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.db = os.path.join(self.temp.name, "feed.sqlite3")
+
+    def tearDown(self): self.temp.cleanup()
+
+    def test_daily_feed_is_polled_about_twice_per_publication(self):
+        history = [(START + timedelta(hours=6 * i), "succeeded", f"head-{i // 4}") for i in range(16)]
+        interval = poll_interval(history, START + timedelta(days=4))
+        self.assertEqual(interval, timedelta(hours=12))
+
+    def test_oldest_first_feed_changes_head_when_items_are_appended(self):
+        def body(days):
+            items = "".join(f"<item><title>Paper {day}</title><guid>paper-{day}</guid>"
+                            f"<pubDate>{day + 1:02d} Jan 2024 08:00:00 +0000</pubDate></item>" for day in range(days))
+            return f'<?xml version="1.0"?><rss version="2.0"><channel><title>J</title>{items}</channel></rss>'.encode()
+
+        history = [(START + timedelta(hours=6 * i), "succeeded", get_RSS.parse_feed_body(body(2 + i // 4))["head_id"])
+                   for i in range(16)]
+        self.assertEqual(history[-1][2], "paper-4")
+        self.assertEqual(poll_interval(history, START + timedelta(days=4)), timedelta(hours=12))
+
+    def test_interval_respects_floor_and_ceiling(self):
+        busy = [(START + timedelta(minutes=10 * i), "succeeded", f"head-{i}") for i in range(6)]
+        quiet = [(START + timedelta(days=i), "succeeded", "same") for i in range(30)]
+        self.assertEqual(poll_interval(busy, START + timedelta(hours=1)), timedelta(hours=1))
+        self.assertEqual(poll_interval(quiet, START + timedelta(days=30)), timedelta(days=3))
+
+    def test_quiet_source_is_deferred_but_new_and_forced_sources_are_due(self):
+        record_runs(self.db, "quarterly", [(hours, "issue-1", "succeeded") for hours in range(0, 24 * 20, 24)])
+        record_runs(self.db, "failing", [(24 * 19, None, "failed")])
+        now = START + timedelta(days=19, hours=2)
+        due, deferred = plan_polls(self.db, ["quarterly", "failing", "never-polled"], now=now)
+        self.assertEqual(due, ["failing", "never-polled"])
+        self.assertIn("quarterly", deferred)
+        self.assertEqual(plan_polls(self.db, ["quarterly"], now=now, force=True), (["quarterly"], {}))
+
+
+class CircuitBreakerTests(unittest.TestCase):
+    def history(self, statuses):
+        return [(START + timedelta(hours=i), status, None) for i, status in enumerate(statuses)]
+
+    def test_circuit_opens_after_threshold_and_backs_off_exponentially(self):
+        self.assertEqual(circuit_state(self.history(["succeeded", "failed", "failed"]), START + timedelta(days=1))[0], "closed")
+        three = self.history(["failed"] * 3)
+        self.assertEqual(circuit_state(three, START + timedelta(hours=2, minutes=30)), ("open", 3, START + timedelta(hours=3)))
+        self.assertEqual(circuit_state(three, START + timedelta(hours=3))[0], "half_open")
+        five = self.history(["failed"] * 5)
+        self.assertEqual(circuit_state(five, START)[2], START + timedelta(hours=4 + 4))
+
+    def test_success_after_probe_closes_circuit(self):
+        history = self.history(["failed"] * 4 + ["succeeded"])
+        self.assertEqual(circuit_state(history, START + timedelta(hours=5)), ("closed", 0, None))
+
+    def test_states_are_read_from_stored_fetch_history(self):
+        with tempfile.TemporaryDirectory() as directory:
+            database = os.path.join(directory, "feed.sqlite3")
+            record_runs(database, "dead", [(hours, None, "failed") for hours in range(3)])
+            record_runs(database, "alive", [(0, "a", "succeeded")])
+            states = circuit_states(database, ["dead", "alive"], now=START + timedelta(hours=2, minutes=1))
+        self.assertEqual(states["dead"][0], "open")
+        self.assertEqual(states["alive"][0], "closed")
+
+
+if __name__ == "__main__":
+    unittest.main()
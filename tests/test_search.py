@@ -0,0 +1,163 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timezone
+
+import json
+
+import get_RSS
+from paper_feed.db import PaperRepository, connect, has_search_index, now
+from paper_feed.ingestion import ingest_fetch_results
+from paper_feed.keywords import parse_query
+from paper_feed.search import fts_filter, preview_queries, search_papers
+from paper_feed.service import PaperFeedService
+
+
+def entry(number, title, summary="", journal="Journal of Marketing", day=1):
+    return {"id": f"guid-{number}", "title": title, "link": f"https://example.test/{number}", "journal": journal,
+            "summary": summary, "pub_date": datetime(2024, 1, day, tzinfo=timezone.utc)}
+
+
+ENTRIES = [
+    entry(1, "Brand loyalty in retail", "A field study of <b>consumers</b>", day=1),
+    entry(2, "Social media and trust", "Brand communities online", day=2),
+    entry(3, "Pricing with AI", "Dynamic prices", journal="SSRN Working Paper", day=3),
+    entry(4, "Loyalty programs", "Points and tiers", day=4),
+]
+
+
+class KeywordPreviewTests(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.db = os.path.join(self.temp.name, "data", "feed.sqlite3")
+        ingest_fetch_results([{"url": "source", "success": True, "entries": ENTRIES}], self.temp.name, self.db)
+        self.conn = connect(self.db)
+
+    def tearDown(self):
+        self.conn.close()
+        self.temp.cleanup()
+
+    def test_preview_agrees_with_match_entry(self):
+        queries = ["brand", "LOYALTY AND NOT retail", "loyalty NOT retail", "AI", "title:brand OR journal:ssrn",
+                   "social media AND trust", '"dynamic price"', "pric NOT journal:\"working paper\"", "consumers"]
+        report = preview_queries(self.conn, queries, samples=1)
+        self.assertTrue(report["indexed"])
+        for query, result in zip(queries, report["queries"]):
+            with self.subTest(query=query):
+                expected = [item for item in ENTRIES if get_RSS.match_entry(item, [query])]
+                self.assertEqual((result["observations"], result["papers"]), (len(expected), len(expected)))
+                self.assertEqual([sample["title"] for sample in result["samples"]],
+                                 [item["title"] for item in sorted(expected, key=lambda item: item["pub_date"], reverse=True)[:1]])
+        self.assertEqual(report["total_papers"], 4)
+
+    def test_invalid_queries_are_reported_not_raised(self):
+        report = preview_queries(self.conn, ["(brand", "brand"])
+        self.assertIn("missing ')'", report["queries"][0]["error"])
+        self.assertEqual((report["queries"][1]["papers"], report["matched_papers"]), (2, 2))
+
+    def test_index_follows_updates_and_is_backfilled_for_older_databases(self):
+        self.conn.execute("UPDATE paper_observations SET title='Renamed study' WHERE source_guid='guid-1'")
+        self.conn.commit()
+        self.assertEqual(preview_queries(self.conn, ["renamed"])["queries"][0]["papers"], 1)
+        self.conn.executescript("DROP TABLE observation_fts; DROP TRIGGER observation_fts_insert;"
+                                "DROP TRIGGER observation_fts_delete; DROP TRIGGER observation_fts_update;")
+        self.assertFalse(has_search_index(self.conn, "observation_fts"))
+        self.conn.execute("PRAGMA user_version=4")  # as if written before the search index step
+        self.assertEqual(preview_queries(self.conn, ["loyalty"])["queries"][0]["papers"], 1)
+        self.conn.close()
+        self.conn = connect(self.db)
+        self.assertTrue(has_search_index(self.conn, "observation_fts"))
+        rows = self.conn.execute("SELECT rowid FROM observation_fts WHERE observation_fts MATCH 'renamed'").fetchall()
+        self.assertEqual(len(rows), 1)
+
+    def test_fts_filter_only_narrows_on_indexable_positive_terms(self):
+        self.assertEqual(fts_filter(parse_query('brand AND (title:trust OR "co op")')),
+                         '({title summary} : "brand" AND (title : "trust" OR {title summary} : "co op"))')
+        self.assertIsNone(fts_filter(parse_query("AI OR brand")))
+        self.assertEqual(fts_filter(parse_query("brand NOT journal:x AI")), '{title summary} : "brand"')
+
+
+class PaperSearchTests(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.db = os.path.join(self.temp.name, "data", "feed.sqlite3")
+        ingest_fetch_results([{"url": "source", "success": True, "entries": ENTRIES}], self.temp.name, self.db)
+        self.conn = connect(self.db)
+        self.ids = {row["title"]: row["paper_id"] for row in self.conn.execute("SELECT paper_id, title FROM papers")}
+
+    def tearDown(self):
+        self.conn.close()
+        self.temp.cleanup()
+
+    def analyse(self, title, kind, payload):
+        with PaperRepository(self.conn).transaction():
+            self.conn.execute("""INSERT INTO paper_analyses(paper_id,analysis_kind,analysis_version,payload_json,updated_at) VALUES (?,?,'',?,?)
+                ON CONFLICT(paper_id,analysis_kind,analysis_version) DO UPDATE SET payload_json=excluded.payload_json""",
+                              (self.ids[title], kind, json.dumps(payload), now()))
+
+    def titles(self, text, **options):
+        return [item["title"] for item in search_papers(self.conn, text, **options)["items"]]
+
+    def test_title_hits_rank_first_and_snippets_mark_terms(self):
+        result = search_papers(self.conn, "brand")
+        self.assertEqual([item["title"] for item in result["items"]], ["Brand loyalty in retail", "Social media and trust"])
+        self.assertEqual(result["items"][0]["snippet"], "<mark>Brand</mark> loyalty in retail")
+        self.assertGreater(result["items"][0]["score"], result["items"][1]["score"])
+        self.assertEqual(self.titles('"loyalty in" retail'), ["Brand loyalty in retail"])
+        self.assertEqual(self.titles("loyalty NOPE"), [])
+
+    def test_snippets_escape_feed_html_around_the_marks(self):
+        [item] = search_papers(self.conn, "field study")["items"]
+        self.assertEqual(item["snippet"], "A <mark>field</mark> <mark>study</mark> of &lt;b&gt;consumers&lt;/b&gt;")
+        [item] = search_papers(self.conn, "field study", mark=("[", "]"), escape=False)["items"]
+        self.assertEqual(item["snippet"], "A [field] [study] of <b>consumers</b>")
+
+    def test_index_is_keyed_by_paper_id_not_the_renumberable_rowid(self):
+        # Rebuild the rowid-keyed index of schema version 8; reopening migrates it.
+        self.conn.executescript("""DROP TABLE paper_fts; DROP TRIGGER paper_fts_paper_delete;
+            CREATE VIRTUAL TABLE paper_fts USING fts5(title, summary, abstract, title_zh, tokenize='trigram');
+            INSERT INTO paper_fts(rowid, title, summary) SELECT rowid, title, '' FROM papers;
+            CREATE TRIGGER paper_fts_paper_delete AFTER DELETE ON papers BEGIN DELETE FROM paper_fts WHERE rowid=old.rowid; END;
+            PRAGMA user_version=8;""")
+        self.conn.close()
+        self.conn = connect(self.db)
+        self.assertEqual({row[0] for row in self.conn.execute("SELECT paper_id FROM paper_fts")}, set(self.ids.values()))
+        # VACUUM may renumber the implicit rowid of a table with a TEXT primary key.
+        self.conn.execute("UPDATE papers SET rowid=rowid+100")
+        self.conn.commit()
+        hits = search_papers(self.conn, "loyalty")["items"]
+        self.assertEqual({item["title"]: item["paper_id"] for item in hits},
+                         {title: self.ids[title] for title in ("Brand loyalty in retail", "Loyalty programs")})
+        with PaperRepository(self.conn).transaction():
+            self.conn.execute("DELETE FROM papers WHERE paper_id=?", (self.ids["Loyalty programs"],))
+        self.assertEqual(self.titles("loyalty"), ["Brand loyalty in retail"])
+
+    def test_analysis_writes_keep_the_index_in_sync(self):
+        self.analyse("Loyalty programs", "abstract", {"abstract": "Gamified rewards", "source": "crossref"})
+        self.analyse("Loyalty programs", "translation", {"zh": "忠诚度计划研究"})
+        self.assertEqual(self.titles("gamified"), ["Loyalty programs"])
+        self.assertEqual(self.titles("忠诚度"), ["Loyalty programs"])
+        self.assertEqual(self.titles("计划"), ["Loyalty programs"])
+        self.analyse("Loyalty programs", "abstract", {"abstract": "Tiered points"})
+        self.assertEqual(self.titles("gamified"), [])
+        with PaperRepository(self.conn).transaction():
+            self.conn.execute("DELETE FROM paper_analyses WHERE analysis_kind='translation'")
+        self.assertEqual(self.titles("忠诚度"), [])
+        ingest_fetch_results([{"url": "source", "success": True, "entries": [entry(4, "Loyalty programmes revisited")]}], self.temp.name, self.db)
+        self.assertEqual(self.titles("revisited"), ["Loyalty programmes revisited"])
+
+    def test_views_paging_and_short_terms(self):
+        PaperFeedService(self.temp.name, self.db).review(self.ids["Pricing with AI"], "like")
+        self.assertEqual(self.titles("AI", view="favorite"), ["Pricing with AI"])
+        self.assertEqual(self.titles("pricing", view="inbox"), [])
+        page = search_papers(self.conn, "a", limit=2, offset=1)
+        self.assertEqual((page["total"], len(page["items"]), page["items"][0]["snippet"]), (4, 2, None))
+        self.assertEqual([item["title"] for item in page["items"]], ["Pricing with AI", "Social media and trust"])
+        self.assertEqual(self.titles("50%"), [])
+        for text, view in (("", "all"), ("brand", "mine")):
+            with self.subTest(text=text, view=view), self.assertRaises(ValueError):
+                search_papers(self.conn, text, view)
+
+
+if __name__ == "__main__":
+    unittest.main()
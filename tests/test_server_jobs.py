@@ -48,6 +48,18 @@ class JobRunnerTests(unittest.TestCase):
         self.assertEqual(partial_status["status"], "partial_failed")
         self.assertEqual(failed_status["status"], "failed")
 
+    def test_fetch_with_no_due_sources_is_not_a_failure(self):
+        runner = JobRunner()
+        job, _ = runner.enqueue("fetch", lambda: {
+            "status": "skipped", "published": False, "successful_sources": [], "failed_sources": [], "skipped_sources": ["quiet"]
+        })
+        for _ in range(30):
+            status = runner.get(job["id"])
+            if status["status"] != "queued" and status["status"] != "running":
+                break
+            time.sleep(0.02)
+        self.assertEqual(status["status"], "succeeded")
+
 
 if __name__ == "__main__":
     unittest.main()
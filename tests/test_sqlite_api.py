@@ -8,6 +8,7 @@ from unittest.mock import patch
 
 import server
 from paper_feed.db import PaperRepository, connect, now
+from paper_feed.ingestion import ingest_fetch_results, record_run_timings
 from paper_feed.service import PaperFeedService, PaperNotFound
 
 
@@ -179,6 +180,27 @@ class SQLiteApiContractTests(unittest.TestCase):
                 if prior is None: os.environ.pop("PAPER_FEED_DB", None)
                 else: os.environ["PAPER_FEED_DB"] = prior
 
+    def test_fetch_timings_report_latest_fetch_slowest_source_first(self):
+        with tempfile.TemporaryDirectory() as root:
+            legacy(root, [{"id": "rss-1", "title": "One"}])
+            service = PaperFeedService(root)
+            service.list_papers()
+            self.assertIsNone(service.fetch_timings())
+            entry = {"id": "guid-1", "title": "Two", "link": "https://example.test/two", "journal": "J", "summary": ""}
+            results = [{"url": "fast", "success": True, "entries": [], "timings": {"wait_ms": 1.0, "request_ms": 5.0, "parse_ms": 1.0}},
+                       {"url": "slow", "success": True, "entries": [entry], "timings": {"wait_ms": 0.0, "request_ms": 900.0, "parse_ms": 4.0, "body_bytes": 12}},
+                       {"url": "down", "success": False, "entries": [], "error": "offline"}]
+            run_id = ingest_fetch_results(results, root, service.database)["run_id"]
+            record_run_timings(service.database, run_id, {"fetch": 910.0})
+            record_run_timings(service.database, run_id, {"export": 3.5})
+            report = service.fetch_timings()
+            self.assertEqual((report["run_id"], report["stages_ms"]), (run_id, {"fetch": 910.0, "export": 3.5}))
+            self.assertEqual([item["source"] for item in report["sources"]], ["slow", "fast", "down"])
+            self.assertEqual(report["sources"][0]["timings"]["body_bytes"], 12)
+            self.assertIn("ingest_ms", report["sources"][0]["timings"])
+            self.assertEqual(report["sources"][2]["timings"], {})
+            self.assertIsNone(service.fetch_timings("missing"))
+
     def test_minimal_http_contract(self):
         with tempfile.TemporaryDirectory() as root:
             legacy(root, [{"id": "rss-1", "link": "https://example.test/one", "title": "One"}])
@@ -209,6 +231,13 @@ class SQLiteApiContractTests(unittest.TestCase):
                 self.assertEqual((status, payload["archived"]), (200, [initial["paper_id"]]))
                 self.assertEqual(request("GET", "/api/interactions")[1]["archived"], [initial["paper_id"]])
                 self.assertEqual(request("POST", "/api/papers/missing/review", {"action": "like"})[0], 404)
+                self.assertEqual(request("GET", "/api/fetch_timings")[0], 404)
+                status, payload = request("POST", "/api/keywords/preview", {"queries": ["one", "two"], "samples": 1})
+                self.assertEqual((status, [query["papers"] for query in payload["queries"]]), (200, [1, 0]))
+                self.assertEqual(request("POST", "/api/keywords/preview", {"queries": "one"})[0], 400)
+                status, payload = request("GET", "/api/search?q=%E4%B8%AD%E6%96%87&limit=5")
+                self.assertEqual((status, payload["total"], payload["items"][0]["paper_id"]), (200, 1, initial["paper_id"]))
+                self.assertEqual(request("GET", "/api/search?q=one&view=mine")[0], 400)
             finally:
                 httpd.shutdown(); httpd.server_close(); thread.join(timeout=2)
                 if prior is None: os.environ.pop("PAPER_FEED_DB", None)
@@ -4,7 +4,7 @@ import os
 import tempfile
 import unittest
 from datetime import datetime, timedelta, timezone
-from email.utils import parsedate_to_datetime
+from email.utils import format_datetime, parsedate_to_datetime
 from pathlib import Path
 from xml.etree import ElementTree as ET
 from unittest.mock import patch
@@ -12,7 +12,7 @@ from unittest.mock import patch
 import get_RSS
 from paper_feed.db import PaperRepository, connect
 from paper_feed.exporter import database_items, export_items
-from paper_feed.ingestion import ingest_fetch_results
+from paper_feed.ingestion import ingest_fetch_results, source_validators
 
 
 def entry(number, doi=None, guid=None):
@@ -50,6 +50,18 @@ class SQLiteIngestionTests(unittest.TestCase):
         self.assertEqual(conn.execute("select count(*) from paper_observations").fetchone()[0], 2)
         self.assertEqual(conn.execute("select count(*) from paper_review_state").fetchone()[0], 1); conn.close()
 
+    def test_not_modified_source_keeps_validators_and_skips_ingestion(self):
+        fresh = {"url": "one", "success": True, "entries": [entry(1)], "etag": '"v1"', "last_modified": None}
+        ingest_fetch_results([fresh], self.temp.name, self.db, filter_key="keywords-a")
+        self.assertEqual(source_validators(self.db, "keywords-a"), {"one": {"etag": '"v1"', "last_modified": None, "body_hash": None, "head_guid": None}})
+        self.assertEqual(source_validators(self.db, "keywords-b"), {})
+        unchanged = {"url": "one", "success": True, "unchanged": True, "entries": [], "status_code": 304, "etag": '"v1"'}
+        result = ingest_fetch_results([unchanged], self.temp.name, self.db, filter_key="keywords-a")
+        self.assertEqual((result["status"], result["unchanged_sources"], result["observations"]), ("succeeded", ["one"], 0))
+        conn = connect(self.db)
+        self.assertEqual(conn.execute("select status from source_fetches where run_id=?", (result["run_id"],)).fetchone()[0], "unchanged")
+        self.assertEqual(conn.execute("select count(*) from paper_observations").fetchone()[0], 1); conn.close()
+
     def test_keyword_predicate_excludes_nonmatching_papers(self):
         matching, ignored = entry(1), entry(2)
         ignored["title"] = "Unrelated accounting paper"; ignored["summary"] = ""
@@ -112,6 +124,23 @@ class SQLiteIngestionTests(unittest.TestCase):
         with open(feed, encoding="utf-8") as handle: saved = json.load(handle)
         self.assertEqual(saved["items"][0]["paper_id"], payload["items"][0]["paper_id"])
 
+    def test_export_of_database_items_parses_no_dates(self):
+        records = [entry(i) for i in range(5)]
+        # RFC 822 strings: neither sorting nor pubDate could read them without parsedate_to_datetime.
+        for i, record in enumerate(records): record["pub_date"] = format_datetime(record["pub_date"] + timedelta(days=i))
+        self.ingest([{"url": "one", "success": True, "entries": records}])
+        items = database_items(self.db)
+        self.assertIn(",", items[0]["pub_date"])
+        parsed = [{key: value for key, value in item.items() if key != "_published_ts"} for item in items[::-1]]
+        paths = [os.path.join(self.temp.name, name) for name in ("stored.xml", "stored.json", "parsed.xml", "parsed.json")]
+        with patch("paper_feed.exporter.published_timestamp", side_effect=AssertionError("date parsed")), \
+                patch("paper_feed.exporter.parsedate_to_datetime", side_effect=AssertionError("date parsed")):
+            stored = export_items(items, *paths[:2], ["marketing"])
+        reparsed = export_items(parsed, *paths[2:], ["marketing"])
+        self.assertEqual(stored["items"], reparsed["items"])
+        self.assertEqual([node.findtext("pubDate") for node in ET.parse(paths[0]).findall("./channel/item")],
+                         [node.findtext("pubDate") for node in ET.parse(paths[2]).findall("./channel/item")])
+
     def test_summary_uses_full_database_and_durable_aliases(self):
         records = [entry(i) for i in range(1001)]
         for i, record in enumerate(records): record["pub_date"] += timedelta(days=i)
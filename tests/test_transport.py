@@ -0,0 +1,155 @@
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import urllib3.util.connection
+
+from paper_feed.transport import HostRateLimiter, HostSessions, HostSkipped, TokenBucket, host_of, retry_after_seconds
+
+
+class FakeClock:
+    def __init__(self): self.value = 100.0
+    def __call__(self): return self.value
+
+
+class HostSessionsTests(unittest.TestCase):
+    def test_each_configured_host_has_a_pool_sized_to_its_limit(self):
+        sessions = HostSessions({"rss.sciencedirect.com": 6}, default_limit=3, headers={"User-Agent": "test"})
+        session = sessions.session
+        self.assertIs(session, sessions.session)
+        self.assertEqual(session.headers["User-Agent"], "test")
+        self.assertEqual(session.get_adapter("https://rss.sciencedirect.com/feed")._pool_maxsize, 6)
+        self.assertEqual(session.get_adapter("https://example.test/feed")._pool_maxsize, 3)
+        sessions.close()
+
+    def test_concurrency_is_capped_per_host_not_globally(self):
+        sessions = HostSessions({"slow.test": 2}, default_limit=8)
+        active, peak, lock = {}, {}, threading.Lock()
+
+        def fake_get(url, **kwargs):
+            host = host_of(url)
+            with lock:
+                active[host] = active.get(host, 0) + 1
+                peak[host] = max(peak.get(host, 0), active[host])
+            time.sleep(0.02)
+            with lock:
+                active[host] -= 1
+            return host
+
+        with patch.object(sessions.session, "get", side_effect=fake_get):
+            threads = [threading.Thread(target=sessions.get, args=(f"https://{host}/{i}",))
+                       for i in range(6) for host in ("slow.test", "fast.test")]
+            for thread in threads: thread.start()
+            for thread in threads: thread.join()
+        self.assertEqual(peak["slow.test"], 2)
+        self.assertGreater(peak["fast.test"], 2)
+
+    def test_get_reports_phase_timings_when_asked(self):
+        sessions = HostSessions()
+        response = SimpleNamespace(status_code=200, headers={}, elapsed=timedelta(milliseconds=40), connect_ms=15.0)
+        timings = {}
+        with patch.object(sessions.session, "get", return_value=response) as get:
+            sessions.get("https://example.test/feed", timings=timings, timeout=5)
+        self.assertNotIn("timings", get.call_args.kwargs)
+        self.assertEqual((timings["ttfb_ms"], timings["connect_ms"]), (25.0, 15.0))
+        self.assertGreaterEqual(timings["download_ms"], 0.0)
+        self.assertGreaterEqual(timings["wait_ms"], 0.0)
+
+    def test_phase_timings_add_up_every_redirect_hop(self):
+        sessions = HostSessions()
+        redirect = SimpleNamespace(status_code=301, elapsed=timedelta(milliseconds=30), connect_ms=20.0)
+        response = SimpleNamespace(status_code=200, headers={}, history=[redirect],
+                                   elapsed=timedelta(milliseconds=40), connect_ms=15.0)
+        timings = {}
+        with patch.object(sessions.session, "get", return_value=response):
+            sessions.get("https://doi.example/10.1000/feed", timings=timings)
+        self.assertEqual((timings["connect_ms"], timings["ttfb_ms"]), (35.0, 35.0))
+        self.assertEqual(timings["download_ms"], max(0.0, round(timings["request_ms"] - 70.0, 1)))
+
+    def test_connect_time_is_measured_once_per_kept_alive_connection(self):
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                self.send_response(200)
+                self.send_header("Content-Length", "2")
+                self.end_headers()
+                self.wfile.write(b"ok")
+
+            def log_message(self, *args):
+                pass
+
+        server = HTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        sessions = HostSessions()
+        url = f"http://127.0.0.1:{server.server_address[1]}/feed"
+        open_socket = urllib3.util.connection.create_connection
+
+        def slow_connect(*args, **kwargs):
+            time.sleep(0.02)
+            return open_socket(*args, **kwargs)
+
+        try:
+            first, second = {}, {}
+            with patch.object(urllib3.util.connection, "create_connection", slow_connect):
+                sessions.get(url, timings=first, timeout=5)
+                sessions.get(url, timings=second, timeout=5)
+        finally:
+            sessions.close()
+            server.shutdown()
+            server.server_close()
+        self.assertGreaterEqual(first["connect_ms"], 20.0)
+        self.assertLessEqual(first["connect_ms"] + first["ttfb_ms"], first["request_ms"] + 0.2)
+        self.assertEqual(second["connect_ms"], 0.0)
+
+
+class RateLimiterTests(unittest.TestCase):
+    def test_bucket_allows_burst_then_spaces_requests_at_rate(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=2, burst=2, clock=clock)
+        self.assertEqual([bucket.reserve() for _ in range(4)], [0.0, 0.0, 0.5, 1.0])
+        clock.value += 2
+        self.assertEqual(bucket.reserve(), 0.0)
+
+    def test_retry_after_blocks_only_that_host(self):
+        clock = FakeClock()
+        limiter = HostRateLimiter({}, default_rate=(10, 10), clock=clock)
+        limiter.observe("https://rss.sciencedirect.com/a", 429, {"Retry-After": "30"})
+        limiter.observe("https://other.test/a", 500, {"Retry-After": "30"})
+        self.assertEqual(limiter.bucket("rss.sciencedirect.com").reserve(), 30)
+        self.assertEqual(limiter.bucket("other.test").reserve(), 0.0)
+
+    def test_retry_after_beyond_the_cap_skips_the_host_until_it_expires(self):
+        clock = FakeClock()
+        limiter = HostRateLimiter({}, default_rate=(10, 10), clock=clock, max_block=120)
+        limiter.observe("https://rss.sciencedirect.com/a", 429, {"Retry-After": "3600"})
+        with self.assertRaisesRegex(HostSkipped, "rss.sciencedirect.com"):
+            limiter.reserve("https://rss.sciencedirect.com/b")
+        self.assertEqual(limiter.bucket("rss.sciencedirect.com").reserve(), 0.0)
+        self.assertEqual(limiter.reserve("https://other.test/a"), 0.0)
+        clock.value += 3600
+        self.assertEqual(limiter.reserve("https://rss.sciencedirect.com/b"), 0.0)
+
+    def test_retry_after_accepts_seconds_and_http_dates(self):
+        now = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        self.assertEqual(retry_after_seconds({"Retry-After": "7"}), 7.0)
+        self.assertEqual(retry_after_seconds({"Retry-After": format_datetime(now + timedelta(seconds=90), usegmt=True)}, now), 90.0)
+        self.assertIsNone(retry_after_seconds({}))
+
+    def test_sessions_take_a_token_and_report_throttling(self):
+        limiter = HostRateLimiter({}, default_rate=(10, 10))
+        sessions = HostSessions(limiter=limiter)
+        throttled = SimpleNamespace(status_code=429, headers={"Retry-After": "5"})
+        with patch.object(limiter, "acquire") as acquire, patch.object(sessions.session, "get", return_value=throttled):
+            self.assertIs(sessions.get("https://api.crossref.org/works/x"), throttled)
+        acquire.assert_called_once_with("https://api.crossref.org/works/x")
+        self.assertGreater(limiter.bucket("api.crossref.org").blocked_until, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
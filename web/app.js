@@ -1956,7 +1956,11 @@ async function runBackgroundJob(endpoint, button, busyLabel, idleLabel) {
     }
     await loadFeed();
     const failures = job.result?.failed_sources?.length || 0;
-    setStatus(failures ? `更新完成：${failures} 个来源失败，已保留成功结果。` : "任务完成。");
+    const skipped = job.result?.skipped_sources?.length || 0;
+    const broken = job.result?.breaker_skipped_sources?.length || 0;
+    const skippedNote = (skipped ? `（${skipped} 个来源未到轮询时间，已跳过）` : "")
+      + (broken ? `（${broken} 个来源持续失败，暂停抓取）` : "");
+    setStatus((failures ? `更新完成：${failures} 个来源失败，已保留成功结果。` : "任务完成。") + skippedNote);
     if (job.status === "partial_failed") {
       alert(`任务完成，但有 ${failures} 个 RSS 来源失败。已发布成功来源的数据。`);
     }